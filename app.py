@@ -1,14 +1,13 @@
-import gradio as gr
+import importlib
 import logging
+import threading
 import time
-import torch
 import sys
 import traceback
 import concurrent.futures
-from core.workflow import SearchWorkflow
 from core.config import get_settings
 from utilities.QueueHandler import QueueHandler
-from utilities.carla_utils import get_carla_blueprints, get_carla_maps
+from utilities.carla_catalog import CarlaCatalog
 from utilities.AgentLogger import initialize_agent_logger, reset_agent_logger, get_agent_logger
 settings = get_settings()
 
@@ -45,6 +44,8 @@ class SearchChatbotApp:
         session_id = f"search_thread_{self.thread_counter}"
         
         try:
+            from core.workflow import SearchWorkflow
+            
             self.workflow = SearchWorkflow(thread_id=session_id)
             self.awaiting_confirmation = False
             self.workflow_completed = False
@@ -166,19 +167,31 @@ class SearchChatbotApp:
                 logging.error(f"Error closing workflow: {e}")
             self.workflow = None
         
-        try:
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-        except ImportError:
-            pass
+        # Only a process that already loaded torch can hold CUDA memory
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
         logging.info("Cleanup done.")
 
+def preload_workflow():
+    # Import the LangChain/LangGraph stack in the background while the UI is built and served;
+    # the first request then finds it in sys.modules
+    def _import():
+        try:
+            importlib.import_module("core.workflow")
+        except Exception as e:
+            logging.warning(f"Background import of core.workflow failed: {e}")
+    
+    threading.Thread(target=_import, name="preload-workflow", daemon=True).start()
+
+
 def create_demo():
+    import gradio as gr
+    
     app = SearchChatbotApp()
     
-    blueprints = get_carla_blueprints()
-    maps = get_carla_maps()
-    print(f"Loaded {len(blueprints)} blueprints and {len(maps)} maps.")
+    catalog = CarlaCatalog.load()
+    print(f"Loaded {len(catalog.blueprints)} blueprints and {len(catalog.maps)} maps ({catalog.source}, {catalog.built_at}).")
     
 
     with gr.Blocks(title="Scenic Scenario Search", theme=gr.themes.Soft(), css=".center-row { align-items: center !important; }")as demo:
@@ -241,6 +254,8 @@ def create_demo():
     return demo, app
 
 if __name__ == "__main__":
+    # Started first so the import overlaps with building the UI
+    preload_workflow()
     demo, app = create_demo()
     
     try:
@@ -1,7 +1,60 @@
 import json
-from typing import Dict, Any
+import logging
+import re
+import time
+from typing import Dict, Any, Optional
 from .base import BaseAgent
+from core.cascade import get_cascade_metrics
+from core.config import get_settings
 from core.prompts import load_prompt
+from core.map_registry import get_map_registry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Queries asking for header content beyond the six standard lines still go to the LLM
+_NONSTANDARD_HEADER_RE = re.compile(
+    r"\b(header|params?|parameters?|timestep|time step|render(?:ing)?|import|simulator (?:address|port))\b", re.I
+)
+_PARAM_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def render_header(
+    description: str,
+    carla_map: str,
+    map_file_path: str,
+    blueprint: str,
+    weather: str,
+    params: Optional[Dict[str, Any]] = None
+) -> str:
+    """Standard Scenic header; ``params`` are appended as extra ``param`` lines."""
+    # A JSON string is a valid Scenic/Python string literal, so quotes, backslashes and newlines are escaped
+    description = json.dumps(" ".join(description.split()), ensure_ascii=False)
+    lines = [
+        f"description = {description}",
+        f"param map = localPath({map_file_path!r})",
+        f"param carla_map = {carla_map!r}",
+        "model scenic.simulators.carla.model",
+        f"MODEL = {blueprint!r}",
+        f"param weather = {weather!r}"
+    ]
+    return "\n".join(lines + _param_lines(params))
+
+
+def _param_lines(params: Optional[Dict[str, Any]], header: str = "") -> list:
+    """``param`` lines for ``params``, leaving out those ``header`` already sets."""
+    lines = []
+    for name, value in (params or {}).items():
+        if re.search(rf"^\s*param\s+{re.escape(name)}\s*=", header, re.M):
+            continue
+        if name in ("map", "carla_map", "weather") or not _PARAM_NAME_RE.match(name):
+            logger.warning(f"Ignoring header param {name!r}")
+            continue
+        if not isinstance(value, (str, int, float, bool)):
+            logger.warning(f"Ignoring header param {name!r}: unsupported value {value!r}")
+            continue
+        lines.append(f"param {name} = {value!r}")
+    return lines
 
 
 class HeaderGeneratorAgent(BaseAgent):
@@ -17,49 +70,58 @@ class HeaderGeneratorAgent(BaseAgent):
     def process(
         self,
         user_query: str,
-        carla_map: str = "Town05",
+        carla_map: str = settings.MAP,
         blueprint: str = "vehicle.lincoln.mkz_2017",
-        weather: str = "ClearNoon"
+        weather: str = "ClearNoon",
+        description: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        return self.generate_header(user_query, carla_map, blueprint, weather)
+        return self.generate_header(user_query, carla_map, blueprint, weather, description, params)
     
     def generate_header(
         self,
         user_query: str,
         carla_map: str,
         blueprint: str,
-        weather: str
+        weather: str,
+        description: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        map_file_path = f"../../maps/{carla_map}.xodr"
-        response = self.invoke(context={
+        map_file_path = get_map_registry().map_file_path(carla_map)
+        description = description or user_query
+        
+        if settings.HEADER_GENERATION == "template" and not _NONSTANDARD_HEADER_RE.search(user_query):
+            return {
+                "code": render_header(description, carla_map, map_file_path, blueprint, weather, params),
+                "description": description,
+                "is_generated": True,
+                "scenario_id": "TEMPLATE_HEADER"
+            }
+        
+        context = {
             "user_query": user_query,
             "carla_map": carla_map,
             "map_file_path": map_file_path,
             "blueprint": blueprint,
             "weather": weather
-        })
+        }
+        
+        # Cheap tiers first; a response that is not the expected JSON goes to the next tier
+        for tier in self.cascade():
+            start = time.time()
+            response = self.invoke(context=context, tier=tier)
+            escalate = tier is not None and not self._is_valid_response(response)
+            get_cascade_metrics().record(type(self).__name__, tier, escalate, time.time() - start)
+            if not escalate:
+                break
+            logger.info(f"Escalating header generation from {tier.name}: invalid response")
         
         try:
             response_text = response.strip()
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            elif response_text.startswith("```"):
-                response_text = response_text[3:]
-            
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
-            
-            result = json.loads(response_text)
-            
-            required_fields = ["code", "description"]
-            for field in required_fields:
-                if field not in result:
-                    raise ValueError(f"Missing required field: {field}")
+            result = self._parse_response(response)
             
             return {
-                "code": result["code"],
+                "code": "\n".join([result["code"].rstrip()] + _param_lines(params, result["code"])),
                 "description": result["description"],
                 "is_generated": True,
                 "scenario_id": "GENERATED_HEADER"
@@ -69,13 +131,11 @@ class HeaderGeneratorAgent(BaseAgent):
             print(f"[ERROR] Failed to parse header generation response as JSON: {e}")
             print(f"[DEBUG] Response text: {response_text[:500]}...")
             
-            fallback_code = self._generate_fallback_header(
-                user_query, carla_map, map_file_path, blueprint, weather
-            )
+            fallback_code = render_header(description, carla_map, map_file_path, blueprint, weather, params)
             
             return {
                 "code": fallback_code,
-                "description": user_query,
+                "description": description,
                 "is_generated": True,
                 "scenario_id": "GENERATED_HEADER_FALLBACK"
             }
@@ -83,29 +143,36 @@ class HeaderGeneratorAgent(BaseAgent):
         except Exception as e:
             print(f"[ERROR] Unexpected error in generate_header: {e}")
             
-            fallback_code = self._generate_fallback_header(
-                user_query, carla_map, map_file_path, blueprint, weather
-            )
+            fallback_code = render_header(description, carla_map, map_file_path, blueprint, weather, params)
             
             return {
                 "code": fallback_code,
-                "description": user_query,
+                "description": description,
                 "is_generated": True,
                 "scenario_id": "GENERATED_HEADER_FALLBACK"
             }
     
-    def _generate_fallback_header(
-        self,
-        user_query: str,
-        carla_map: str,
-        map_file_path: str,
-        blueprint: str,
-        weather: str
-    ) -> str:
-        return f"""description = "{user_query}"
-param map = localPath('{map_file_path}')
-param carla_map = '{carla_map}'
-model scenic.simulators.carla.model
-MODEL = '{blueprint}'
-param weather = '{weather}'"""
-
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        response_text = response.strip()
+        if response_text.startswith("```json"):
+            response_text = response_text[7:]
+        elif response_text.startswith("```"):
+            response_text = response_text[3:]
+        
+        if response_text.endswith("```"):
+            response_text = response_text[:-3]
+        
+        result = json.loads(response_text.strip())
+        
+        required_fields = ["code", "description"]
+        for field in required_fields:
+            if field not in result:
+                raise ValueError(f"Missing required field: {field}")
+        return result
+    
+    def _is_valid_response(self, response: str) -> bool:
+        try:
+            self._parse_response(response)
+            return True
+        except Exception:
+            return False
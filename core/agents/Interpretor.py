@@ -1,11 +1,14 @@
+import json
+from typing import Optional, Tuple
 from langchain_core.messages import HumanMessage
 from .base import BaseAgent
 from core.prompts import load_prompt
 from utilities.AgentLogger import get_agent_logger
+from utilities.parser import parse_json_from_text
 
 class Interpretor(BaseAgent):
-    def __init__(self):
-        prompt = load_prompt("interpretor")
+    def __init__(self, prompt: str = None):
+        prompt = prompt or load_prompt("interpretor")
         
         super().__init__(
             prompt_template=prompt
@@ -15,6 +18,10 @@ class Interpretor(BaseAgent):
         response = self.invoke(context={"scenic_code": user_query})
         return response.strip()
     
+    def interpret(self, user_query: str) -> Tuple[str, Optional[dict]]:
+        """Logical structure JSON, and the scenario settings when this agent detects them too."""
+        return self.process(user_query), None
+    
     def adapt(self, original_query: str, current_interpretation: str, user_feedback: str) -> str:
         prompt = f"""Your task is to update the high-level logical structure of the scenario based on user feedback.
 
@@ -85,3 +92,18 @@ class Interpretor(BaseAgent):
         
         return response_content
 
+
+class FusedInterpretor(Interpretor):
+    """Interpretor whose single call also returns the scenario settings, saving the settings detector's round trip."""
+    
+    def __init__(self):
+        super().__init__(f"{load_prompt('interpretor')}\n\n{load_prompt('interpretor_settings')}")
+    
+    def interpret(self, user_query: str) -> Tuple[str, Optional[dict]]:
+        response = self.process(user_query)
+        interpretation = parse_json_from_text(response)
+        detected_settings = interpretation.pop("settings", None) if isinstance(interpretation, dict) else None
+        if not isinstance(detected_settings, dict):
+            print("[WARNING] Fused interpretation returned no settings object; settings will be detected separately")
+            return response, None
+        return json.dumps(interpretation, indent=2, ensure_ascii=False), detected_settings
@@ -1,14 +1,19 @@
 from abc import ABC, abstractmethod
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain.chat_models import init_chat_model
 from typing import Any, Dict
 from typing import Optional
 import re
 
+from core.cascade import ModelTier, cascade_tiers
 from core.config import get_settings
+from core.http_clients import get_chat_model
+from core.llm_governor import get_llm_governor
+from core.ollama_pool import get_ollama_pool
+from core.prompt_cache import get_prompt_cache, split_template
 from core.prompts import load_prompt
-from core.milvus_client import MilvusClient
+from core.request_policy import get_request_policy
+from core.single_flight import get_single_flight, prompt_key
 from utilities.AgentLogger import get_agent_logger
 
 settings = get_settings()
@@ -21,38 +26,81 @@ class BaseAgent(ABC):
         self.prompt_template_str = prompt_template  # Store original template string for logging
         self.model_name = model_name or settings.LLM_MODEL_NAME
         self.model_provider = model_provider or settings.LLM_PROVIDER
-        
-        if self.model_provider == "ollama":
-            self.llm = init_chat_model(
-                self.model_name, 
-                model_provider=self.model_provider, 
-                base_url=settings.OLLAMA_URL
-            )
-        else:
-            self.llm = init_chat_model(self.model_name, model_provider=self.model_provider, include_thoughts=think_mode,
-             api_key=settings.GOOGLE_API_KEY if self.model_provider == "google_genai" else settings.OPENAI_API_KEY)
+        self.think_mode = think_mode
+        self.llm = self._create_llm(self.model_name, self.model_provider)
+        self._tier_llms = {}
     
-        self.vector_store = MilvusClient() if use_rag else None
+        self.vector_store = None
+        if use_rag:
+            from core.milvus_client import MilvusClient
+            
+            self.vector_store = MilvusClient()
         self.last_formatted_prompt: Optional[str] = None  # Store last formatted prompt for logging
         self.last_response: Optional[str] = None  # Store last response for logging
         self.last_context: Optional[Dict] = None  # Store last context for logging
 
+    def _create_llm(self, model_name: str, model_provider: str):
+        # Every call goes through the process-wide rate governor
+        if model_provider == "ollama":
+            # Spread over the configured Ollama servers
+            llm = get_ollama_pool().chat_model(model_name)
+        else:
+            # Shared with every agent using the same model, connection pool included
+            llm = get_chat_model(model_name, model_provider, include_thoughts=self.think_mode,
+                 api_key=settings.GOOGLE_API_KEY if model_provider == "google_genai" else settings.OPENAI_API_KEY)
+        return get_llm_governor().wrap(llm, model_provider, model_name)
+    
+    def cascade(self, key: str = None) -> list:
+        """Model tiers to try in order: the cheap ones configured in LLM_CASCADE, then this agent's model (None)."""
+        return [*cascade_tiers(key or type(self).__name__), None]
+    
+    def _llm_for(self, tier: Optional[ModelTier]):
+        if tier is None:
+            return self.llm
+        if tier not in self._tier_llms:
+            self._tier_llms[tier] = self._create_llm(tier.model, tier.provider)
+        return self._tier_llms[tier]
+    
     @abstractmethod
     def process(self, **kwargs) -> Any:
         pass
     
-    def invoke(self, context: Dict = None) -> str:
-        formatted_prompt = self.prompt_template.format(**context) 
+    def invoke(self, context: Dict = None, tier: Optional[ModelTier] = None) -> str:
+        # Component prompts swap in plain template strings; the others are ChatPromptTemplates
+        template = self.prompt_template if isinstance(self.prompt_template, str) else self.prompt_template_str
+        prompt_cache = get_prompt_cache()
+        prefix, suffix_template = split_template(template)
+        use_prefix_cache = prompt_cache.applies_to(prefix)
+        if use_prefix_cache:
+            suffix = suffix_template.format(**context)
+            formatted_prompt = prefix + suffix
+        else:
+            formatted_prompt = self.prompt_template.format(**context)
 
         retrieved_context = self.retrieve_context(formatted_prompt)
 
         if retrieved_context:
             formatted_prompt += f"\n\nRelevant Context:\n{retrieved_context}"
-        
+            if use_prefix_cache:
+                suffix += f"\n\nRelevant Context:\n{retrieved_context}"
+
         self.last_formatted_prompt = formatted_prompt
         self.last_context = context
-        
-        response = self.llm.invoke([HumanMessage(content=formatted_prompt)])
+
+        llm = self._llm_for(tier)
+        model_provider = tier.provider if tier else self.model_provider
+        model_name = tier.model if tier else self.model_name
+        if use_prefix_cache:
+            send = lambda: prompt_cache.invoke(type(self).__name__, llm, model_provider, model_name, prefix, suffix)
+        else:
+            send = lambda: llm.invoke([HumanMessage(content=formatted_prompt)])
+        # Deadline, retries of transient errors and hedging of slow calls
+        policy_send = lambda: get_request_policy().call(type(self).__name__, f"{model_provider}:{model_name}", send)
+        if settings.SINGLE_FLIGHT:
+            # Identical prompts already in flight (e.g. the same example query in two sessions) share one request
+            response = get_single_flight("llm").do(prompt_key(model_provider, model_name, formatted_prompt), policy_send)
+        else:
+            response = policy_send()
         response_content = response.content
         
         # Handle Gemini thinking mode response (list with thinking + response parts)
@@ -72,8 +120,8 @@ class BaseAgent(ABC):
         agent_logger = get_agent_logger()
         if agent_logger:
             metadata = {
-                "model_name": self.model_name,
-                "model_provider": self.model_provider,
+                "model_name": tier.model if tier else self.model_name,
+                "model_provider": tier.provider if tier else self.model_provider,
                 "use_rag": self.vector_store is not None,
                 "retrieved_context_length": len(retrieved_context) if retrieved_context else 0
             }
@@ -87,6 +135,9 @@ class BaseAgent(ABC):
             if hasattr(self, '_retrieved_code') and self._retrieved_code:
                 metadata["retrieved_code"] = self._retrieved_code
             
+            if getattr(self, '_prompt_size', None):
+                metadata["prompt_tokens"] = self._prompt_size
+            
             agent_logger.log_agent_interaction(
                 agent_name=self.__class__.__name__,
                 system_prompt=self.prompt_template_str,
@@ -1,15 +1,20 @@
-import json
 import re
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base import BaseAgent
+from core.cascade import ModelTier
+from core.config import get_settings
 from core.prompts import load_prompt
-from core.milvus_client import MilvusClient
+from core.documentation_cache import DocumentationCache, recorded_corpus_version, search_documentation
+from core.example_store import get_example_store
+from core.prompt_budget import PromptItem, PromptSection, budget_for, fit_to_budget, summarize_code
 from core.scenario_milvus_client import ScenarioMilvusClient
 
+settings = get_settings()
+
 
 class ComponentGeneratorAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, scenario_client: Optional[ScenarioMilvusClient] = None, doc_client=None):
         prompt = load_prompt("component_generator")
         super().__init__(
             prompt_template=prompt,
@@ -26,60 +31,133 @@ class ComponentGeneratorAgent(BaseAgent):
             "requirement": load_prompt("component_generator_requirement"),
             "default": prompt
         }
+        self.repair_prompt = load_prompt("component_repair")
+        # Last reference lookup, reused when the same component is repaired
+        self._last_references = (None, None)
+        # Token counts of the last prompt, per section; logged with the interaction
+        self._prompt_size = None
         
-        self.scenario_client = None
-        self.doc_client = None
-        
-        try:
-            self.scenario_client = ScenarioMilvusClient(collection_name="scenario_components_with_subject")
-            print("[WARNING] ComponentGeneratorAgent: Initialized ScenarioMilvusClient")
-        except Exception as e:
-            print(f"[WARNING] ComponentGeneratorAgent: Failed to initialize ScenarioMilvusClient: {e}")
-        
-        try:
-            self.doc_client = MilvusClient(collection_name="documentation", embedding_provider="google_genai", embedding_model_name="models/gemini-embedding-001")
-            print("[WARNING] ComponentGeneratorAgent: Initialized documentation MilvusClient")
-        except Exception as e:
-            print(f"[WARNING] ComponentGeneratorAgent: Failed to initialize documentation client: {e}")
+        # Clients passed in by the caller are shared and closed by the caller;
+        # missing ones are created on first use and owned by this agent
+        self._scenario_client = scenario_client
+        self._doc_client = doc_client
+        self._owned_clients = []
+        self._failed_clients = set()
+        self.documentation_cache = DocumentationCache()
+        self._doc_corpus_version = None
+    
+    @property
+    def scenario_client(self) -> Optional[ScenarioMilvusClient]:
+        if self._scenario_client is None and "scenario" not in self._failed_clients:
+            try:
+                self._scenario_client = ScenarioMilvusClient(collection_name="scenario_components_with_subject")
+                self._owned_clients.append(self._scenario_client)
+                print("[WARNING] ComponentGeneratorAgent: Initialized ScenarioMilvusClient")
+            except Exception as e:
+                self._failed_clients.add("scenario")
+                print(f"[WARNING] ComponentGeneratorAgent: Failed to initialize ScenarioMilvusClient: {e}")
+        return self._scenario_client
+    
+    @property
+    def doc_client(self):
+        if self._doc_client is None and "documentation" not in self._failed_clients:
+            try:
+                from core.milvus_client import MilvusClient
+                
+                self._doc_client = MilvusClient(
+                    collection_name=settings.DOCUMENTATION_COLLECTION,
+                    embedding_provider=settings.DOCUMENTATION_EMBEDDING_PROVIDER,
+                    embedding_model_name=settings.DOCUMENTATION_EMBEDDING_MODEL
+                )
+                self._owned_clients.append(self._doc_client)
+                print("[WARNING] ComponentGeneratorAgent: Initialized documentation MilvusClient")
+            except Exception as e:
+                self._failed_clients.add("documentation")
+                print(f"[WARNING] ComponentGeneratorAgent: Failed to initialize documentation client: {e}")
+        return self._doc_client
     
     def process(
         self,
         component_type: str,
         user_criteria: str,
-        ready_components: Dict[str, Any] = None
+        ready_components: Dict[str, Any] = None,
+        repair: Optional[Dict[str, str]] = None,
+        tier: Optional[ModelTier] = None
     ) -> Dict[str, Any]:
-        return self.generate_component(component_type, user_criteria, ready_components)
+        return self.generate_component(component_type, user_criteria, ready_components, repair, tier)
     
     def generate_component(
         self,
         component_type: str,
         user_criteria: str,
-        ready_components: Dict[str, Any] = None
+        ready_components: Dict[str, Any] = None,
+        repair: Optional[Dict[str, str]] = None,
+        tier: Optional[ModelTier] = None
     ) -> Dict[str, Any]:
+        """Generate one component; ``repair`` ({"code", "error"}) regenerates a component that failed to parse.
+        
+        ``tier`` selects a cascade model instead of the agent's own.
+        """
         if ready_components is None:
             ready_components = {}
         
         prompt_key = self._get_prompt_key(component_type)
         selected_prompt = self.prompts.get(prompt_key, self.prompts["default"])
+        if repair:
+            selected_prompt = f"{selected_prompt}\n\n{self.repair_prompt}"
         
         original_prompt = self.prompt_template
         self.prompt_template = selected_prompt
         
-        reference_components = self._get_reference_components(user_criteria, component_type)
-        
-        # documentation = self._get_documentation(component_type)
-        
-        ready_components_str = self._format_ready_components(ready_components)
+        ready_section = PromptSection(
+            "ready_components", self._ready_component_items(ready_components), empty="No components are ready yet."
+        )
+        reference_section = PromptSection(
+            "reference_components",
+            self._reference_items(self._get_reference_components(user_criteria, component_type)),
+            empty="# No reference components found"
+        )
+        sections = [ready_section, reference_section]
+        # Served from the documentation cache; only prompts with a documentation slot use it
+        if "{documentation}" in selected_prompt:
+            documentation = self._get_documentation(component_type) if settings.COMPONENT_DOCUMENTATION else ""
+            # Trimmed before anything else when the prompt is over budget
+            sections.append(PromptSection(
+                "documentation",
+                [PromptItem(documentation, value=0.2)] if documentation else [],
+                empty="# No documentation included"
+            ))
         
-        response = self.invoke(context={
+        context = {
             "component_type": component_type,
             "user_criteria": user_criteria,
-            "ready_components": ready_components_str,
-            "reference_components": reference_components,
-            # "documentation": documentation
-        })
+        }
+        if repair:
+            context["previous_code"] = repair["code"]
+            context["validation_error"] = repair["error"]
+        if "{examples}" in selected_prompt:
+            context["examples"] = get_example_store().render(prompt_key, user_criteria, settings.COMPONENT_EXAMPLES_K)
         
-        self.prompt_template = original_prompt
+        # Ready components, references and documentation are the sections that grow; they are trimmed to the budget
+        fixed_text = selected_prompt.format(**context, **{section.name: "" for section in sections})
+        self._prompt_size = fit_to_budget(fixed_text, sections, budget_for(type(self).__name__))
+        if self._prompt_size["summarized"] or self._prompt_size["dropped"]:
+            logging.info(
+                f"✂️ {component_type} prompt trimmed to ~{self._prompt_size['total']} tokens "
+                f"(budget {self._prompt_size['budget']}): {self._prompt_size['summarized']} summarized, "
+                f"{self._prompt_size['dropped']} dropped"
+            )
+        for section in sections:
+            context[section.name] = section.render()
+        
+        try:
+            response = self.invoke(context=context, tier=tier)
+        except Exception as e:
+            # Deadline or retries exhausted; an empty component escalates to the next tier
+            logging.error(f"[ERROR] {component_type} generation failed: {e}")
+            response = ""
+        finally:
+            self.prompt_template = original_prompt
         
         try:
             response_text = response.strip()
@@ -135,24 +213,48 @@ class ComponentGeneratorAgent(BaseAgent):
         
         return "default"
     
-    def _format_ready_components(self, ready_components: Dict[str, Any]) -> str:
-        if not ready_components:
-            return "No components are ready yet."
-        
-        formatted_parts = []
+    # Trimming priority of already determined components; adversarials rank below these, oldest lowest
+    READY_COMPONENT_VALUES = {"Header": 5.0, "Spatial Relation": 4.0, "Ego": 3.0}
+    
+    def _ready_component_items(self, ready_components: Dict[str, Any]) -> List[PromptItem]:
+        items = []
         for comp_type, comp_code in ready_components.items():
             if isinstance(comp_code, list):
                 for i, code in enumerate(comp_code):
-                    formatted_parts.append(f"## {comp_type} {i+1} ##\n{code}\n")
+                    items.append(PromptItem(
+                        f"## {comp_type} {i+1} ##\n{code}\n",
+                        value=1.0 + i / len(comp_code),
+                        summarize=summarize_code
+                    ))
             else:
-                formatted_parts.append(f"## {comp_type} ##\n{comp_code}\n")
-        
-        return "\n".join(formatted_parts)
+                items.append(PromptItem(
+                    f"## {comp_type} ##\n{comp_code}\n",
+                    value=self.READY_COMPONENT_VALUES.get(comp_type, 2.0),
+                    summarize=summarize_code,
+                    # Later components refer to the names these define
+                    droppable=comp_type not in self.READY_COMPONENT_VALUES
+                ))
+        return items
     
-    def _get_reference_components(self, query: str, component_type: str, limit: int = 3) -> str:
-
+    def _reference_items(self, references: List[str]) -> List[PromptItem]:
+        # The best match is kept over old adversarials; the others go first
+        return [
+            PromptItem(reference, value=2.5 if rank == 0 else 0.5 - rank / 10)
+            for rank, reference in enumerate(references)
+        ]
+    
+    def _get_reference_components(self, query: str, component_type: str, limit: int = 3) -> List[str]:
+        key = (query, component_type, limit)
+        if self._last_references[0] == key:
+            return self._last_references[1]
+        references = self._search_reference_components(query, component_type, limit)
+        self._last_references = (key, references)
+        return references
+    
+    def _search_reference_components(self, query: str, component_type: str, limit: int) -> List[str]:
+        """Formatted references, best match first."""
         if not self.scenario_client:
-            return "# No reference components available"
+            return []
         
         try:
             results = self.scenario_client.search_components_by_type(
@@ -161,49 +263,44 @@ class ComponentGeneratorAgent(BaseAgent):
                 limit=limit
             )
             
-            if not results:
-                return "# No reference components found"
-            
             formatted_refs = []
-            for idx, hit in enumerate(results, 1):
+            for idx, hit in enumerate(results or [], 1):
                 entity = hit.entity
                 code = entity.get("code", "")
                 description = entity.get("description", "")
-                
-                ref_json = {
-                    "Description": description,
-                    "Code": code,
-                }
-                formatted_refs.append(f"{json.dumps(ref_json, indent=2)}\n")
+                # Plain text instead of JSON: no escaped quotes and newlines in the code
+                formatted_refs.append(f"# Reference {idx}: {description}\n{code}\n")
             
-            return "\n".join(formatted_refs)
+            return formatted_refs
             
         except Exception as e:
             print(f"[ERROR] Failed to retrieve reference components: {e}")
-            return "# Error retrieving reference components"
+            return []
+    
+    def _corpus_version(self) -> Optional[str]:
+        """Corpus version recorded by the last ingestion, read once per agent; None serves the cache as is.
+
+        Read from disk, so a warm cache never builds the documentation client.
+        """
+        if self._doc_corpus_version is None:
+            self._doc_corpus_version = recorded_corpus_version()
+        return self._doc_corpus_version
     
     def _get_documentation(self, component_type: str, top_k: int = 5) -> str:
+        corpus_version = self._corpus_version()
+        cached = self.documentation_cache.get(component_type, corpus_version)
+        if cached is not None:
+            return cached
         if not self.doc_client:
             return "# No documentation available"
         try:
-            component_search_terms = {
-                "Ego": "Ego,behavior,operators, specifiers",
-                "Adversarial": "Adversarial,behavior,operators, specifiers",
-                "Spatial Relation": "network,egoSpawnPt,intersection,egoTrajectory,advSpawnPt,advTrajectory",
-                "Requirement and restrictions": "require,terminate,TrafficLight"
-            }
-            
-            search_terms = component_search_terms.get(component_type, component_type)
-            
-            results = self.doc_client.search(search_terms, ranker_type="rrf", ranker_params={"k": 5})
-            if not results:
-                return "# No relevant documentation found"
-            
-            doc_contents = []
-            for idx, doc in enumerate(results[:top_k], 1):
-                content = doc.page_content
-                doc_contents.append(f"{content}\n")
-            return "\n".join(doc_contents)
+            # A new corpus version rebuilds the snippets of every component type at once
+            self.documentation_cache.build(self.doc_client, top_k=top_k)
+            documentation = self.documentation_cache.get(component_type)
+            if documentation is None:
+                documentation = search_documentation(self.doc_client, component_type, top_k)
+                self.documentation_cache.put(component_type, documentation, self.documentation_cache.corpus_version)
+            return documentation
             
         except Exception as e:
             print(f"[ERROR] Failed to retrieve documentation: {e}")
@@ -211,9 +308,8 @@ class ComponentGeneratorAgent(BaseAgent):
     
     def close(self):
         try:
-            if self.scenario_client:
-                self.scenario_client.close()
-            if self.doc_client:
-                self.doc_client.close()
+            for client in self._owned_clients:
+                client.close()
+            self._owned_clients = []
         except Exception as e:
             print(f"[WARNING] Error closing ComponentGeneratorAgent resources: {e}")
\ No newline at end of file
@@ -1,7 +1,19 @@
 import json
+import logging
+import time
 from typing import Dict, Any
 from .base import BaseAgent
+from core.cascade import ModelTier, get_cascade_metrics
+from core.config import get_settings
 from core.prompts import load_prompt
+from core.road_topology import get_road_topology
+from core.settings_classifier import get_settings_classifier
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Reported alongside the LLM tiers in the cascade metrics
+RULES_TIER = ModelTier("local", "settings_classifier")
 
 
 class SettingsDetectorAgent(BaseAgent):
@@ -20,33 +32,33 @@ class SettingsDetectorAgent(BaseAgent):
         return self.detect_settings(user_query)
     
     def detect_settings(self, user_query: str) -> Dict[str, Any]:
-        response = self.invoke(context={
-            "user_query": user_query
-        })
+        # Most queries name their settings with a few known phrases; only ask the LLM when the rules are unsure
+        if settings.SETTINGS_FAST_PATH_MIN_CONFIDENCE <= 1.0:
+            start = time.perf_counter()
+            result = get_settings_classifier().classify(user_query)
+            resolved = result.pop("resolved") and (
+                result["confidence"] == 0.0 or result["confidence"] >= settings.SETTINGS_FAST_PATH_MIN_CONFIDENCE
+            )
+            get_cascade_metrics().record(type(self).__name__, RULES_TIER, not resolved, time.perf_counter() - start)
+            if resolved:
+                logger.info(f"Settings resolved locally (confidence {result['confidence']:.2f}), skipping the LLM")
+                return result
+            logger.info("Settings classifier unsure, asking the LLM")
+        
+        # Cheap tiers first; unparseable or low-confidence detections go to the next tier
+        for tier in self.cascade():
+            start = time.time()
+            response = self.invoke(context={"user_query": user_query}, tier=tier)
+            escalate = tier is not None and self._is_uncertain(response)
+            get_cascade_metrics().record(type(self).__name__, tier, escalate, time.time() - start)
+            if not escalate:
+                break
+            logger.info(f"Escalating settings detection from {tier.name}: low confidence or invalid response")
         
         try:
             response_text = response.strip()
-            
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            elif response_text.startswith("```"):
-                response_text = response_text[3:]
-            
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
-            result = json.loads(response_text)
-            
-            return {
-                "weather": result.get("weather"),
-                "map_type": result.get("map_type"),
-                "suggested_map": result.get("suggested_map"),
-                "time_of_day": result.get("time_of_day"),
-                "blueprint": result.get("blueprint"),
-                "confidence": result.get("confidence", 0.5),
-                "reasoning": result.get("reasoning", "")
-            }
+            result = self._parse_response(response)
+            return self.finalize(result, user_query)
             
         except json.JSONDecodeError as e:
             print(f"[ERROR] Failed to parse settings detection response: {e}")
@@ -57,6 +69,50 @@ class SettingsDetectorAgent(BaseAgent):
             print(f"[ERROR] Unexpected error in detect_settings: {e}")
             return self._get_default_settings()
     
+    def finalize(self, result: Dict[str, Any], user_query: str) -> Dict[str, Any]:
+        """Normalise an LLM settings object and check its map against the road features the query names."""
+        suggested_map, map_reason = get_road_topology().select_map(user_query, result.get("suggested_map"))
+        reasoning = result.get("reasoning") or ""
+        try:
+            confidence = float(result.get("confidence", 0.5))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        if suggested_map != result.get("suggested_map"):
+            logger.info(f"Map {result.get('suggested_map')} replaced by {suggested_map}: {map_reason}")
+        if map_reason:
+            reasoning = f"{reasoning} Road topology: {map_reason}.".strip()
+        
+        return {
+            "weather": result.get("weather"),
+            "map_type": result.get("map_type"),
+            "suggested_map": suggested_map,
+            "time_of_day": result.get("time_of_day"),
+            "blueprint": result.get("blueprint"),
+            "confidence": confidence,
+            "reasoning": reasoning
+        }
+    
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        response_text = response.strip()
+        
+        if response_text.startswith("```json"):
+            response_text = response_text[7:]
+        elif response_text.startswith("```"):
+            response_text = response_text[3:]
+        
+        if response_text.endswith("```"):
+            response_text = response_text[:-3]
+        
+        return json.loads(response_text.strip())
+    
+    def _is_uncertain(self, response: str) -> bool:
+        try:
+            confidence = float(self._parse_response(response).get("confidence", 0.5))
+        except Exception:
+            return True
+        # 0.0 means the query names no settings at all; a stronger model will not find more
+        return 0.0 < confidence < settings.CASCADE_MIN_CONFIDENCE
+    
     def _get_default_settings(self) -> Dict[str, Any]:
         return {
             "weather": None,
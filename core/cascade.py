@@ -0,0 +1,77 @@
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    provider: str
+    model: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+    @classmethod
+    def parse(cls, spec: str) -> "ModelTier":
+        # Only the first colon separates the provider; Ollama tags contain colons too
+        provider, _, model = spec.partition(":")
+        if not model:
+            raise ValueError(f"Cascade tier '{spec}' must look like 'provider:model'")
+        return cls(provider, model)
+
+
+def cascade_tiers(key: str) -> list:
+    """Cheaper models to try for ``key`` before the agent's own model, in order."""
+    tiers = []
+    for spec in settings.LLM_CASCADE.get(key, []):
+        try:
+            tiers.append(ModelTier.parse(spec))
+        except ValueError as e:
+            logger.warning(str(e))
+    return tiers
+
+
+class CascadeMetrics:
+    """Per-key counts of attempts and escalations, and latency, for every model tier."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: defaultdict(lambda: {"attempts": 0, "escalations": 0, "latency": 0.0}))
+
+    def record(self, key: str, tier: Optional[ModelTier], escalated: bool, latency: float):
+        name = tier.name if tier else "default"
+        with self._lock:
+            stats = self._stats[key][name]
+            stats["attempts"] += 1
+            stats["escalations"] += int(escalated)
+            stats["latency"] += latency
+
+    def snapshot(self) -> dict:
+        """Per key and tier; a tier's escalation rate is the share of its outputs passed on to the next tier."""
+        with self._lock:
+            return {
+                key: {
+                    name: {
+                        "attempts": s["attempts"],
+                        "escalations": s["escalations"],
+                        "escalation_rate": s["escalations"] / s["attempts"],
+                        "mean_latency": s["latency"] / s["attempts"]
+                    }
+                    for name, s in tiers.items()
+                }
+                for key, tiers in self._stats.items()
+            }
+
+
+@lru_cache()
+def get_cascade_metrics() -> CascadeMetrics:
+    return CascadeMetrics()
@@ -1,6 +1,5 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-import torch
 
 
 class Settings(BaseSettings):
@@ -18,19 +17,37 @@ class Settings(BaseSettings):
     # OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"  # 1536 dims; ensure matches collection
 
     #  Device
-    DEVICE: str = "cuda" if torch.cuda.is_available() else "cpu"
-    print("using device: " ,DEVICE)
+    DEVICE: str = "auto"  # "cuda", "cpu" or "auto" (resolved through torch when a local model is loaded)
 
     #  Chunking
     MAX_CHUNKS: int = 10 
     CHUNK_SIZE: int = 2000
     CHUNK_OVERLAP: int = 400
+    EMBEDDING_BATCH_SIZE: int = 64  # Chunks per embedding request / Milvus insert
+
+    #  Documentation corpus
+    DOCUMENTATION_COLLECTION: str = "documentation"
+    DOCUMENTATION_EMBEDDING_PROVIDER: str = "google_genai"
+    DOCUMENTATION_EMBEDDING_MODEL: str = "models/gemini-embedding-001"
+    DOCUMENTATION_CACHE_PATH: str = "data/cache/documentation_context.json"
+    DOCUMENTATION_CORPUS_PATH: str = "data/cache/documentation_corpus.json"  # Corpus version recorded by utilities.insert_docs_to_milvus
+    COMPONENT_DOCUMENTATION: bool = True  # Cached documentation snippets in the component prompts (trimmed first under the token budget)
 
     RANKER_TYPE: str = "rrf"
     RANKER_PARAMS: dict = {"k": 60}  
 
     #  Ollama
     OLLAMA_URL: str = "http://10.147.17.157:11434"
+    OLLAMA_URLS: list = []  # Several Ollama servers, balanced by outstanding requests; empty uses OLLAMA_URL
+    OLLAMA_HEALTH_INTERVAL: float = 10.0  # Seconds between health probes of the servers; 0 disables probing
+    OLLAMA_EJECT_AFTER: int = 3  # Consecutive failed requests before a server is ejected
+    OLLAMA_EJECT_SECONDS: float = 30.0  # How long an ejected server is skipped unless a probe finds it back
+
+    #  Shared HTTP connection pools of the chat model clients, one per origin
+    HTTP_POOL_CONNECTIONS: int = 20  # Open connections per origin
+    HTTP_POOL_KEEPALIVE: int = 10  # Idle connections kept alive per origin
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0  # Seconds an idle connection is kept
+    HTTP2: bool = True  # Used when the h2 package is installed and the server negotiates it
     LLM_MODEL_NAME: str =  "gemini-2.5-flash"
 
 
@@ -47,10 +64,52 @@ class Settings(BaseSettings):
     LLM_MAX_TOKENS: int = 4096    # Maximum response length
     LLM_TOP_P: float = 0.9        # Nucleus sampling parameter
     LLM_TOP_K: int = 40           # Top-k sampling parameter
+    # Cheaper "provider:model" tiers tried before an agent's own model, keyed by agent class or component type
+    # ("Spatial Relation", "Ego", "Adversarial", "Requirement and restrictions"),
+    # e.g. {"HeaderGeneratorAgent": ["ollama:qwen2.5-coder:7b"], "Ego": ["ollama:qwen2.5-coder:14b"]}
+    LLM_CASCADE: dict = {}
+    CASCADE_MIN_CONFIDENCE: float = 0.6  # Settings detections below this are escalated
+    SETTINGS_FAST_PATH_MIN_CONFIDENCE: float = 0.8  # Rule-based settings below this go to the LLM; above 1 disables the fast path
+    FUSED_INTERPRETATION: bool = False  # Detect settings in the interpretation call instead of a separate one
+    HEADER_GENERATION: str = "template"  # "template" (LLM only when the query asks for non-standard header content) or "llm"
 
     CARLA_PATH: str = "" 
-    MAP_PATH:str = ""
-    MAP : str = "Town05"
+    CARLA_CATALOG_PATH: str = "data/cache/carla_catalog.json"  # Refresh with: python -m utilities.carla_catalog
+    MAP_PATH:str = ""  # Directory of .xodr maps; empty uses the repo maps/
+    MAP_REGISTRY_PATH: str = "data/cache/map_registry.json"  # Prebuild with: python -m core.map_registry
+    MAP : str = "Town01"  # Needs maps/<MAP>.xodr; Town03 and Town05 ship only a .net.xml
+    ROAD_TOPOLOGY_PATH: str = "maps/road_topology.json"  # Rebuild with: python -m core.road_topology
+
+    #  Scene-sampling check of assembled scenarios
+    SAMPLING_SCENES: int = 0  # Scenes sampled after assembly (e.g. 10); 0 disables the check, which starts a fresh Scenic process
+    SAMPLING_TIME_BUDGET: float = 30.0  # Seconds, compilation included
+    SAMPLING_MAX_ITERATIONS: int = 2000  # Rejection-sampling iterations per scene
+    SAMPLING_MIN_ACCEPTANCE: float = 0.01  # Gate: accepted scenes / samples drawn
+
+    #  Scenic validation worker pool
+    VALIDATION_WORKERS: int = 2
+    VALIDATION_TIMEOUT: float = 10.0  # Seconds per job before the worker is killed
+    VALIDATION_CACHE_SIZE: int = 1024  # Results kept by code hash
+    COMPONENT_REPAIR_RETRIES: int = 2  # Repairs per generated component that fails to parse; -1 disables validation
+    COMPONENT_EXAMPLES_K: int = 1  # Few-shot examples per component prompt, most similar to the criteria; 0 sends all of them
+    # Approximate token budget per agent class for the prompt sections that grow (ready components, references); 0 or missing is unbounded
+    PROMPT_TOKEN_BUDGETS: dict = {"ComponentGeneratorAgent": 12000}
+    # Static prompt prefixes sent through the provider's context cache: "auto" (Gemini explicit caching,
+    # implicit elsewhere), "local" (in-process stand-in) or "off"
+    PROMPT_PREFIX_CACHE: str = "auto"
+    PROMPT_CACHE_MIN_TOKENS: int = 1024  # Shorter prefixes are sent as before; Gemini rejects smaller caches
+    PROMPT_CACHE_TTL: int = 3600  # Seconds a registered prefix lives at the provider
+    PROMPT_CACHE_RETRY_AFTER: float = 300.0  # Seconds a model whose cache registration failed sends full prompts
+    # Process-wide request limits per "provider:model" or "provider": {"rpm": ..., "tpm": ..., "concurrency": ...};
+    # unlisted models are not limited, e.g. {"google_genai": {"rpm": 1000, "tpm": 1000000}}
+    LLM_RATE_LIMITS: dict = {}
+    # Seconds per agent class for an LLM call, retries included; 0 or missing is unbounded
+    LLM_DEADLINES: dict = {"ComponentGeneratorAgent": 180.0, "HeaderGeneratorAgent": 60.0, "SettingsDetectorAgent": 60.0}
+    LLM_RETRIES: int = 2  # Retries of transient LLM errors (timeouts, 5xx, 429)
+    LLM_RETRY_BACKOFF: float = 1.0  # Seconds before the first retry, doubled for each further one
+    LLM_HEDGE_BUDGET: float = 0.1  # Share of an agent's calls that may get a duplicate past the p90 latency; 0 disables hedging
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # Latencies observed before an agent's calls are hedged
+    SINGLE_FLIGHT: bool = True  # Concurrent identical LLM prompts and component searches share one request
     class Config:
         env_file = "././.env"   
 
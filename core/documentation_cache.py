@@ -0,0 +1,156 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+COMPONENT_SEARCH_TERMS = {
+    "Ego": "Ego,behavior,operators, specifiers",
+    "Adversarial": "Adversarial,behavior,operators, specifiers",
+    "Spatial Relation": "network,egoSpawnPt,intersection,egoTrajectory,advSpawnPt,advTrajectory",
+    "Requirement and restrictions": "require,terminate,TrafficLight"
+}
+
+
+def search_documentation(doc_client, component_type: str, top_k: int = 5) -> str:
+    search_terms = COMPONENT_SEARCH_TERMS.get(component_type, component_type)
+    
+    results = doc_client.search(search_terms, ranker_type="rrf", ranker_params={"k": 5})
+    if not results:
+        return "# No relevant documentation found"
+    
+    return "\n".join(f"{doc.page_content}\n" for doc in results[:top_k])
+
+
+def _write_json(path: Path, data: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Written next to the target and renamed over it, so readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def corpus_digest(collection: str, embedding_model: str, contents: list) -> str:
+    """Version of an ingested corpus: changes with any document's content, not just with the chunk count."""
+    digest = hashlib.sha256(f"{collection}\0{embedding_model}".encode("utf-8"))
+    for content_hash in sorted(hashlib.sha256(c.encode("utf-8")).hexdigest() for c in contents):
+        digest.update(content_hash.encode("ascii"))
+    return f"{collection}:{digest.hexdigest()[:16]}"
+
+
+def record_corpus_version(corpus_version: str, path: str = settings.DOCUMENTATION_CORPUS_PATH, **details):
+    _write_json(Path(path), {"corpus_version": corpus_version, "ingested_at": datetime.now().isoformat(), **details})
+
+
+def recorded_corpus_version(path: str = settings.DOCUMENTATION_CORPUS_PATH) -> Optional[str]:
+    """The version the last ingestion recorded, read from disk without opening the vector store."""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8")).get("corpus_version")
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable documentation corpus record {path}: {e}")
+        return None
+
+
+class DocumentationCache:
+    """Documentation snippets per component type, persisted with the corpus version they came from."""
+
+    def __init__(self, path: str = settings.DOCUMENTATION_CACHE_PATH):
+        self.path = Path(path)
+        self.corpus_version: Optional[str] = None
+        self.entries: dict[str, str] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.corpus_version = data.get("corpus_version")
+            self.entries = data.get("documentation", {})
+            logger.info(f"Loaded documentation cache ({len(self.entries)} component types, corpus {self.corpus_version})")
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable documentation cache {self.path}: {e}")
+
+    def save(self):
+        _write_json(self.path, {
+            "corpus_version": self.corpus_version,
+            "built_at": datetime.now().isoformat(),
+            "documentation": self.entries
+        })
+
+    def get(self, component_type: str, corpus_version: Optional[str] = None) -> Optional[str]:
+        """The cached snippet; None when missing or, if ``corpus_version`` is given, built from another version."""
+        if corpus_version is not None and corpus_version != self.corpus_version:
+            return None
+        return self.entries.get(component_type)
+
+    def put(self, component_type: str, documentation: str, corpus_version: str):
+        if corpus_version != self.corpus_version:
+            self.entries = {}
+            self.corpus_version = corpus_version
+        self.entries[component_type] = documentation
+        self.save()
+
+    def build(self, doc_client, force: bool = False, top_k: int = 5, corpus_version: Optional[str] = None) -> bool:
+        """Search the snippets of every component type; skipped when the cache already has this corpus version.
+
+        The version is the one given, else the one the last ingestion recorded, else the collection's own.
+        """
+        corpus_version = corpus_version or recorded_corpus_version() or doc_client.corpus_version()
+        if not force and corpus_version == self.corpus_version and set(COMPONENT_SEARCH_TERMS) <= set(self.entries):
+            logger.info(f"Documentation cache is up to date (corpus {corpus_version})")
+            return False
+        
+        self.corpus_version = corpus_version
+        self.entries = {
+            component_type: search_documentation(doc_client, component_type, top_k)
+            for component_type in COMPONENT_SEARCH_TERMS
+        }
+        self.save()
+        logger.info(f"Built documentation cache for corpus {corpus_version} at {self.path}")
+        return True
+
+
+def main():
+    import argparse
+    from .milvus_client import MilvusClient
+    
+    parser = argparse.ArgumentParser(
+        description="Precompute documentation context per component type"
+    )
+    parser.add_argument(
+        "-f", "--force",
+        action="store_true",
+        help="Rebuild even if the cached corpus version matches"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
+    doc_client = MilvusClient(
+        collection_name=settings.DOCUMENTATION_COLLECTION,
+        embedding_provider=settings.DOCUMENTATION_EMBEDDING_PROVIDER,
+        embedding_model_name=settings.DOCUMENTATION_EMBEDDING_MODEL
+    )
+    try:
+        DocumentationCache().build(doc_client, force=args.force)
+    finally:
+        doc_client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,9 @@
-from typing import Optional, Union
-import torch
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_openai import OpenAIEmbeddings
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from typing import Optional
+import logging
 from .config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 class EmbeddingModel:
     def __init__(
@@ -16,21 +14,26 @@ class EmbeddingModel:
     ):
         self.provider = (provider or settings.EMBEDDING_PROVIDER or "huggingface").lower()
         self.model_name = model_name or settings.EMBEDDING_MODEL
-        self.device = self._get_device(device or settings.DEVICE)
+        self.device = device or settings.DEVICE
         self.embedding = self._initialize_embedding()
 
     def _get_device(self, device: Optional[str] = None) -> str:
-        if device is not None:
+        if device is not None and device != "auto":
             return device
         
+        import torch
+        
         if torch.cuda.is_available():
             return "cuda"
         else:
             return "cpu"
 
-    def _initialize_embedding(self) -> Union[HuggingFaceEmbeddings, OpenAIEmbeddings, GoogleGenerativeAIEmbeddings]:
+    # Provider SDKs are imported by the branch that needs them
+    def _initialize_embedding(self):
         try:
             if self.provider == "openai":
+                from langchain_openai import OpenAIEmbeddings
+                
                 if not settings.OPENAI_API_KEY:
                     raise ValueError("No OPENAI_API_KEY found in settings")
                 return OpenAIEmbeddings(
@@ -39,6 +42,8 @@ class EmbeddingModel:
                 )
             
             elif self.provider == "google_genai":
+                from langchain_google_genai import GoogleGenerativeAIEmbeddings
+                
                 if not settings.GOOGLE_API_KEY:
                     raise ValueError("No GOOGLE_API_KEY found in settings")
                 return GoogleGenerativeAIEmbeddings(
@@ -48,6 +53,10 @@ class EmbeddingModel:
                 )
             
             elif self.provider == "huggingface":
+                from langchain_huggingface import HuggingFaceEmbeddings
+                
+                self.device = self._get_device(self.device)
+                logger.info(f"Using device: {self.device}")
                 return HuggingFaceEmbeddings(
                     model_name=self.model_name,
                     model_kwargs={"device": self.device},
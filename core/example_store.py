@@ -0,0 +1,79 @@
+import json
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+EXAMPLES_PATH = Path(__file__).parent / "prompts" / "component_examples.json"
+
+EXAMPLE_LABELS = {
+    "ego": "ego component",
+    "adv": "adversarial component",
+    "spatial": "spatial relation component",
+    "requirement": "requirement and restrictions component",
+}
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+_STOPWORDS = {"a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "is", "are", "its", "it", "with", "then", "when", "if", "for", "by", "from", "that", "which"}
+
+
+def _tokens(text: str) -> list:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class ExampleStore:
+    """Few-shot examples for the component prompts, selected by similarity to the criteria.
+
+    Each example has a component prompt key (``ego``, ``adv``, ``spatial``,
+    ``requirement``), a description and Scenic code. Descriptions are
+    indexed as TF-IDF vectors per component; ``select`` returns the ``k``
+    examples whose description is closest to the criteria.
+    """
+
+    def __init__(self, path: Path = EXAMPLES_PATH):
+        self.path = Path(path)
+        with open(self.path, encoding="utf-8") as f:
+            self.examples = json.load(f)
+
+        documents = [Counter(_tokens(e["description"])) for e in self.examples]
+        document_frequency = Counter(token for document in documents for token in document)
+        self._idf = {
+            token: math.log((1 + len(documents)) / (1 + count)) + 1
+            for token, count in document_frequency.items()
+        }
+        self._vectors = [self._vector(document) for document in documents]
+
+    def _vector(self, counts: Counter) -> dict:
+        vector = {token: count * self._idf.get(token, 0.0) for token, count in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {token: v / norm for token, v in vector.items()}
+
+    def select(self, component: str, criteria: str, k: int) -> list:
+        """Examples for ``component``, most similar first; ``k <= 0`` returns all of them in file order."""
+        candidates = [i for i, e in enumerate(self.examples) if e["component"] == component]
+        if k <= 0:
+            return [self.examples[i] for i in candidates]
+
+        query = self._vector(Counter(_tokens(criteria)))
+        scored = sorted(
+            candidates,
+            key=lambda i: -sum(w * self._vectors[i].get(token, 0.0) for token, w in query.items())
+        )
+        return [self.examples[i] for i in scored[:k]]
+
+    def render(self, component: str, criteria: str, k: int) -> str:
+        label = EXAMPLE_LABELS.get(component, "component")
+        examples = self.select(component, criteria, k)
+        if not examples:
+            return "# No examples available"
+        return "\n\n".join(
+            f"Example {i} of {label} ({e['description']}):\n{e['code']}"
+            for i, e in enumerate(examples, 1)
+        )
+
+
+@lru_cache()
+def get_example_store(path: Optional[str] = None) -> ExampleStore:
+    return ExampleStore(Path(path) if path else EXAMPLES_PATH)
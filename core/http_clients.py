@@ -0,0 +1,177 @@
+import importlib.util
+import logging
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class ConnectionMetrics:
+    """Per-origin requests and how many of them opened a new connection rather than reusing a pooled one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"requests": 0, "new_connections": 0, "http2": 0})
+
+    def record(self, origin: str, new_connection: bool, http2: bool):
+        with self._lock:
+            stats = self._stats[origin]
+            stats["requests"] += 1
+            stats["new_connections"] += int(new_connection)
+            stats["http2"] += int(http2)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                origin: dict(s, reuse_rate=1 - s["new_connections"] / s["requests"] if s["requests"] else 0.0)
+                for origin, s in self._stats.items()
+            }
+
+
+class CountingTransport:
+    """A pooled httpx transport that tells, per request, whether a connection was opened for it."""
+
+    def __init__(self, origin: str, metrics: ConnectionMetrics, **kwargs):
+        import httpx
+
+        self.origin = origin
+        self.metrics = metrics
+        self._transport = httpx.HTTPTransport(**kwargs)
+
+    def handle_request(self, request):
+        events = set()
+        outer_trace = request.extensions.get("trace")
+
+        def trace(name, info):
+            events.add(name)
+            if outer_trace:
+                outer_trace(name, info)
+
+        request.extensions["trace"] = trace
+        try:
+            return self._transport.handle_request(request)
+        finally:
+            self.metrics.record(
+                self.origin,
+                new_connection="connection.connect_tcp.started" in events,
+                http2=any(name.startswith("http2.") for name in events)
+            )
+
+    def close(self):
+        self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def http2_available() -> bool:
+    # httpx only speaks HTTP/2 with the h2 package installed
+    return settings.HTTP2 and importlib.util.find_spec("h2") is not None
+
+
+class HttpClients:
+    """Shared connection pools and chat model clients.
+
+    There is one keep-alive transport per origin, sized by
+    ``HTTP_POOL_CONNECTIONS`` and ``HTTP_POOL_KEEPALIVE``, with HTTP/2 when
+    ``HTTP2`` is set and h2 is installed. Chat models are built once per
+    provider, model, base URL and options and shared by every agent and
+    session. OpenAI and Ollama clients get the shared transport. Gemini's
+    SDK manages its own channel, which is shared through the model instance.
+    """
+
+    def __init__(self):
+        self.metrics = ConnectionMetrics()
+        self._lock = threading.Lock()
+        self._transports = {}
+        self._async_transports = {}
+        self._models = {}
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    @staticmethod
+    def _pool_options() -> dict:
+        import httpx
+
+        return {
+            "http2": http2_available(),
+            "limits": httpx.Limits(
+                max_connections=settings.HTTP_POOL_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_POOL_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+            )
+        }
+
+    def transport(self, url: str) -> CountingTransport:
+        origin = self._origin(url)
+        with self._lock:
+            if origin not in self._transports:
+                self._transports[origin] = CountingTransport(origin, self.metrics, **self._pool_options())
+            return self._transports[origin]
+
+    def async_transport(self, url: str):
+        """The shared pool for async clients of this origin; its requests are not counted in the metrics."""
+        import httpx
+
+        origin = self._origin(url)
+        with self._lock:
+            if origin not in self._async_transports:
+                self._async_transports[origin] = httpx.AsyncHTTPTransport(**self._pool_options())
+            return self._async_transports[origin]
+
+    def _client_options(self, model_provider: str, base_url: str) -> dict:
+        if model_provider == "ollama":
+            # ChatOllama hands these to the httpx clients inside ollama.Client and ollama.AsyncClient
+            return {
+                "sync_client_kwargs": {"transport": self.transport(base_url)},
+                "async_client_kwargs": {"transport": self.async_transport(base_url)}
+            }
+        if model_provider == "openai":
+            import httpx
+
+            return {"http_client": httpx.Client(transport=self.transport(base_url or "https://api.openai.com"))}
+        return {}
+
+    def chat_model(self, model_name: str, model_provider: str, base_url: str = None, **options):
+        from langchain.chat_models import init_chat_model
+
+        key = (model_provider, model_name, base_url, tuple(sorted(options.items())))
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+        kwargs = dict(options, **self._client_options(model_provider, base_url))
+        if base_url:
+            kwargs["base_url"] = base_url
+        model = init_chat_model(model_name, model_provider=model_provider, **kwargs)
+        with self._lock:
+            # Another thread may have built the same model meanwhile; keep the first one
+            return self._models.setdefault(key, model)
+
+    def close(self):
+        with self._lock:
+            for transport in self._transports.values():
+                transport.close()
+            self._transports.clear()
+            self._async_transports.clear()
+            self._models.clear()
+
+
+@lru_cache()
+def get_http_clients() -> HttpClients:
+    return HttpClients()
+
+
+def get_chat_model(model_name: str, model_provider: str, base_url: str = None, **options):
+    """The shared chat model for these settings; agents wrap it rather than creating their own."""
+    return get_http_clients().chat_model(model_name, model_provider, base_url, **options)
@@ -1,13 +1,15 @@
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import START,END, MessagesState, StateGraph
-from langchain.chat_models import init_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from typing import Literal, TypedDict, Annotated
 from langgraph.graph.message import add_messages
 
 from .config import get_settings
-from utilities.parser import parse_scenic
+from .http_clients import get_chat_model
+from .llm_governor import get_llm_governor
+from .ollama_pool import get_ollama_pool
+from .validation_service import get_validation_pool
 import re
 
 settings = get_settings()
@@ -96,9 +98,10 @@ class LLM:
 
         # Initialize LLM based on provider
         if settings.LLM_PROVIDER == "ollama":
-            self.llm = init_chat_model(settings.LLM_MODEL_NAME, model_provider = settings.LLM_PROVIDER, base_url=settings.OLLAMA_URL)
+            self.llm = get_ollama_pool().chat_model(settings.LLM_MODEL_NAME)
         else:
-            self.llm = init_chat_model(settings.LLM_MODEL_NAME, model_provider = settings.LLM_PROVIDER)
+            self.llm = get_chat_model(settings.LLM_MODEL_NAME, settings.LLM_PROVIDER)
+        self.llm = get_llm_governor().wrap(self.llm, settings.LLM_PROVIDER, settings.LLM_MODEL_NAME)
 
 
 
@@ -201,21 +204,19 @@ class LLM:
         last_message = messages[-1]
         dsl_code = self._extract_code_from_response(last_message.content)
         
-        try:
-            parse_scenic(dsl_code)
-            validation_result = {
-                "valid": True,
-                "error": None,
-                "code": dsl_code
-            }
-            print("✓ DSL validation succeeded.")
-        except Exception as e:
-            validation_result = {
-                "valid": False,
-                "error": str(e),
-                "code": dsl_code
-            }
-            print(f"✗ DSL validation failed: {e}")
+        result = get_validation_pool().validate(dsl_code)
+        error = result.error
+        if error and result.line:
+            error = f"Line {result.line}: {error}"
+        validation_result = {
+            "valid": result.valid,
+            "error": error,
+            "code": dsl_code
+        }
+        if result.valid:
+            print(f"✓ DSL validation succeeded ({result.duration * 1e3:.0f} ms{', cached' if result.cached else ''}).")
+        else:
+            print(f"✗ DSL validation failed: {error}")
         
         return {
             "validation_result": validation_result
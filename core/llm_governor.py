@@ -0,0 +1,324 @@
+import contextvars
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional
+
+from .config import get_settings
+from .prompt_budget import count_tokens
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# Quota errors as the providers word them (HTTP 429, Gemini RESOURCE_EXHAUSTED, OpenAI/Ollama "rate limit")
+_QUOTA_ERROR_RE = re.compile(r"429|resource[_ ]exhausted|rate[_ ]?limit|quota", re.IGNORECASE)
+
+_request_context = contextvars.ContextVar("llm_request_context", default=("default", "interactive"))
+# Set by the request policy when it stops waiting for an attempt (deadline passed, another attempt won)
+_abandoned = contextvars.ContextVar("llm_attempt_abandoned", default=None)
+
+
+class AttemptAbandoned(Exception):
+    """Raised instead of sending a request whose caller has already given up on it."""
+
+
+@contextmanager
+def request_context(session: Optional[str] = None, priority: Optional[str] = None):
+    """Attribute the LLM calls made inside the block to ``session`` at ``priority`` ("interactive" or "batch")."""
+    current_session, current_priority = _request_context.get()
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM request priority '{priority}', expected one of {list(PRIORITIES)}")
+    token = _request_context.set((session or current_session, priority or current_priority))
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+
+@contextmanager
+def attempt_scope(abandoned: threading.Event):
+    """Calls made inside the block are not sent once ``abandoned`` is set, even after waiting for a slot."""
+    token = _abandoned.set(abandoned)
+    try:
+        yield
+    finally:
+        _abandoned.reset(token)
+
+
+def _is_abandoned() -> bool:
+    abandoned = _abandoned.get()
+    return abandoned is not None and abandoned.is_set()
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units a minute up to one minute's worth; the level may go negative after the fact."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until ``amount`` is available; requests larger than the bucket wait for a full one."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def drain(self):
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+@dataclass
+class _Ticket:
+    session: str
+    priority: int
+    tokens: int
+    seq: int
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class _ModelQueue:
+    """Waiting requests for one provider/model, granted by priority, then round-robin across sessions."""
+
+    def __init__(self, limits: dict):
+        self.requests = TokenBucket(limits["rpm"]) if limits.get("rpm") else None
+        self.tokens = TokenBucket(limits["tpm"]) if limits.get("tpm") else None
+        self.concurrency = limits.get("concurrency") or 0
+        self.in_flight = 0
+        self.waiting = []
+        self.last_served = {}
+        self.cond = threading.Condition()
+
+    def _next(self) -> _Ticket:
+        return min(self.waiting, key=lambda t: (t.priority, self.last_served.get(t.session, 0.0), t.seq))
+
+    def _delay(self, ticket: _Ticket) -> Optional[float]:
+        """Seconds until ``ticket`` can go, or None while the concurrency limit is reached."""
+        if self.concurrency and self.in_flight >= self.concurrency:
+            return None
+        return max(
+            self.requests.delay(1) if self.requests else 0.0,
+            self.tokens.delay(ticket.tokens) if self.tokens else 0.0
+        )
+
+    def acquire(self, ticket: _Ticket):
+        with self.cond:
+            self.waiting.append(ticket)
+            while True:
+                if self._next() is ticket:
+                    delay = self._delay(ticket)
+                    if delay == 0.0:
+                        break
+                    self.cond.wait(delay)
+                else:
+                    self.cond.wait()
+            self.waiting.remove(ticket)
+            self.in_flight += 1
+            self.last_served[ticket.session] = time.monotonic()
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(ticket.tokens)
+            self.cond.notify_all()
+
+    def cancel(self, ticket: _Ticket):
+        """Give back a granted slot that was not used, with the request and tokens it reserved."""
+        with self.cond:
+            self.in_flight -= 1
+            if self.requests:
+                self.requests.take(-1)
+            if self.tokens:
+                self.tokens.take(-ticket.tokens)
+            self.cond.notify_all()
+
+    def release(self, extra_tokens: int = 0, quota_error: bool = False):
+        with self.cond:
+            self.in_flight -= 1
+            if self.tokens and extra_tokens:
+                self.tokens.take(extra_tokens)
+            # The provider disagrees with our accounting; let its window pass before the next request
+            if quota_error:
+                for bucket in (self.requests, self.tokens):
+                    if bucket:
+                        bucket.drain()
+            self.cond.notify_all()
+
+
+class GovernorMetrics:
+    """Per provider/model request counts, queue depth and time spent waiting for a slot."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            "requests": 0, "tokens": 0, "quota_errors": 0, "abandoned": 0, "queue_depth": 0, "max_queue_depth": 0,
+            "wait": 0.0, "max_wait": 0.0, "wait_by_priority": defaultdict(float), "requests_by_priority": defaultdict(int)
+        })
+
+    def enqueued(self, key: str):
+        with self._lock:
+            stats = self._stats[key]
+            stats["queue_depth"] += 1
+            stats["max_queue_depth"] = max(stats["max_queue_depth"], stats["queue_depth"])
+
+    def granted(self, key: str, priority: str, wait: float):
+        with self._lock:
+            stats = self._stats[key]
+            stats["queue_depth"] -= 1
+            stats["requests"] += 1
+            stats["wait"] += wait
+            stats["max_wait"] = max(stats["max_wait"], wait)
+            stats["wait_by_priority"][priority] += wait
+            stats["requests_by_priority"][priority] += 1
+
+    def abandoned(self, key: str):
+        with self._lock:
+            self._stats[key]["queue_depth"] -= 1
+            self._stats[key]["abandoned"] += 1
+
+    def completed(self, key: str, tokens: int, quota_error: bool):
+        with self._lock:
+            self._stats[key]["tokens"] += tokens
+            self._stats[key]["quota_errors"] += int(quota_error)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                key: {
+                    "requests": s["requests"],
+                    "tokens": s["tokens"],
+                    "quota_errors": s["quota_errors"],
+                    "abandoned": s["abandoned"],
+                    "queue_depth": s["queue_depth"],
+                    "max_queue_depth": s["max_queue_depth"],
+                    "mean_wait": s["wait"] / s["requests"] if s["requests"] else 0.0,
+                    "max_wait": s["max_wait"],
+                    "mean_wait_by_priority": {
+                        p: s["wait_by_priority"][p] / n for p, n in s["requests_by_priority"].items()
+                    }
+                }
+                for key, s in self._stats.items()
+            }
+
+
+def _message_tokens(messages) -> int:
+    if isinstance(messages, str):
+        return count_tokens(messages)
+    return sum(count_tokens(m.content if isinstance(m.content, str) else str(m.content)) for m in messages)
+
+
+def _response_tokens(response, estimate: int) -> int:
+    """Tokens the call used beyond the reserved estimate, from the usage metadata when the provider reports it."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("total_tokens"):
+        return usage["total_tokens"] - estimate
+    content = getattr(response, "content", "")
+    return count_tokens(content if isinstance(content, str) else str(content))
+
+
+class LLMGovernor:
+    """Process-wide gate for chat model calls.
+
+    Limits come from ``LLM_RATE_LIMITS``, keyed ``"provider:model"`` or
+    ``"provider"``, e.g. ``{"google_genai": {"rpm": 1000, "tpm": 1000000,
+    "concurrency": 8}}``; unlisted models are not limited but still counted.
+    Each call reserves one request and its estimated prompt tokens; the
+    rest of its usage is charged when the response arrives. Waiting calls
+    are granted interactive before batch, then round-robin across sessions.
+    """
+
+    def __init__(self, limits: dict = None):
+        self.limits = settings.LLM_RATE_LIMITS if limits is None else limits
+        self.metrics = GovernorMetrics()
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def _queue(self, key: str) -> Optional[_ModelQueue]:
+        provider = key.split(":", 1)[0]
+        limits = self.limits.get(key) or self.limits.get(provider)
+        if not limits:
+            return None
+        with self._lock:
+            if key not in self._queues:
+                self._queues[key] = _ModelQueue(limits)
+            return self._queues[key]
+
+    def invoke(self, llm, messages, provider: str, model: str, **kwargs):
+        key = f"{provider}:{model}"
+        session, priority = _request_context.get()
+        queue = self._queue(key)
+        estimate = _message_tokens(messages)
+
+        if _is_abandoned():
+            raise AttemptAbandoned(f"{key} request abandoned by its caller before it was queued")
+        self.metrics.enqueued(key)
+        start = time.monotonic()
+        ticket = _Ticket(session, PRIORITIES[priority], estimate, next(self._seq))
+        if queue:
+            queue.acquire(ticket)
+        if _is_abandoned():
+            # The caller gave up while this call waited for its slot; hand the slot back unsent
+            if queue:
+                queue.cancel(ticket)
+            self.metrics.abandoned(key)
+            raise AttemptAbandoned(f"{key} request abandoned by its caller while waiting for its rate limit")
+        wait = time.monotonic() - start
+        self.metrics.granted(key, priority, wait)
+        if wait > 1.0:
+            logger.info(f"⏳ {key} request from {session} ({priority}) waited {wait:.1f}s for its rate limit")
+
+        extra_tokens, quota_error = 0, False
+        try:
+            response = llm.invoke(messages, **kwargs)
+            extra_tokens = _response_tokens(response, estimate)
+            return response
+        except Exception as e:
+            quota_error = bool(_QUOTA_ERROR_RE.search(str(e)))
+            raise
+        finally:
+            if queue:
+                queue.release(extra_tokens, quota_error)
+            self.metrics.completed(key, estimate + extra_tokens, quota_error)
+
+    def wrap(self, llm, provider: str, model: str) -> "GovernedChatModel":
+        return GovernedChatModel(llm, self, provider, model)
+
+
+class GovernedChatModel:
+    """A chat model whose ``invoke`` goes through the governor; other attributes are the model's own."""
+
+    def __init__(self, llm, governor: LLMGovernor, provider: str, model: str):
+        self.llm = llm
+        self.governor = governor
+        self.provider = provider
+        self.model = model
+
+    def invoke(self, messages, **kwargs):
+        return self.governor.invoke(self.llm, messages, self.provider, self.model, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+@lru_cache()
+def get_llm_governor() -> LLMGovernor:
+    return LLMGovernor()
@@ -0,0 +1,236 @@
+import math
+import re
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from .road_topology import REPO_MAPS_DIR, is_signalised
+
+# Heading change (degrees) between consecutive shape segments that still counts as straight
+STRAIGHT_TOLERANCE_DEG = 2.0
+CELL_SIZE = 50.0
+
+
+@dataclass(frozen=True)
+class Junction:
+    id: str
+    x: float
+    y: float
+    roads: tuple
+    signalised: bool
+
+    @property
+    def arity(self) -> int:
+        return len(self.roads)
+
+
+@dataclass(frozen=True)
+class StraightSegment:
+    """Straight run of a one-directional road (SUMO edge), measured on its rightmost lane."""
+    edge_id: str
+    lanes: int
+    length: float
+    start: tuple
+    end: tuple
+
+    @property
+    def bbox(self) -> tuple:
+        return (
+            min(self.start[0], self.end[0]), min(self.start[1], self.end[1]),
+            max(self.start[0], self.end[0]), max(self.start[1], self.end[1])
+        )
+
+
+def _parse_shape(shape: str) -> list:
+    return [tuple(float(v) for v in point.split(",")[:2]) for point in shape.split()]
+
+
+def _straight_runs(points: list) -> list:
+    """Split a polyline into maximal runs whose heading changes less than the tolerance."""
+    runs = []
+    start = 0
+    heading = None
+    for i in range(1, len(points)):
+        (x0, y0), (x1, y1) = points[i - 1], points[i]
+        if x0 == x1 and y0 == y1:
+            continue
+        current = math.degrees(math.atan2(y1 - y0, x1 - x0))
+        if heading is not None and abs((current - heading + 180) % 360 - 180) > STRAIGHT_TOLERANCE_DEG:
+            runs.append((start, i - 1))
+            start = i - 1
+        heading = current
+    runs.append((start, len(points) - 1))
+    return [(points[a], points[b]) for a, b in runs if b > a]
+
+
+class GridIndex:
+    """Uniform grid over bounding boxes; cells are ``cell_size`` metres wide."""
+
+    def __init__(self, cell_size: float = CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+
+    def _cell(self, value: float) -> int:
+        return int(math.floor(value / self.cell_size))
+
+    def insert(self, item, bbox: tuple):
+        x0, y0, x1, y1 = bbox
+        for cx in range(self._cell(x0), self._cell(x1) + 1):
+            for cy in range(self._cell(y0), self._cell(y1) + 1):
+                self.cells[(cx, cy)].append(item)
+
+    def query(self, x: float, y: float, radius: float) -> list:
+        seen = {}
+        for cx in range(self._cell(x - radius), self._cell(x + radius) + 1):
+            for cy in range(self._cell(y - radius), self._cell(y + radius) + 1):
+                for item in self.cells.get((cx, cy), ()):
+                    seen[id(item)] = item
+        return list(seen.values())
+
+
+class MapGeometry:
+    """Junctions and straight lane segments of one town, indexed for fast feasibility queries.
+
+    Built once from ``maps/<town>.net.xml``; attribute queries are answered
+    from presorted tables and memoised, point queries go through a grid.
+    """
+
+    def __init__(self, town: str, junctions: list, segments: list, cell_size: float = CELL_SIZE):
+        self.town = town
+        self.junctions = sorted(junctions, key=lambda j: -j.arity)
+        self.segments = sorted(segments, key=lambda s: -s.length)
+        self.junction_grid = GridIndex(cell_size)
+        self.segment_grid = GridIndex(cell_size)
+        for junction in self.junctions:
+            self.junction_grid.insert(junction, (junction.x, junction.y, junction.x, junction.y))
+        for segment in self.segments:
+            self.segment_grid.insert(segment, segment.bbox)
+        self._memo = {}
+
+    @classmethod
+    def from_net(cls, net_path: Path, town: Optional[str] = None) -> "MapGeometry":
+        net_path = Path(net_path)
+        junction_info = {}
+        signal_programs = set()
+        roads_at = defaultdict(set)
+        segments = []
+
+        context = ET.iterparse(net_path, events=("start", "end"))
+        _, root = next(context)
+        for event, element in context:
+            if event != "end":
+                continue
+            if element.tag == "edge":
+                lanes = [lane for lane in element if lane.tag == "lane"]
+                if element.get("function") != "internal" and lanes and "driving" in (element.get("type") or ""):
+                    road = element.get("id").lstrip("-")
+                    roads_at[element.get("from")].add(road)
+                    roads_at[element.get("to")].add(road)
+                    for start, end in _straight_runs(_parse_shape(lanes[0].get("shape", ""))):
+                        segments.append(StraightSegment(element.get("id"), len(lanes), math.dist(start, end), start, end))
+                root.clear()
+            elif element.tag == "junction":
+                if element.get("type") != "internal":
+                    junction_info[element.get("id")] = (float(element.get("x")), float(element.get("y")), element.get("type"))
+                root.clear()
+            elif element.tag == "tlLogic":
+                signal_programs.add(element.get("id"))
+                root.clear()
+
+        junctions = [
+            Junction(
+                junction_id, x, y, tuple(sorted(roads_at[junction_id])),
+                is_signalised(junction_type, junction_id, signal_programs)
+            )
+            for junction_id, (x, y, junction_type) in junction_info.items()
+            if len(roads_at[junction_id]) >= 3
+        ]
+        return cls(town or net_path.name[:-len(".net.xml")], junctions, segments)
+
+    def junctions_with(self, min_roads: int = 3, max_roads: Optional[int] = None, signalised: Optional[bool] = None) -> list:
+        """Junctions where between ``min_roads`` and ``max_roads`` roads meet."""
+        key = ("junctions", min_roads, max_roads, signalised)
+        if key not in self._memo:
+            self._memo[key] = [
+                j for j in self.junctions
+                if j.arity >= min_roads
+                and (max_roads is None or j.arity <= max_roads)
+                and (signalised is None or j.signalised == signalised)
+            ]
+        return self._memo[key]
+
+    def straight_segments(self, min_length: float = 0.0, min_lanes: int = 1) -> list:
+        """Straight runs of at least ``min_length`` metres with ``min_lanes`` same-direction lanes, longest first."""
+        key = ("segments", min_length, min_lanes)
+        if key not in self._memo:
+            self._memo[key] = [s for s in self.segments if s.length >= min_length and s.lanes >= min_lanes]
+        return self._memo[key]
+
+    def junctions_near(self, x: float, y: float, radius: float) -> list:
+        return [j for j in self.junction_grid.query(x, y, radius) if math.hypot(j.x - x, j.y - y) <= radius]
+
+    def segments_near(self, x: float, y: float, radius: float) -> list:
+        # Bounding-box test; enough to shortlist candidates around a point
+        return [
+            s for s in self.segment_grid.query(x, y, radius)
+            if s.bbox[0] - radius <= x <= s.bbox[2] + radius and s.bbox[1] - radius <= y <= s.bbox[3] + radius
+        ]
+
+
+@lru_cache(maxsize=None)
+def load_map_geometry(town: str, maps_dir: str = str(REPO_MAPS_DIR)) -> Optional[MapGeometry]:
+    net_path = Path(maps_dir) / f"{town}.net.xml"
+    if not net_path.exists():
+        return None
+    return MapGeometry.from_net(net_path, town)
+
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_DISTANCE_RE = re.compile(
+    rf"following\s+roadDirection\b[^\n]*?\bfor\s+(?:{_NUMBER}|Range\(\s*{_NUMBER}\s*,)"
+    rf"|\b(?:ahead of|behind)\b[^\n]*?\bby\s+(?:{_NUMBER}|Range\(\s*{_NUMBER}\s*,)"
+)
+_LANE_COUNT_RE = re.compile(r"len\([\w.]*lanes\)\s*(>=|>|==)\s*(\d+)")
+_LANE_CHANGE_RE = re.compile(r"laneToLeft|laneToRight|adjacentLanes|LaneChangeBehavior|changeLane", re.I)
+
+
+def spatial_precheck(code: str, town: str) -> list:
+    """Spatial requirements in generated Scenic code that ``town`` cannot satisfy.
+
+    Looks for intersection filters (``is4Way``, ``is3Way``, ``isSignalized``),
+    lane-count filters, lane changes and longitudinal offsets, and checks
+    them against the town's geometry. An empty list means nothing was found
+    to be infeasible, not that the code will sample.
+    """
+    geometry = load_map_geometry(town)
+    if geometry is None or not code:
+        return []
+
+    issues = []
+    if "is4Way" in code and not geometry.junctions_with(4, 4):
+        issues.append(f"{town} has no 4-way intersection (is4Way)")
+    if "is3Way" in code and not geometry.junctions_with(3, 3):
+        issues.append(f"{town} has no 3-way intersection (is3Way)")
+    if "isSignalized" in code and not geometry.junctions_with(signalised=True):
+        issues.append(f"{town} has no signalised intersection (isSignalized)")
+    if "intersection" in code and not geometry.junctions_with():
+        issues.append(f"{town} has no intersections")
+
+    min_lanes = 1
+    for op, count in _LANE_COUNT_RE.findall(code):
+        min_lanes = max(min_lanes, int(count) + (1 if op == ">" else 0))
+    if _LANE_CHANGE_RE.search(code):
+        min_lanes = max(min_lanes, 2)
+
+    distances = [float(next(g for g in groups if g)) for groups in _DISTANCE_RE.findall(code)]
+    min_length = max(distances, default=0.0)
+
+    if min_lanes > 1 and not geometry.straight_segments(min_length, min_lanes):
+        if min_length and geometry.straight_segments(0.0, min_lanes):
+            issues.append(f"{town} has no straight segment of {min_length:.0f} m or more with {min_lanes}+ same-direction lanes")
+        else:
+            issues.append(f"{town} has no road with {min_lanes}+ same-direction lanes")
+    return issues
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+REPO_MAPS_DIR = Path(__file__).resolve().parent.parent / "maps"
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _stat_signature(path: Path) -> list:
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _scenic_version() -> Optional[str]:
+    try:
+        from importlib.metadata import version
+        return version("scenic")
+    except Exception:
+        return None
+
+
+def compile_network(xodr_path: str, force: bool = False) -> str:
+    """Load an OpenDRIVE map through Scenic so it writes the pickled network next to it."""
+    from scenic.domains.driving.roads import Network
+
+    Network.fromFile(xodr_path, useCache=not force, writeCache=True)
+    return xodr_path
+
+
+class MapRegistry:
+    """OpenDRIVE maps with their compiled Scenic networks (.snet).
+
+    Scenic picks up ``<map>.snet`` next to ``<map>.xodr``, so prebuilding
+    the networks and handing out absolute ``.xodr`` paths lets every
+    scenario run load the pickled network instead of parsing the XML.
+    The manifest records the hashes of both files to tell when a network
+    has to be rebuilt.
+    """
+
+    def __init__(self, maps_dir: Optional[str] = None, path: str = settings.MAP_REGISTRY_PATH):
+        self.maps_dir = Path(maps_dir or settings.MAP_PATH or REPO_MAPS_DIR).resolve()
+        self.path = Path(path)
+        self.entries: dict[str, dict] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable map registry {self.path}: {e}")
+            return
+        if data.get("maps_dir") == str(self.maps_dir):
+            self.entries = data.get("maps", {})
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "maps_dir": str(self.maps_dir),
+            "updated_at": datetime.now().isoformat(),
+            "maps": self.entries
+        }
+        self.path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+    def maps(self) -> list:
+        return sorted(path.name[:-len(".xodr")] for path in self.maps_dir.glob("*.xodr"))
+
+    def xodr_path(self, carla_map: str) -> Path:
+        return self.maps_dir / f"{carla_map}.xodr"
+
+    def snet_path(self, carla_map: str) -> Path:
+        return self.maps_dir / f"{carla_map}.snet"
+
+    def _unchanged(self, path: Path, signature: Optional[list], sha256: Optional[str]) -> bool:
+        # Only hash the file when its size or mtime moved since it was recorded
+        if not path.exists() or sha256 is None:
+            return False
+        if signature == _stat_signature(path):
+            return True
+        return file_sha256(path) == sha256
+
+    def is_fresh(self, carla_map: str) -> bool:
+        entry = self.entries.get(carla_map)
+        if entry is None:
+            return False
+        return (
+            self._unchanged(self.xodr_path(carla_map), entry.get("xodr_stat"), entry.get("xodr_sha256"))
+            and self._unchanged(self.snet_path(carla_map), entry.get("snet_stat"), entry.get("snet_sha256"))
+        )
+
+    def map_file_path(self, carla_map: str) -> str:
+        """Absolute path of the map to put in a Scenic header."""
+        xodr = self.xodr_path(carla_map)
+        if not xodr.exists():
+            logger.warning(f"Map {carla_map} is not in {self.maps_dir}; using a path relative to the scenario")
+            return f"../../maps/{carla_map}.xodr"
+        if not self.is_fresh(carla_map):
+            logger.warning(f"No up-to-date network cache for {carla_map}; run python -m core.map_registry to prebuild it")
+        return str(xodr)
+
+    def _record(self, carla_map: str, scenic_version: Optional[str]):
+        xodr, snet = self.xodr_path(carla_map), self.snet_path(carla_map)
+        self.entries[carla_map] = {
+            "xodr": str(xodr),
+            "xodr_sha256": file_sha256(xodr),
+            "xodr_stat": _stat_signature(xodr),
+            "snet": str(snet),
+            "snet_sha256": file_sha256(snet),
+            "snet_stat": _stat_signature(snet),
+            "scenic_version": scenic_version,
+            "built_at": datetime.now().isoformat()
+        }
+
+    def prebuild(self, maps: Optional[list] = None, force: bool = False, jobs: int = 1) -> list:
+        """Compile every stale map; returns the names that were (re)built."""
+        scenic_version = _scenic_version()
+        stale = [
+            carla_map for carla_map in (maps or self.maps())
+            if force
+            or not self.is_fresh(carla_map)
+            or self.entries[carla_map].get("scenic_version") != scenic_version
+        ]
+        if not stale:
+            logger.info(f"All map networks in {self.maps_dir} are up to date")
+            return []
+
+        logger.info(f"Compiling {len(stale)} map network(s): {', '.join(stale)}")
+        paths = [str(self.xodr_path(carla_map)) for carla_map in stale]
+        if jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                list(executor.map(compile_network, paths, [force] * len(paths)))
+        else:
+            for path in paths:
+                compile_network(path, force)
+
+        for carla_map in stale:
+            self._record(carla_map, scenic_version)
+        self.save()
+        return stale
+
+
+@lru_cache()
+def get_map_registry() -> MapRegistry:
+    return MapRegistry()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Prebuild the Scenic network cache (.snet) for every OpenDRIVE map"
+    )
+    parser.add_argument("maps", nargs="*", help="Map names to build (default: every .xodr in the maps directory)")
+    parser.add_argument("-d", "--maps-dir", help="Maps directory (default: MAP_PATH or the repo maps/)")
+    parser.add_argument("-f", "--force", action="store_true", help="Recompile even if the cached network is fresh")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Maps to compile in parallel")
+    parser.add_argument("--check", action="store_true", help="Only report which maps are stale")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    registry = MapRegistry(maps_dir=args.maps_dir)
+    if args.check:
+        for carla_map in args.maps or registry.maps():
+            print(f"{carla_map}: {'fresh' if registry.is_fresh(carla_map) else 'stale'}")
+        return
+
+    registry.prebuild(args.maps or None, force=args.force, jobs=args.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from collections.abc import Collection
+from typing import Optional
 from langchain_milvus import BM25BuiltInFunction, Milvus
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter,MarkdownHeaderTextSplitter
@@ -6,13 +7,19 @@ from .config import get_settings
 from .embedding import EmbeddingModel
 
 import gc
+import hashlib
+import json
 import logging
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Content hashes looked up per Milvus query when deduplicating an insert
+HASH_QUERY_BATCH = 500
+
 class MilvusClient:
     def __init__(self, collection_name: str = settings.MILVUS_COLLECTION, embedding_provider: str = settings.EMBEDDING_PROVIDER, embedding_model_name: str = settings.EMBEDDING_MODEL ):
+        self.collection_name = collection_name
         try:
             self.embedding_model = EmbeddingModel(provider=embedding_provider, model_name=embedding_model_name)
             self.embedding = self.embedding_model.embedding
@@ -25,29 +32,88 @@ class MilvusClient:
             builtin_function=BM25BuiltInFunction(input_field_names="text", output_field_names="sparse"),
             connection_args={"uri": settings.MILVUS_URI, "token": settings.MILVUS_TOKEN},
             vector_field=["dense", "sparse"],
+            # Keeps metadata such as content_hash on collections created by this client
+            enable_dynamic_field=True,
         )
         print(self.vector_store.vector_fields)
 
         self.text_splitter = RecursiveCharacterTextSplitter(['\n## ','\n# ', '\n\n', '\n'])
+        # Content hashes of chunks inserted through this client, on top of those stored in the collection
+        self._inserted_hashes: set[str] = set()
 
 
     def search(self, query: str, ranker_type=settings.RANKER_TYPE, ranker_params=settings.RANKER_PARAMS) -> list[Document]:
         results = self.vector_store.similarity_search(query, k=settings.MAX_CHUNKS, ranker_type=ranker_type, ranker_params=ranker_params)
         return results
 
-    def insert(self, content: str):
-        documents = self.split_content(content)
+    def insert(self, content: str, batch_size: int = settings.EMBEDDING_BATCH_SIZE, debug_file: Optional[str] = None) -> int:
+        hashes, documents = self._deduplicate(self.split_content(content))
+        
+        batches = 0
+        for start in range(0, len(documents), batch_size):
+            # One embedding request and one Milvus insert per batch
+            self.vector_store.add_documents(documents[start:start + batch_size])
+            self._inserted_hashes.update(hashes[start:start + batch_size])
+            batches += 1
+        
+        if debug_file:
+            with open(debug_file, "a", encoding="utf-8") as f:
+                f.write("".join(doc.page_content + "\n\n------------ split----------\n\n" for doc in documents))
+        
+        logger.info(f"Inserted {len(documents)} chunks in {batches} batch(es)")
+        return len(documents)
+
+    def _stored_hashes(self, hashes: list[str]) -> set[str]:
+        """Those of ``hashes`` already stored in the collection, from the chunks' ``content_hash`` metadata."""
+        collection = getattr(self.vector_store, "col", None)
+        if collection is None or not hashes:
+            return set()
+        stored = set()
+        try:
+            for start in range(0, len(hashes), HASH_QUERY_BATCH):
+                batch = hashes[start:start + HASH_QUERY_BATCH]
+                rows = collection.query(expr=f"content_hash in {json.dumps(batch)}", output_fields=["content_hash"])
+                stored.update(row["content_hash"] for row in rows)
+        except Exception as e:
+            # Collections filled before chunks carried content_hash cannot be checked
+            logger.warning(f"Could not look up stored chunk hashes in {self.collection_name}, only deduplicating this session's inserts: {e}")
+        return stored
+
+    def _deduplicate(self, documents: list[Document]) -> tuple[list[str], list[Document]]:
+        hashes = []
+        unique = []
+        seen = set(self._inserted_hashes)
         for doc in documents:
-            with open("debug_doc.txt", "a", encoding="utf-8") as f:
-                f.write(doc.page_content + "\n\n------------ split----------\n\n")
-            print(f"Chunk size: {len(doc.page_content)}")
-            self.vector_store.add_documents([doc])
-        print(f"Inserted {len(documents)} document")
+            content_hash = hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+            if content_hash in seen:
+                continue
+            seen.add(content_hash)
+            doc.metadata["content_hash"] = content_hash
+            hashes.append(content_hash)
+            unique.append(doc)
+
+        stored = self._stored_hashes(hashes)
+        if stored:
+            self._inserted_hashes.update(stored)
+            kept = [(h, doc) for h, doc in zip(hashes, unique) if h not in stored]
+            hashes = [h for h, _ in kept]
+            unique = [doc for _, doc in kept]
+        
+        skipped = len(documents) - len(unique)
+        if skipped:
+            logger.info(f"Skipped {skipped} duplicate chunks")
+        return hashes, unique
 
     def split_content(self, content: str) -> list[Document]:
         return self.text_splitter.create_documents([content])
         # return self.text_splitter.split_text(content)
 
+    def corpus_version(self) -> str:
+        """Row-count version of the collection, for corpora not ingested through utilities.insert_docs_to_milvus."""
+        collection = getattr(self.vector_store, "col", None)
+        num_entities = collection.num_entities if collection is not None else 0
+        return f"{self.collection_name}:{self.embedding_model.model_name}:{num_entities}"
+
     def delete(self, ids: list[str]):
         self.vector_store.delete(ids)
 
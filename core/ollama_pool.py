@@ -0,0 +1,303 @@
+import argparse
+import json
+import logging
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Seconds a health probe may take before the endpoint counts as down
+PROBE_TIMEOUT = 3.0
+
+
+class Endpoint:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.failures = 0  # Consecutive failed requests or probes
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.latency = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    @property
+    def mean_latency(self) -> float:
+        return self.latency / self.requests if self.requests else 0.0
+
+
+class OllamaPool:
+    """Ollama servers behind one chat model: least outstanding requests, health probes and ejection.
+
+    A request goes to the healthy endpoint with the fewest consecutive
+    failures, then the fewest requests in flight, then the faster one; one
+    that cannot reach its endpoint is retried once on another endpoint.
+    ``OLLAMA_EJECT_AFTER`` consecutive failures eject an endpoint for
+    ``OLLAMA_EJECT_SECONDS``; a background probe of ``/api/version`` every
+    ``OLLAMA_HEALTH_INTERVAL`` seconds ejects unreachable endpoints early
+    and brings recovered ones back.
+    When every endpoint is ejected, the one due back first is used.
+    """
+
+    def __init__(self, urls: list, create_llm: Callable = None):
+        if not urls:
+            raise ValueError("OllamaPool needs at least one endpoint")
+        self.endpoints = [Endpoint(url) for url in dict.fromkeys(urls)]
+        self._create_llm = create_llm or _create_chat_ollama
+        self._llms = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._prober = None
+
+    def _start_prober(self):
+        # A single endpoint gains nothing from probes; its failures surface on the request itself
+        if self._prober is None and len(self.endpoints) > 1 and settings.OLLAMA_HEALTH_INTERVAL > 0:
+            self._prober = threading.Thread(target=self._probe_loop, name="ollama-health", daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self):
+        while not self._stop.wait(settings.OLLAMA_HEALTH_INTERVAL):
+            for endpoint in self.endpoints:
+                self.probe(endpoint)
+
+    def probe(self, endpoint: Endpoint) -> bool:
+        try:
+            with urllib.request.urlopen(f"{endpoint.url}/api/version", timeout=PROBE_TIMEOUT) as response:
+                ok = response.status == 200
+        except Exception:
+            ok = False
+        with self._lock:
+            if ok:
+                if not endpoint.healthy:
+                    logger.info(f"🟢 Ollama endpoint {endpoint.url} is back")
+                endpoint.failures = 0
+                endpoint.ejected_until = 0.0
+            elif endpoint.healthy:
+                logger.warning(f"🔴 Ollama endpoint {endpoint.url} failed its health probe, ejecting it")
+                endpoint.failures += 1
+                endpoint.ejected_until = time.monotonic() + settings.OLLAMA_EJECT_SECONDS
+        return ok
+
+    def acquire(self, exclude: Endpoint = None) -> Optional[Endpoint]:
+        """The endpoint for the next request; None when ``exclude`` was the only one left."""
+        self._start_prober()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e is not exclude]
+            if not candidates:
+                return None
+            healthy = [e for e in candidates if e.healthy]
+            if healthy:
+                endpoint = min(healthy, key=lambda e: (e.failures, e.outstanding, e.mean_latency))
+            else:
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, latency: float, ok: bool):
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.requests += 1
+            endpoint.latency += latency
+            if ok:
+                endpoint.failures = 0
+                return
+            endpoint.errors += 1
+            endpoint.failures += 1
+            if endpoint.failures >= settings.OLLAMA_EJECT_AFTER and endpoint.healthy and len(self.endpoints) > 1:
+                logger.warning(f"🔴 Ollama endpoint {endpoint.url} failed {endpoint.failures} requests in a row, ejecting it")
+                endpoint.ejected_until = time.monotonic() + settings.OLLAMA_EJECT_SECONDS
+
+    def llm(self, endpoint: Endpoint, model_name: str):
+        key = (endpoint.url, model_name)
+        with self._lock:
+            if key not in self._llms:
+                self._llms[key] = self._create_llm(model_name, endpoint.url)
+            return self._llms[key]
+
+    def chat_model(self, model_name: str) -> "PooledChatModel":
+        return PooledChatModel(self, model_name)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                e.url: {
+                    "healthy": e.healthy,
+                    "outstanding": e.outstanding,
+                    "requests": e.requests,
+                    "errors": e.errors,
+                    "mean_latency": e.mean_latency
+                }
+                for e in self.endpoints
+            }
+
+    def close(self):
+        self._stop.set()
+
+
+class PooledChatModel:
+    """A chat model for one Ollama model whose requests are spread over the pool's endpoints."""
+
+    def __init__(self, pool: OllamaPool, model_name: str):
+        self.pool = pool
+        self.model_name = model_name
+
+    def invoke(self, messages, **kwargs):
+        endpoint = self.pool.acquire()
+        try:
+            return self._invoke_on(endpoint, messages, **kwargs)
+        except Exception as e:
+            # Only an unreachable server is worth a second endpoint; other errors would repeat there
+            if not _is_connection_error(e):
+                raise
+            retry = self.pool.acquire(exclude=endpoint)
+            if retry is None:
+                raise
+            logger.warning(f"Ollama endpoint {endpoint.url} unreachable ({e}), retrying on {retry.url}")
+            return self._invoke_on(retry, messages, **kwargs)
+
+    def _invoke_on(self, endpoint: Endpoint, messages, **kwargs):
+        start = time.monotonic()
+        ok = False
+        try:
+            response = self.pool.llm(endpoint, self.model_name).invoke(messages, **kwargs)
+            ok = True
+            return response
+        finally:
+            self.pool.release(endpoint, time.monotonic() - start, ok)
+
+    def __getattr__(self, name):
+        return getattr(self.pool.llm(self.pool.endpoints[0], self.model_name), name)
+
+
+def _is_connection_error(error: BaseException) -> bool:
+    # httpx.ConnectError and friends, by name so httpx need not be imported here
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, ConnectionError) or type(error).__name__ in ("ConnectError", "ConnectTimeout"):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _create_chat_ollama(model_name: str, base_url: str):
+    from .http_clients import get_chat_model
+
+    return get_chat_model(model_name, "ollama", base_url=base_url)
+
+
+def ollama_urls() -> list:
+    return list(settings.OLLAMA_URLS) or [settings.OLLAMA_URL]
+
+
+@lru_cache()
+def get_ollama_pool() -> OllamaPool:
+    return OllamaPool(ollama_urls())
+
+
+class StandInOllama(BaseHTTPRequestHandler):
+    """Just enough of the Ollama API for ChatOllama: /api/version, /api/tags and /api/chat."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.server.fail:
+            return self._send(503, b'{"error": "stand-in is down"}')
+        if self.path == "/api/version":
+            return self._send(200, b'{"version": "stand-in"}')
+        if self.path == "/api/tags":
+            return self._send(200, b'{"models": []}')
+        self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.server.fail:
+            return self._send(503, b'{"error": "stand-in is down"}')
+        time.sleep(self.server.delay)
+        message = {"role": "assistant", "content": f"stand-in {self.server.server_port}"}
+        final = {
+            "model": request.get("model", ""), "created_at": "1970-01-01T00:00:00Z", "message": message,
+            "done": True, "done_reason": "stop", "prompt_eval_count": 1, "eval_count": 1
+        }
+        if request.get("stream", True):
+            # Streamed chat: one chunk with the content, then the final chunk
+            chunk = dict(final, done=False)
+            final["message"] = {"role": "assistant", "content": ""}
+            lines = f"{json.dumps(chunk)}\n{json.dumps(final)}\n".encode()
+            return self._send(200, lines, "application/x-ndjson")
+        self._send(200, json.dumps(final).encode())
+
+
+def start_stand_in(delay: float = 0.0, fail: bool = False) -> ThreadingHTTPServer:
+    """A stand-in Ollama server on a free localhost port; ``fail`` makes every request return 503."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInOllama)
+    server.delay = delay
+    server.fail = fail
+    threading.Thread(target=server.serve_forever, name=f"ollama-stand-in-{server.server_port}", daemon=True).start()
+    return server
+
+
+def main():
+    from langchain_core.messages import HumanMessage
+
+    parser = argparse.ArgumentParser(description="Send requests through the Ollama endpoint pool and show per-endpoint metrics")
+    parser.add_argument("--stand-in", type=int, default=0, metavar="N", help="Use N local stand-in servers instead of OLLAMA_URLS")
+    parser.add_argument("--slow", type=float, default=0.0, help="Response delay of the first stand-in, seconds")
+    parser.add_argument("--down", type=int, default=0, help="Stand-ins that fail every request")
+    parser.add_argument("-n", "--requests", type=int, default=20)
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--model", default=settings.LLM_MODEL_NAME)
+    args = parser.parse_args()
+
+    servers = []
+    if args.stand_in:
+        for i in range(args.stand_in):
+            servers.append(start_stand_in(delay=args.slow if i == 0 else 0.05, fail=i >= args.stand_in - args.down))
+        pool = OllamaPool([f"http://127.0.0.1:{s.server_port}" for s in servers])
+    else:
+        pool = get_ollama_pool()
+
+    model = pool.chat_model(args.model)
+
+    def send(i):
+        try:
+            model.invoke([HumanMessage(content=f"ping {i}")])
+            return True
+        except Exception:
+            return False
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        succeeded = sum(executor.map(send, range(args.requests)))
+    print(f"{succeeded}/{args.requests} requests succeeded in {time.monotonic() - start:.2f}s")
+    for url, stats in pool.snapshot().items():
+        print(
+            f"  {url:32s} {'up' if stats['healthy'] else 'ejected':8s} {stats['requests']:4d} requests, "
+            f"{stats['errors']} errors, {stats['mean_latency']:.3f}s avg"
+        )
+    pool.close()
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
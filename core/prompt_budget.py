@@ -0,0 +1,108 @@
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from .config import get_settings
+
+settings = get_settings()
+
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def count_tokens(text: str) -> int:
+    """Local approximation of BPE token counts: words in ~4-character chunks, digits in 3s, one per symbol."""
+    tokens = 0
+    for piece in _PIECE_RE.findall(text):
+        if piece[0].isalpha():
+            tokens += math.ceil(len(piece) / 4)
+        elif piece[0].isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        else:
+            tokens += 1
+    return tokens
+
+
+def summarize_code(code: str) -> str:
+    """Top-level lines of a Scenic component: the names it defines, without behavior bodies or continuations."""
+    lines = [line for line in code.splitlines() if line.strip() and not line[0].isspace()]
+    return "\n".join(lines + ["# (summarized: indented lines omitted)"])
+
+
+@dataclass
+class PromptItem:
+    text: str
+    # Lower values are summarized, then dropped, first
+    value: float
+    summarize: Optional[Callable[[str], str]] = None
+    droppable: bool = True
+    state: str = "full"  # "full", "summarized" or "dropped"
+    tokens: int = field(init=False)
+
+    def __post_init__(self):
+        self.tokens = count_tokens(self.text)
+
+
+@dataclass
+class PromptSection:
+    name: str
+    items: list
+    separator: str = "\n"
+    empty: str = ""
+
+    def render(self) -> str:
+        texts = [item.text for item in self.items if item.state != "dropped"]
+        return self.separator.join(texts) if texts else self.empty
+
+
+def budget_for(agent_name: str) -> int:
+    return settings.PROMPT_TOKEN_BUDGETS.get(agent_name, 0)
+
+
+def fit_to_budget(fixed_text: str, sections: list, budget: int) -> dict:
+    """Trim ``sections`` in place until the prompt fits ``budget`` tokens.
+
+    ``fixed_text`` is the part of the prompt that is always sent. Items
+    are summarized in order of increasing value until the total fits;
+    if that is not enough, droppable items are dropped in the same order.
+    Returns a size report with per-section token counts before and after.
+    """
+    fixed = count_tokens(fixed_text)
+    before = {section.name: sum(item.tokens for item in section.items) for section in sections}
+    total = fixed + sum(before.values())
+
+    if budget > 0:
+        candidates = sorted(
+            (item for section in sections for item in section.items),
+            key=lambda item: item.value
+        )
+        # Summaries first: a component's names are worth keeping even when its body is not
+        for item in candidates:
+            if total <= budget:
+                break
+            if item.summarize:
+                summary = item.summarize(item.text)
+                saved = item.tokens - count_tokens(summary)
+                if saved > 0:
+                    item.text, item.tokens, item.state = summary, item.tokens - saved, "summarized"
+                    total -= saved
+        for item in candidates:
+            if total <= budget:
+                break
+            if item.droppable:
+                item.state = "dropped"
+                total -= item.tokens
+
+    after = {
+        section.name: sum(item.tokens for item in section.items if item.state != "dropped")
+        for section in sections
+    }
+    return {
+        "budget": budget,
+        "fixed": fixed,
+        "sections_before": before,
+        "sections": after,
+        "total": fixed + sum(after.values()),
+        "summarized": sum(item.state == "summarized" for section in sections for item in section.items),
+        "dropped": sum(item.state == "dropped" for section in sections for item in section.items),
+    }
@@ -0,0 +1,274 @@
+import argparse
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Optional
+
+from langchain_core.messages import HumanMessage
+
+from .config import get_settings
+from .prompt_budget import count_tokens
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# A str.format placeholder; doubled braces are literal text
+_PLACEHOLDER_RE = re.compile(r"(?<!\{)\{[A-Za-z_]\w*\}(?!\})")
+
+
+@lru_cache(maxsize=64)
+def split_template(template: str) -> tuple:
+    """Split a prompt template into its static prefix and the template of the dynamic suffix.
+
+    The cut is at the last blank line before the first placeholder, so the
+    prefix ends on a paragraph boundary. The prefix is returned formatted
+    (escaped braces resolved); ``prefix + suffix.format(**context)`` equals
+    ``template.format(**context)``. A template without a blank line before
+    its first placeholder has an empty prefix.
+    """
+    match = _PLACEHOLDER_RE.search(template)
+    cut = len(template)
+    if match:
+        blank_line = template.rfind("\n\n", 0, match.start())
+        cut = blank_line + 2 if blank_line >= 0 else 0
+    try:
+        return template[:cut].format(), template[cut:]
+    except (IndexError, KeyError, ValueError):
+        # Not a str.format template; everything is dynamic
+        return "", template
+
+
+def cached_input_tokens(response) -> Optional[int]:
+    """Prompt tokens the provider served from its cache, or None when it does not report them."""
+    details = (getattr(response, "usage_metadata", None) or {}).get("input_token_details") or {}
+    return details.get("cache_read")
+
+
+class ImplicitPrefixCache:
+    """Providers that cache repeated prefixes by themselves (OpenAI, Gemini implicit caching, Ollama's KV cache).
+
+    Nothing is registered; the full prompt is sent with the static prefix
+    first, and hits are read from the response's usage metadata.
+    """
+
+    name = "implicit"
+
+    def register(self, model: str, prefix: str) -> Optional[Any]:
+        return None
+
+    def invoke(self, llm, handle: Optional[Any], prefix: str, suffix: str):
+        response = llm.invoke([HumanMessage(content=prefix + suffix)])
+        return response, cached_input_tokens(response)
+
+
+class GeminiContextCache(ImplicitPrefixCache):
+    """Gemini explicit context caching: the prefix is uploaded once per model and referenced by name."""
+
+    name = "gemini"
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._client = None
+
+    def register(self, model: str, prefix: str) -> Optional[Any]:
+        from google import genai
+        from google.genai import types
+
+        if self._client is None:
+            self._client = genai.Client(api_key=settings.GOOGLE_API_KEY)
+        cache = self._client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                contents=[prefix],
+                display_name=f"prefix-{hashlib.sha256(prefix.encode()).hexdigest()[:12]}",
+                ttl=f"{self.ttl}s"
+            )
+        )
+        return cache.name
+
+    def invoke(self, llm, handle: Optional[Any], prefix: str, suffix: str):
+        if handle is None:
+            return super().invoke(llm, handle, prefix, suffix)
+        response = llm.invoke([HumanMessage(content=suffix)], cached_content=handle)
+        return response, cached_input_tokens(response)
+
+
+class LocalPrefixCache(ImplicitPrefixCache):
+    """Stand-in provider: keeps registered prefixes itself and prepends them, reporting them as cache reads.
+
+    Exercises the registration and hit accounting without a provider cache.
+    """
+
+    name = "local"
+
+    def __init__(self):
+        self.prefixes = {}
+
+    def register(self, model: str, prefix: str) -> Optional[Any]:
+        handle = f"local/{model}/{hashlib.sha256(prefix.encode()).hexdigest()[:12]}"
+        self.prefixes[handle] = prefix
+        return handle
+
+    def invoke(self, llm, handle: Optional[Any], prefix: str, suffix: str):
+        if handle not in self.prefixes:
+            return super().invoke(llm, handle, prefix, suffix)
+        response = llm.invoke([HumanMessage(content=self.prefixes[handle] + suffix)])
+        return response, count_tokens(self.prefixes[handle])
+
+
+class PrefixCacheMetrics:
+    """Per-agent prefix-cache hits, misses and cached prompt tokens."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            "calls": 0, "hits": 0, "misses": 0, "unreported": 0,
+            "registrations": 0, "prefix_tokens": 0, "cached_tokens": 0
+        })
+
+    def record_registration(self, agent: str):
+        with self._lock:
+            self._stats[agent]["registrations"] += 1
+
+    def record(self, agent: str, prefix_tokens: int, cached_tokens: Optional[int]):
+        with self._lock:
+            stats = self._stats[agent]
+            stats["calls"] += 1
+            stats["prefix_tokens"] += prefix_tokens
+            if cached_tokens is None:
+                stats["unreported"] += 1
+            elif cached_tokens > 0:
+                stats["hits"] += 1
+                stats["cached_tokens"] += cached_tokens
+            else:
+                stats["misses"] += 1
+
+    def snapshot(self) -> dict:
+        """Per agent; the hit rate only counts calls whose provider reported cache usage."""
+        with self._lock:
+            return {
+                agent: {
+                    **s,
+                    "hit_rate": s["hits"] / (s["hits"] + s["misses"]) if s["hits"] + s["misses"] else None
+                }
+                for agent, s in self._stats.items()
+            }
+
+
+class PromptCache:
+    """Registers static prompt prefixes once per model and sends prompts through the provider's cache.
+
+    ``PROMPT_PREFIX_CACHE`` selects the providers: ``auto`` uses Gemini
+    context caching for ``google_genai`` and implicit caching elsewhere,
+    ``local`` uses the stand-in for every model, ``off`` disables it.
+    Prefixes shorter than ``PROMPT_CACHE_MIN_TOKENS`` are sent as before.
+    """
+
+    def __init__(self, mode: str = None, min_tokens: int = None, ttl: int = None):
+        self.mode = mode or settings.PROMPT_PREFIX_CACHE
+        self.min_tokens = settings.PROMPT_CACHE_MIN_TOKENS if min_tokens is None else min_tokens
+        self.ttl = ttl or settings.PROMPT_CACHE_TTL
+        self.metrics = PrefixCacheMetrics()
+        self._lock = threading.Lock()
+        self._providers = {}
+        # (provider, model, prefix hash) -> (handle, expiry)
+        self._handles = {}
+        # Prefixes being registered, so concurrent callers do not upload them again
+        self._registering = set()
+        # Models whose provider refused a registration, until when they fall back to implicit caching
+        self._failed_until = {}
+
+    def applies_to(self, prefix: str) -> bool:
+        return self.mode != "off" and count_tokens(prefix) >= self.min_tokens
+
+    def _provider(self, model_provider: str) -> ImplicitPrefixCache:
+        name = "local" if self.mode == "local" else "gemini" if model_provider == "google_genai" else "implicit"
+        with self._lock:
+            if name not in self._providers:
+                self._providers[name] = {
+                    "local": LocalPrefixCache,
+                    "gemini": lambda: GeminiContextCache(self.ttl),
+                    "implicit": ImplicitPrefixCache,
+                }[name]()
+            return self._providers[name]
+
+    def _handle(self, agent: str, provider: ImplicitPrefixCache, model: str, prefix: str) -> Optional[Any]:
+        key = (provider.name, model, hashlib.sha256(prefix.encode()).hexdigest())
+        with self._lock:
+            if time.time() < self._failed_until.get((provider.name, model), 0.0):
+                return None
+            handle, expiry = self._handles.get(key, (None, 0.0))
+            # Re-register a little before the provider expires the cache
+            if handle is not None and time.time() < expiry - 60:
+                return handle
+            # Another call is uploading this prefix; send the full prompt rather than wait for it
+            if key in self._registering:
+                return handle
+            self._registering.add(key)
+
+        # Registration can be a network call; only this prefix's callers are affected while it runs
+        try:
+            handle = provider.register(model, prefix)
+        except Exception as e:
+            logger.warning(
+                f"Prefix cache registration failed for {model} ({provider.name}), "
+                f"sending full prompts for {settings.PROMPT_CACHE_RETRY_AFTER:.0f}s: {e}"
+            )
+            with self._lock:
+                self._failed_until[(provider.name, model)] = time.time() + settings.PROMPT_CACHE_RETRY_AFTER
+                self._registering.discard(key)
+            return None
+
+        with self._lock:
+            self._registering.discard(key)
+            if handle is not None:
+                self._handles[key] = (handle, time.time() + self.ttl)
+        if handle is not None:
+            self.metrics.record_registration(agent)
+        return handle
+
+    def invoke(self, agent: str, llm, model_provider: str, model: str, prefix: str, suffix: str):
+        provider = self._provider(model_provider)
+        handle = self._handle(agent, provider, model, prefix)
+        try:
+            response, cached_tokens = provider.invoke(llm, handle, prefix, suffix)
+        except Exception as e:
+            if handle is None:
+                raise
+            # The cached content may have been evicted early; drop it and send the full prompt
+            logger.warning(f"Cached prefix {handle} rejected, sending the full prompt: {e}")
+            with self._lock:
+                self._handles = {k: v for k, v in self._handles.items() if v[0] != handle}
+            response, cached_tokens = ImplicitPrefixCache().invoke(llm, None, prefix, suffix)
+        self.metrics.record(agent, count_tokens(prefix), cached_tokens)
+        return response
+
+
+@lru_cache()
+def get_prompt_cache() -> PromptCache:
+    return PromptCache()
+
+
+def main():
+    from .prompts import get_available_prompts, load_prompt
+
+    parser = argparse.ArgumentParser(description="Show the static prefix of each prompt and whether it is cached")
+    parser.add_argument("prompts", nargs="*", help="Prompt names (default: all)")
+    args = parser.parse_args()
+
+    cache = get_prompt_cache()
+    print(f"mode={cache.mode}, min prefix {cache.min_tokens} tokens")
+    print(f"{'prompt':<42}{'prefix':>8}{'total':>8}  cached")
+    for name in args.prompts or sorted(get_available_prompts()):
+        template = load_prompt(name)
+        prefix, _ = split_template(template)
+        print(f"{name:<42}{count_tokens(prefix):>8}{count_tokens(template):>8}  {'yes' if cache.applies_to(prefix) else 'no'}")
+    print("(approx. tokens)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Callable, Optional
+
+from .config import get_settings
+from .llm_governor import attempt_scope
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Exception classes worth another attempt, by name so no provider SDK has to be importable:
+# httpx and requests timeouts and dropped connections, the OpenAI SDK's timeout, rate-limit and
+# server errors, and the Google API core errors for overload and expired deadlines
+_TRANSIENT_ERROR_TYPES = {
+    "TimeoutException", "ConnectTimeout", "ReadTimeout", "WriteTimeout", "PoolTimeout",
+    "ConnectError", "ReadError", "WriteError", "RemoteProtocolError", "NetworkError", "Timeout",
+    "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "TooManyRequests"
+}
+# HTTP statuses worth another attempt: request timeout, rate limit and 5xx overload
+_TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Latencies kept per agent for the hedging percentile
+LATENCY_WINDOW = 200
+
+
+def _status(error: BaseException) -> Optional[int]:
+    for candidate in (error, getattr(error, "response", None)):
+        for attribute in ("status_code", "code", "status"):
+            value = getattr(candidate, attribute, None)
+            # google.api_core's ``code`` is an HTTPStatus, an int subclass
+            if isinstance(value, int) and not isinstance(value, bool):
+                return int(value)
+    return None
+
+
+def is_transient(error: BaseException) -> bool:
+    """Timeouts, dropped connections, rate limits and 5xx responses, judged by exception type and status code.
+
+    Wrapped errors are judged by their cause, so a provider error re-raised by LangChain still counts.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (TimeoutError, ConnectionError)):
+            return True
+        if any(cls.__name__ in _TRANSIENT_ERROR_TYPES for cls in type(error).__mro__):
+            return True
+        if _status(error) in _TRANSIENT_STATUS:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class RequestPolicyMetrics:
+    """Per-agent attempts, retries, hedges and which attempt won, with the per-model latency percentiles hedging uses."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self._stats = defaultdict(lambda: {
+            "calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "deadline_exceeded": 0, "failures": 0
+        })
+
+    def percentile(self, agent: str, model: str, q: float) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(self._latencies[(agent, model)])
+        if len(latencies) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def record_latency(self, agent: str, model: str, latency: float):
+        with self._lock:
+            self._latencies[(agent, model)].append(latency)
+
+    def count(self, agent: str, name: str):
+        with self._lock:
+            self._stats[agent][name] += 1
+
+    def hedge_allowed(self, agent: str) -> bool:
+        """Hedges stay within LLM_HEDGE_BUDGET of the agent's calls."""
+        with self._lock:
+            stats = self._stats[agent]
+            return stats["hedges"] < settings.LLM_HEDGE_BUDGET * stats["calls"]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = {agent: dict(stats, latency={}) for agent, stats in self._stats.items()}
+            for (agent, model), latencies in self._latencies.items():
+                if latencies and agent in snapshot:
+                    ordered = sorted(latencies)
+                    snapshot[agent]["latency"][model] = {
+                        f"p{int(q * 100)}": ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+                        for q in (0.5, 0.9, 0.99)
+                    }
+            return snapshot
+
+
+class RequestPolicy:
+    """Deadlines, retries with exponential backoff, and hedged duplicates for LLM calls.
+
+    ``LLM_DEADLINES`` bounds each agent's call, retries included (0 or
+    missing is unbounded). Transient errors are retried up to
+    ``LLM_RETRIES`` times, waiting ``LLM_RETRY_BACKOFF`` seconds doubled per
+    retry, with jitter. Once the agent has ``LLM_HEDGE_MIN_SAMPLES``
+    latencies, an attempt still running at the observed p90 gets a
+    duplicate and the first response wins, within ``LLM_HEDGE_BUDGET``.
+    Hedges are skipped while ``max_workers`` attempts, abandoned losers
+    included, are still running. Attempts still queued in the executor or
+    waiting on the LLM governor when the call returns are dropped unsent.
+    """
+
+    def __init__(self, max_workers: int = 32):
+        self.metrics = RequestPolicyMetrics()
+        self.max_workers = max_workers
+        # Abandoned hedges finish in the background, so attempts run on a pool rather than the caller's thread
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-request")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def _submit(self, agent: str, model: str, send: Callable, abandoned: threading.Event):
+        def timed():
+            start = time.monotonic()
+            try:
+                # The governor drops the request if the caller stops waiting before it is sent
+                with attempt_scope(abandoned):
+                    result = send()
+                self.metrics.record_latency(agent, model, time.monotonic() - start)
+                return result
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+        with self._lock:
+            self._in_flight += 1
+        # Attempts keep the caller's request context (session, priority)
+        future = self._executor.submit(contextvars.copy_context().run, timed)
+        future.add_done_callback(self._release_cancelled)
+        return future
+
+    def _release_cancelled(self, future):
+        # A cancelled attempt never ran, so never left the in-flight count itself
+        if future.cancelled():
+            with self._lock:
+                self._in_flight -= 1
+
+    def _room_for_hedge(self) -> bool:
+        # A hedge that would queue behind other attempts cannot beat the original;
+        # abandoned attempts still running count, so slow providers cannot pile them up
+        with self._lock:
+            return self._in_flight < self.max_workers
+
+    def _attempt(self, agent: str, model: str, send: Callable, deadline: Optional[float]):
+        """One attempt, hedged once it outlives the model's p90 latency; returns the first response to arrive."""
+        start = time.monotonic()
+        abandoned = threading.Event()
+        original = self._submit(agent, model, send, abandoned)
+        pending = {original}
+        p90 = self.metrics.percentile(agent, model, 0.9)
+        # Measured from the attempt's start, however many waits it takes to get there
+        hedge_at = start + p90 if p90 is not None else None
+        error = None
+        try:
+            while pending:
+                wake_at = min((t for t in (deadline, hedge_at) if t is not None), default=None)
+                timeout = None if wake_at is None else max(0.0, wake_at - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is not original:
+                            self.metrics.count(agent, "hedge_wins")
+                        return future.result()
+                    error = error or future.exception()
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"{agent} LLM call exceeded its {settings.LLM_DEADLINES.get(agent)}s deadline")
+                if done:
+                    # The other attempt, if any, may still answer; with none left the error goes back to call()
+                    continue
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    if self.metrics.hedge_allowed(agent) and self._room_for_hedge():
+                        self.metrics.count(agent, "hedges")
+                        logger.info(f"🪁 {agent} call past its p90 latency ({p90:.1f}s), sending a hedged duplicate")
+                        pending.add(self._submit(agent, model, send, abandoned))
+                    # At most one hedge per attempt
+                    hedge_at = None
+        finally:
+            # Losers and timed-out attempts are dropped rather than sent if they have not reached the provider yet
+            abandoned.set()
+            for future in pending:
+                future.cancel()
+        raise error
+
+    def call(self, agent: str, model: str, send: Callable):
+        """Run ``send`` (one request to ``model``) under the agent's deadline, retry and hedging policy."""
+        self.metrics.count(agent, "calls")
+        limit = settings.LLM_DEADLINES.get(agent) or 0
+        deadline = time.monotonic() + limit if limit > 0 else None
+        retries = 0
+        while True:
+            try:
+                return self._attempt(agent, model, send, deadline)
+            except Exception as e:
+                out_of_time = deadline is not None and time.monotonic() >= deadline
+                if out_of_time:
+                    self.metrics.count(agent, "deadline_exceeded")
+                if out_of_time or retries >= settings.LLM_RETRIES or not is_transient(e):
+                    self.metrics.count(agent, "failures")
+                    raise
+                retries += 1
+                self.metrics.count(agent, "retries")
+                backoff = settings.LLM_RETRY_BACKOFF * 2 ** (retries - 1) * random.uniform(0.5, 1.5)
+                if deadline is not None:
+                    backoff = min(backoff, max(0.0, deadline - time.monotonic()))
+                logger.warning(f"🔁 {agent} LLM call failed ({e}); retry {retries}/{settings.LLM_RETRIES} in {backoff:.1f}s")
+                time.sleep(backoff)
+
+
+@lru_cache()
+def get_request_policy() -> RequestPolicy:
+    return RequestPolicy()
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import logging
+import math
+import re
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from .config import get_settings
+from .map_registry import get_map_registry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+REPO_MAPS_DIR = Path(__file__).resolve().parent.parent / "maps"
+
+# Bumped when index_network() changes, so towns indexed by an older version are re-indexed
+INDEX_VERSION = 2
+
+# Lanes and length for a road to count as a multi-lane (highway-like) straight
+STRAIGHT_MIN_LANES = 3
+STRAIGHT_MIN_LENGTH = 100.0
+STRAIGHT_MIN_RATIO = 0.99
+
+# Query keywords and the road features a town needs to host the scenario
+MAP_REQUIREMENTS = [
+    (re.compile(r"\broundabouts?\b|\btraffic circle\b", re.I), "roundabout",
+     lambda t: t["roundabouts"] > 0),
+    (re.compile(r"\b(on|off)[- ]?ramps?\b|\bramps?\b|\bmerg\w* (on|in)to (the )?(highway|freeway|motorway)", re.I), "ramp",
+     lambda t: t["ramps"] > 0),
+    (re.compile(r"\b(highway|freeway|motorway|expressway)s?\b", re.I), "highway",
+     lambda t: t["multi_lane_straights"] > 0),
+    (re.compile(r"\b(4|four)[- ]way\b|\bcrossroads?\b", re.I), "4-way junction",
+     lambda t: t["junctions"]["by_arity"].get("4", 0) > 0),
+    (re.compile(r"\bT[- ](junction|intersection)s?\b|\b(3|three)[- ]way\b", re.I), "T-junction",
+     lambda t: t["junctions"]["by_arity"].get("3", 0) > 0),
+    (re.compile(r"\btraffic (light|signal)s?\b|\bred light\b", re.I), "traffic light",
+     lambda t: t["junctions"]["traffic_light"] > 0),
+    (re.compile(r"\bintersections?\b|\bjunctions?\b", re.I), "intersection",
+     lambda t: t["junctions"]["total"] > 0),
+    (re.compile(r"\blane[- ]chang\w*\b|\bovertak\w*\b|\bmulti[- ]lane\b|\b(two|2|three|3)[- ]lanes?\b|\badjacent lane\b", re.I), "multi-lane road",
+     lambda t: t["lanes"]["max"] >= 2),
+    (re.compile(r"\bpark(ed|ing)\b", re.I), "parking lane",
+     lambda t: t["parking_edges"] > 0),
+]
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _shape_ratio(shape: str, length: float) -> float:
+    points = shape.split()
+    if length <= 0 or len(points) < 2:
+        return 1.0
+    start = [float(v) for v in points[0].split(",")[:2]]
+    end = [float(v) for v in points[-1].split(",")[:2]]
+    return math.dist(start, end) / length
+
+
+def is_signalised(junction_type: Optional[str], junction_id: str, signal_programs: set) -> bool:
+    """Whether a SUMO junction is signal-controlled: ``traffic_light*`` type or a ``tlLogic`` of its own."""
+    return (junction_type or "").startswith("traffic_light") or junction_id in signal_programs
+
+
+def index_network(net_path: Path) -> dict:
+    """Stream a SUMO .net.xml into a compact feature table.
+
+    Internal (junction) edges are skipped. A junction's arity is the number
+    of distinct roads meeting at it, counting a road and its reverse
+    direction (``-12`` / ``12``) once. A ramp is a single-lane road meeting
+    a road with three or more lanes at a three-leg priority junction.
+    Signalised junctions are the counted ones (three or more roads) of type
+    ``traffic_light*`` or controlled by a ``tlLogic``; CARLA also puts
+    signals on two-road nodes, which are not intersections.
+    """
+    junction_types = {}
+    signal_programs = set()
+    roads_at = defaultdict(set)
+    lanes_at = defaultdict(list)
+    edges_by_lanes = Counter()
+    road_length = 0.0
+    longest_edge = 0.0
+    straights = 0
+    parking_edges = 0
+    roundabouts = 0
+
+    context = ET.iterparse(net_path, events=("start", "end"))
+    _, root = next(context)
+    for event, element in context:
+        if event != "end":
+            continue
+
+        if element.tag == "edge":
+            if element.get("function") != "internal":
+                lanes = [lane for lane in element if lane.tag == "lane"]
+                edge_type = element.get("type") or ""
+                if lanes and "driving" in edge_type:
+                    first = lanes[0]
+                    length = float(first.get("length", 0))
+                    road = element.get("id").lstrip("-")
+                    for node in (element.get("from"), element.get("to")):
+                        roads_at[node].add(road)
+                        lanes_at[node].append(len(lanes))
+
+                    edges_by_lanes[len(lanes)] += 1
+                    road_length += length
+                    longest_edge = max(longest_edge, length)
+                    if (
+                        len(lanes) >= STRAIGHT_MIN_LANES
+                        and length >= STRAIGHT_MIN_LENGTH
+                        and _shape_ratio(first.get("shape", ""), length) >= STRAIGHT_MIN_RATIO
+                    ):
+                        straights += 1
+                    if "parking" in edge_type:
+                        parking_edges += 1
+            root.clear()
+        elif element.tag == "junction":
+            junction_types[element.get("id")] = element.get("type")
+            root.clear()
+        elif element.tag == "tlLogic":
+            signal_programs.add(element.get("id"))
+            root.clear()
+        elif element.tag == "roundabout":
+            roundabouts += 1
+            root.clear()
+
+    by_arity = Counter()
+    ramps = 0
+    signalised = 0
+    for node, roads in roads_at.items():
+        arity = len(roads)
+        if arity < 3:
+            continue
+        by_arity["5+" if arity >= 5 else str(arity)] += 1
+        if is_signalised(junction_types.get(node), node, signal_programs):
+            signalised += 1
+        lanes = lanes_at[node]
+        if arity == 3 and junction_types.get(node) == "priority" and max(lanes) >= STRAIGHT_MIN_LANES and min(lanes) == 1:
+            ramps += 1
+
+    return {
+        "junctions": {
+            "total": sum(by_arity.values()),
+            "traffic_light": signalised,
+            "by_arity": dict(sorted(by_arity.items()))
+        },
+        "lanes": {
+            "max": max(edges_by_lanes, default=0),
+            "edges_by_lanes": {str(n): count for n, count in sorted(edges_by_lanes.items())}
+        },
+        "road_length_m": round(road_length, 1),
+        "longest_edge_m": round(longest_edge, 1),
+        "multi_lane_straights": straights,
+        "ramps": ramps,
+        "roundabouts": roundabouts,
+        "parking_edges": parking_edges
+    }
+
+
+class RoadTopology:
+    """Per-town road features indexed from ``maps/*.net.xml``."""
+
+    def __init__(self, path: str = settings.ROAD_TOPOLOGY_PATH):
+        self.path = Path(path)
+        self.towns: dict[str, dict] = {}
+        if self.path.exists():
+            try:
+                self.towns = json.loads(self.path.read_text(encoding="utf-8")).get("towns", {})
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable road topology index {self.path}: {e}")
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"built_at": datetime.now().isoformat(), "towns": self.towns}
+        self.path.write_text(json.dumps(data, indent=1), encoding="utf-8")
+
+    def build(self, maps_dir: Path = REPO_MAPS_DIR, force: bool = False) -> list:
+        """Index every changed .net.xml; returns the towns that were (re)indexed."""
+        indexed = []
+        for net_path in sorted(Path(maps_dir).glob("*.net.xml")):
+            town = net_path.name[:-len(".net.xml")]
+            source_sha256 = _sha256(net_path)
+            indexed_as = self.towns.get(town, {})
+            if (
+                not force
+                and indexed_as.get("source_sha256") == source_sha256
+                and indexed_as.get("index_version") == INDEX_VERSION
+            ):
+                continue
+            self.towns[town] = {"source_sha256": source_sha256, "index_version": INDEX_VERSION, **index_network(net_path)}
+            indexed.append(town)
+
+        if indexed:
+            self.save()
+        return indexed
+
+    @staticmethod
+    def requirements(user_query: str) -> list:
+        return [(name, check) for pattern, name, check in MAP_REQUIREMENTS if pattern.search(user_query or "")]
+
+    def missing_features(self, town: str, user_query: str) -> Optional[list]:
+        """Features the query needs that ``town`` lacks, or None for an unindexed town."""
+        features = self.towns.get(town)
+        if features is None:
+            return None
+        return [name for name, check in self.requirements(user_query) if not check(features)]
+
+    def select_map(self, user_query: str, suggested_map: Optional[str] = None) -> tuple:
+        """Keep ``suggested_map`` if it has every feature the query names, otherwise pick the town that does.
+
+        Only towns with an OpenDRIVE map in the map registry are picked;
+        Town03 and Town05 have a SUMO network here but no ``.xodr``.
+        Returns ``(map, reason)``; the map is None when nothing can be said.
+        """
+        available = set(get_map_registry().maps())
+        reason = None
+        if suggested_map and suggested_map not in available:
+            reason = f"{suggested_map} has no OpenDRIVE map"
+            suggested_map = settings.MAP if settings.MAP in available else None
+
+        requirements = self.requirements(user_query)
+        if not requirements or not self.towns:
+            return suggested_map, reason
+
+        names = [name for name, _ in requirements]
+        if suggested_map and self.missing_features(suggested_map, user_query) == []:
+            return suggested_map, f"{suggested_map} has {', '.join(names)}"
+
+        candidates = [
+            town for town, features in self.towns.items()
+            if town in available and all(check(features) for _, check in requirements)
+        ]
+        if not candidates:
+            return suggested_map, f"no indexed town has all of {', '.join(names)}"
+
+        # Prefer the town with the most road to place actors on
+        best = max(candidates, key=lambda town: (town == settings.MAP, self.towns[town]["road_length_m"]))
+        return best, f"{best} has {', '.join(names)}"
+
+
+@lru_cache()
+def get_road_topology() -> RoadTopology:
+    return RoadTopology()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Index the road topology of maps/*.net.xml for map selection"
+    )
+    parser.add_argument("-d", "--maps-dir", default=str(REPO_MAPS_DIR), help="Directory of .net.xml files")
+    parser.add_argument("-f", "--force", action="store_true", help="Re-index towns whose source did not change")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    topology = RoadTopology()
+    indexed = topology.build(Path(args.maps_dir), force=args.force)
+    print(f"Indexed {len(indexed)} town(s) into {topology.path}: {', '.join(indexed) or 'all up to date'}")
+    for town, features in sorted(topology.towns.items()):
+        junctions = features["junctions"]
+        print(
+            f"  {town}: {junctions['total']} junctions {junctions['by_arity']}, "
+            f"{junctions['traffic_light']} signalised, max {features['lanes']['max']} lanes, "
+            f"{features['road_length_m'] / 1000:.1f} km, {features['ramps']} ramps, {features['roundabouts']} roundabouts"
+        )
+
+
+if __name__ == "__main__":
+    main()
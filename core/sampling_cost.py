@@ -0,0 +1,191 @@
+import contextlib
+import io
+import logging
+import multiprocessing
+import re
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from queue import Empty
+from typing import Optional
+
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Scenes sampled when the workflow check is off (SAMPLING_SCENES = 0) but the estimate is run directly
+DEFAULT_SCENES = 10
+
+_REJECTION_RE = re.compile(r"Rejected sample \d+ because of:?\s*(.+)")
+
+
+@dataclass
+class SamplingReport:
+    requested: int
+    generated: int = 0
+    failed: int = 0
+    iterations: int = 0
+    compile_time: float = 0.0
+    sampling_time: float = 0.0
+    elapsed: float = 0.0
+    timed_out: bool = False
+    error: Optional[str] = None
+    violations: list = field(default_factory=list)
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.generated / self.iterations if self.iterations else 0.0
+
+    @property
+    def mean_scene_time(self) -> Optional[float]:
+        return self.sampling_time / self.generated if self.generated else None
+
+    def passed(self, min_acceptance: float = settings.SAMPLING_MIN_ACCEPTANCE) -> Optional[bool]:
+        """Gate result; None when the program could not be compiled or sampled at all."""
+        if self.error:
+            return None
+        return self.generated > 0 and self.acceptance_rate >= min_acceptance
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["acceptance_rate"] = self.acceptance_rate
+        data["mean_scene_time"] = self.mean_scene_time
+        data["passed"] = self.passed()
+        return data
+
+    def summary(self) -> str:
+        if self.error:
+            return f"Sampling check skipped: {self.error}"
+        mean = f"{self.mean_scene_time:.2f}s/scene" if self.generated else "no scene generated"
+        text = (
+            f"Sampling: {self.generated}/{self.requested} scenes, "
+            f"acceptance {self.acceptance_rate:.1%} over {self.iterations} samples, {mean}"
+        )
+        if self.timed_out:
+            text += f" (stopped at the {self.elapsed:.0f}s budget)"
+        if self.violations:
+            text += "; most violated: " + ", ".join(f"{reason} ({count})" for reason, count in self.violations[:3])
+        return text
+
+
+def _sampling_worker(code: str, params: dict, scenes: int, max_iterations: int, queue):
+    try:
+        import scenic
+        from scenic.core.distributions import RejectionException
+
+        start = time.perf_counter()
+        scenario = scenic.scenarioFromString(code, params=params, mode2D=True)
+        queue.put(("compiled", time.perf_counter() - start))
+
+        for _ in range(scenes):
+            output = io.StringIO()
+            start = time.perf_counter()
+            try:
+                # Rejection reasons are only reported on stdout at verbosity 2
+                with contextlib.redirect_stdout(output):
+                    _, iterations = scenario.generate(maxIterations=max_iterations, verbosity=2)
+                accepted = True
+            except RejectionException:
+                accepted, iterations = False, max_iterations
+            reasons = Counter(m.group(1).strip() for m in _REJECTION_RE.finditer(output.getvalue()))
+            queue.put(("scene", accepted, iterations, time.perf_counter() - start, dict(reasons)))
+    except Exception as e:
+        queue.put(("error", f"{type(e).__name__}: {e}"))
+    queue.put(("done",))
+
+
+def estimate_sampling_cost(
+    code: str,
+    params: Optional[dict] = None,
+    scenes: int = settings.SAMPLING_SCENES or DEFAULT_SCENES,
+    time_budget: float = settings.SAMPLING_TIME_BUDGET,
+    max_iterations: int = settings.SAMPLING_MAX_ITERATIONS
+) -> SamplingReport:
+    """Compile a Scenic program and sample scenes from it in a worker process.
+
+    No simulator is involved; the program is compiled in 2D mode against
+    the local map files. The worker is terminated once ``time_budget``
+    seconds (compilation included) have passed, and the report covers
+    whatever was sampled until then.
+    """
+    report = SamplingReport(requested=scenes)
+    violations = Counter()
+
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_sampling_worker,
+        args=(code, params or {}, scenes, max_iterations, queue),
+        daemon=True
+    )
+    start = time.perf_counter()
+    process.start()
+    try:
+        while True:
+            remaining = start + time_budget - time.perf_counter()
+            if remaining <= 0:
+                report.timed_out = True
+                break
+            try:
+                message = queue.get(timeout=min(remaining, 0.5))
+            except Empty:
+                if not process.is_alive():
+                    report.error = f"sampling worker exited with code {process.exitcode}"
+                    break
+                continue
+
+            kind = message[0]
+            if kind == "compiled":
+                report.compile_time = message[1]
+            elif kind == "scene":
+                _, accepted, iterations, duration, reasons = message
+                report.generated += accepted
+                report.failed += not accepted
+                report.iterations += iterations
+                report.sampling_time += duration
+                violations.update(reasons)
+            elif kind == "error":
+                report.error = message[1]
+            elif kind == "done":
+                break
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join(timeout=5)
+
+    report.elapsed = time.perf_counter() - start
+    report.violations = [[reason, count] for reason, count in violations.most_common(5)]
+    return report
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(
+        description="Estimate how expensive a Scenic program is to sample, without a simulator"
+    )
+    parser.add_argument("path", help="Scenic file")
+    parser.add_argument("-n", "--scenes", type=int, default=settings.SAMPLING_SCENES or DEFAULT_SCENES, help="Scenes to sample")
+    parser.add_argument("-t", "--time-budget", type=float, default=settings.SAMPLING_TIME_BUDGET, help="Seconds before the worker is stopped")
+    parser.add_argument("-i", "--max-iterations", type=int, default=settings.SAMPLING_MAX_ITERATIONS, help="Rejection-sampling iterations per scene")
+    parser.add_argument("-m", "--map", help="Absolute path of the map to use instead of the header's param map")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as f:
+        code = f.read()
+
+    report = estimate_sampling_cost(
+        code,
+        params={"map": args.map} if args.map else None,
+        scenes=args.scenes,
+        time_budget=args.time_budget,
+        max_iterations=args.max_iterations
+    )
+    print(report.summary())
+    print(json.dumps(report.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
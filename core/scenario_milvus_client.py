@@ -1,7 +1,7 @@
 
-from pymilvus import connections, Collection
 from .config import get_settings
 from .embedding import EmbeddingModel
+from .single_flight import get_single_flight
 
 import logging
 
@@ -19,6 +19,8 @@ class ScenarioMilvusClient:
         except Exception as e:
             raise
         
+        from pymilvus import connections, Collection
+
         try:
             connections.connect(uri=settings.MILVUS_URI, token=settings.MILVUS_TOKEN)
             self.collection = Collection(collection_name)
@@ -29,6 +31,15 @@ class ScenarioMilvusClient:
             raise
     
     def search_components_by_type(self, query: str, component_type: str, limit: int = 5) -> list:
+        if not settings.SINGLE_FLIGHT:
+            return self._search_components_by_type(query, component_type, limit)
+        # Concurrent identical searches (overlapping sessions or batch lines) share one embedding and search
+        return get_single_flight("retrieval").do(
+            (self.collection_name, component_type, query, limit),
+            lambda: self._search_components_by_type(query, component_type, limit)
+        )
+    
+    def _search_components_by_type(self, query: str, component_type: str, limit: int) -> list:
         try:
             query_embedding = self.embedding.embed_query(query)
             
@@ -127,6 +138,8 @@ class ScenarioMilvusClient:
         return components
     
     def close(self):
+        from pymilvus import connections
+
         try:
             if self.collection:
                 self.collection.release()
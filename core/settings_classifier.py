@@ -0,0 +1,261 @@
+import math
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from .road_topology import get_road_topology
+
+# Weather kinds combine with the time of day into a CARLA preset name
+WEATHER_PHRASES = {
+    "SoftRain": ["light rain", "soft rain", "drizzle", "drizzling", "light shower", "light showers", "sprinkling"],
+    "MidRain": ["rain", "rainy", "raining", "rainfall", "showers", "shower"],
+    "HardRain": ["heavy rain", "hard rain", "downpour", "pouring", "storm", "stormy", "thunderstorm", "rainstorm", "torrential rain"],
+    "Clear": ["sunny", "sunshine", "clear weather", "clear sky", "clear skies", "clear day", "bright day", "good weather"],
+    "Cloudy": ["cloudy", "overcast", "clouds", "gray sky", "grey sky", "gloomy"],
+    "Wet": ["wet", "damp", "wet road", "wet roads", "puddles", "slippery road"],
+    "WetCloudy": ["wet and cloudy", "cloudy and wet", "wet cloudy"],
+}
+
+TIME_PHRASES = {
+    "Noon": ["noon", "midday", "daytime", "during the day", "afternoon", "morning", "dawn", "daylight"],
+    "Sunset": ["sunset", "dusk", "evening", "twilight", "night", "nighttime", "at night", "dark", "after dark"],
+}
+
+MAP_PHRASES = {
+    ("intersection", "Town04"): ["intersection", "crossroad", "crossroads", "junction", "traffic light", "traffic lights", "turning", "turns left", "turns right"],
+    ("urban", "Town10HD"): ["urban", "city", "metropolitan", "city street", "city streets", "downtown", "dense urban"],
+    ("rural", "Town07"): ["rural", "countryside", "village", "farmland", "country road"],
+    ("highway", "Town04"): ["highway", "freeway", "motorway", "expressway"],
+}
+
+VEHICLE_ALIASES = {
+    "truck": "vehicle.carlamotors.firetruck",
+    "fire truck": "vehicle.carlamotors.firetruck",
+    "firetruck": "vehicle.carlamotors.firetruck",
+    "motorcycle": "vehicle.yamaha.yzf",
+    "motorbike": "vehicle.yamaha.yzf",
+    "bike": "vehicle.diamondback.century",
+    "bicycle": "vehicle.diamondback.century",
+    "cyclist": "vehicle.diamondback.century",
+    "ambulance": "vehicle.ford.ambulance",
+    "police car": "vehicle.dodge.charger_police",
+    "bus": "vehicle.mitsubishi.fusorosa",
+    "van": "vehicle.mercedes.sprinter",
+    "pedestrian": "walker.pedestrian.0001",
+}
+
+# Phrases that only imply a setting, scored like the settings prompt's "moderate/strong implication"
+IMPLIED_PHRASES = {"turning": 0.6, "turns left": 0.6, "turns right": 0.6, "puddles": 0.8, "slippery road": 0.8}
+
+# Brands whose first blueprint is not the one the settings prompt uses
+BRAND_DEFAULTS = {
+    "tesla": "vehicle.tesla.model3",
+    "audi": "vehicle.audi.tt",
+    "lincoln": "vehicle.lincoln.mkz_2017",
+}
+
+# Model names that are ordinary words in scenario descriptions
+_AMBIGUOUS_MODELS = {"crown", "century", "coupe", "leon", "tt", "a2", "t2"}
+
+# Words that say a setting is meant even though no phrase above covers them
+UNRESOLVED_HINTS = {
+    "weather": re.compile(r"\b(fog\w*|mist\w*|snow\w*|ic[ey]|hail\w*|weather|haz[ey])\b", re.I),
+}
+
+# Only vehicles tied to the ego set the blueprint; other vehicles belong to adversaries
+_EGO_BEFORE_RE = re.compile(r"(?:\bego(?:\s+(?:vehicle|car))?\s+(?:is\s+|as\s+)?(?:an?\s+|the\s+)?|\bdriv\w*\s+(?:an?\s+|the\s+)?)$", re.I)
+_EGO_AFTER_RE = re.compile(r"^\s+as\s+(?:the\s+)?ego\b", re.I)
+
+# Simulator params a query can set explicitly; passed to the header as extra ``param`` lines
+HEADER_PARAM_PATTERNS = {
+    "timestep": (re.compile(r"\btime[- ]?step\s*(?:of|=|:)?\s*(\d*\.?\d+)\s*(?:s|secs?|seconds?)?\b", re.I), float),
+    "render": (re.compile(r"\b(headless|without rendering|no rendering|rendering off)\b", re.I), lambda _: 0),
+}
+
+FUZZY_MIN_SIMILARITY = 0.7
+# Near misses below the match threshold still leave their field to the LLM
+FUZZY_NEAR_SIMILARITY = 0.6
+
+
+def weather_preset(kind: str, time_of_day: str) -> str:
+    if kind == "MidRain" and time_of_day == "Noon":
+        return "MidRainyNoon"
+    return f"{kind}{time_of_day}"
+
+
+def _trigrams(text: str) -> Counter:
+    padded = f"  {text} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class SettingsClassifier:
+    """Phrase index and fuzzy nearest-neighbour lookup for weather, time of day, map and ego blueprint.
+
+    Exact phrases are matched with one regex; words the regex misses are
+    compared to the single-word phrases through character-trigram vectors
+    (catching misspellings like "rainny" or "cloudly"). ``classify`` marks a
+    result unresolved when a field gets conflicting values or the query
+    hints at a setting nothing here covers, so the caller can ask the LLM.
+    """
+
+    def __init__(self, blueprints: Optional[list] = None):
+        if blueprints is None:
+            from utilities.carla_catalog import CarlaCatalog
+            blueprints = CarlaCatalog.load().blueprints
+
+        self.phrases: Dict[str, tuple] = {}
+        for kind, phrases in WEATHER_PHRASES.items():
+            self._add(phrases, "weather", kind)
+        for time_of_day, phrases in TIME_PHRASES.items():
+            self._add(phrases, "time", time_of_day)
+        for value, phrases in MAP_PHRASES.items():
+            self._add(phrases, "map", value)
+        self._add_blueprints(blueprints)
+
+        alternatives = sorted(self.phrases, key=len, reverse=True)
+        self._phrase_re = re.compile(r"\b(" + "|".join(re.escape(p) for p in alternatives) + r")\b", re.I)
+
+        # Inverted trigram index over single-word phrases for the fuzzy lookup
+        self._vectors = {}
+        self._postings = defaultdict(list)
+        for phrase in self.phrases:
+            if " " not in phrase and len(phrase) >= 4:
+                vector = _trigrams(phrase)
+                self._vectors[phrase] = (vector, math.sqrt(sum(v * v for v in vector.values())))
+                for gram in vector:
+                    self._postings[gram].append(phrase)
+
+    def _add(self, phrases: list, field: str, value):
+        for phrase in phrases:
+            self.phrases.setdefault(phrase.lower(), (field, value))
+
+    def _add_blueprints(self, blueprints: list):
+        for phrase, blueprint in VEHICLE_ALIASES.items():
+            self._add([phrase], "vehicle", blueprint)
+
+        by_brand = defaultdict(list)
+        for blueprint in blueprints:
+            parts = blueprint.split(".")
+            if len(parts) != 3 or parts[0] != "vehicle":
+                continue
+            _, brand, model = parts
+            by_brand[brand].append(blueprint)
+            if model not in _AMBIGUOUS_MODELS:
+                self.phrases.setdefault(model.replace("_", " "), ("vehicle", blueprint))
+                self.phrases.setdefault(f"{brand} {model.replace('_', ' ')}", ("vehicle", blueprint))
+        for brand, brand_blueprints in by_brand.items():
+            default = BRAND_DEFAULTS.get(brand, min(brand_blueprints, key=len))
+            self.phrases.setdefault(brand.replace("-", " "), ("vehicle", default))
+
+    def _fuzzy(self, word: str) -> tuple:
+        vector = _trigrams(word)
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        dots = Counter()
+        for gram, count in vector.items():
+            for phrase in self._postings.get(gram, ()):
+                dots[phrase] += count * self._vectors[phrase][0][gram]
+        best, similarity = None, 0.0
+        for phrase, dot in dots.items():
+            # Prefixes of longer names ("must" in "mustang") are not misspellings
+            if abs(len(phrase) - len(word)) > 2:
+                continue
+            score = dot / (norm * self._vectors[phrase][1])
+            if score > similarity:
+                best, similarity = phrase, score
+        return best, similarity
+
+    def _is_ego_vehicle(self, query: str, start: int, end: int) -> bool:
+        return bool(_EGO_BEFORE_RE.search(query[max(0, start - 30):start]) or _EGO_AFTER_RE.match(query[end:end + 20]))
+
+    def classify(self, user_query: str) -> Dict[str, Any]:
+        """Settings in the shape ``SettingsDetectorAgent.detect_settings`` returns, plus ``resolved``."""
+        found = defaultdict(dict)  # field -> value -> confidence
+        matched_spans = []
+        near_misses = set()
+        for match in self._phrase_re.finditer(user_query):
+            field, value = self.phrases[match.group(1).lower()]
+            matched_spans.append(match.span())
+            if field == "vehicle" and not self._is_ego_vehicle(user_query, match.start(), match.end()):
+                continue
+            confidence = IMPLIED_PHRASES.get(match.group(1).lower(), 1.0)
+            found[field][value] = max(found[field].get(value, 0.0), confidence)
+
+        # Misspelled words: only where a field is still open
+        if len(found) < 4:
+            for word in re.finditer(r"[A-Za-z]{4,}", user_query):
+                if any(a <= word.start() < b for a, b in matched_spans):
+                    continue
+                phrase, similarity = self._fuzzy(word.group().lower())
+                if phrase is None or similarity < FUZZY_NEAR_SIMILARITY:
+                    continue
+                field, value = self.phrases[phrase]
+                if field in found or (field == "vehicle" and not self._is_ego_vehicle(user_query, word.start(), word.end())):
+                    continue
+                if similarity < FUZZY_MIN_SIMILARITY:
+                    near_misses.add(field)
+                else:
+                    found[field][value] = max(found[field].get(value, 0.0), similarity)
+
+        unresolved = [field for field, values in found.items() if len(values) > 1]
+        unresolved += [field for field in near_misses if field not in found]
+        # "wet" and "cloudy" together are one preset
+        if set(found.get("weather", {})) == {"Wet", "Cloudy"}:
+            found["weather"] = {"WetCloudy": min(found["weather"].values())}
+            unresolved.remove("weather")
+        for field, pattern in UNRESOLVED_HINTS.items():
+            if field not in found and pattern.search(user_query):
+                unresolved.append(field)
+
+        def pick(field):
+            values = found.get(field)
+            return max(values.items(), key=lambda item: item[1]) if values else (None, None)
+
+        kind, weather_confidence = pick("weather")
+        time_of_day, time_confidence = pick("time")
+        (map_type, suggested_map), map_confidence = pick("map") if "map" in found else ((None, None), None)
+        blueprint, blueprint_confidence = pick("vehicle")
+
+        weather = None
+        if kind or time_of_day:
+            weather = weather_preset(kind or "Clear", time_of_day or "Noon")
+
+        # Road features named in the query decide or correct the town
+        suggested_map, map_reason = get_road_topology().select_map(user_query, suggested_map)
+        if suggested_map and map_confidence is None:
+            map_confidence = 0.9
+
+        confidences = [c for c in (weather_confidence, time_confidence, map_confidence, blueprint_confidence) if c is not None]
+        reasons = [
+            f"{field}: {', '.join(' '.join(v) if isinstance(v, tuple) else v for v in values)}"
+            for field, values in found.items()
+        ]
+        if map_reason:
+            reasons.append(f"road topology: {map_reason}")
+
+        return {
+            "weather": weather,
+            "map_type": map_type,
+            "suggested_map": suggested_map,
+            "time_of_day": time_of_day.lower() if time_of_day else None,
+            "blueprint": blueprint,
+            "confidence": min(confidences) if confidences else 0.0,
+            "reasoning": f"Rule-based detection ({'; '.join(reasons) or 'no settings mentioned'})",
+            "resolved": not unresolved,
+            "source": "rules"
+        }
+
+    @staticmethod
+    def header_params(user_query: str) -> Dict[str, Any]:
+        """Simulator params the query states outright, e.g. "timestep 0.05" or "headless"."""
+        params = {}
+        for name, (pattern, convert) in HEADER_PARAM_PATTERNS.items():
+            match = pattern.search(user_query or "")
+            if match:
+                params[name] = convert(match.group(1))
+        return params
+
+
+@lru_cache()
+def get_settings_classifier() -> SettingsClassifier:
+    return SettingsClassifier()
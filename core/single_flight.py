@@ -0,0 +1,79 @@
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Callable, Hashable
+
+from .config import get_settings
+
+settings = get_settings()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one.
+
+    The first caller for a key runs the function; callers arriving while
+    it is in flight wait and get its result, or its exception. Nothing is
+    kept once the call returns: this only removes duplicates that arrive
+    before a result exists, caching is left to the callers.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    def do(self, key: Hashable, fn: Callable):
+        with self._lock:
+            self.stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+                self.stats["shared"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._calls))
+
+
+def prompt_key(*parts: str) -> str:
+    """Hash of a model and prompt, so keys do not hold whole prompts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@lru_cache()
+def get_single_flight(name: str) -> SingleFlight:
+    """Process-wide group per kind of call, e.g. "llm" or "retrieval"."""
+    return SingleFlight(name)
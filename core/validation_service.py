@@ -0,0 +1,320 @@
+import atexit
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from functools import lru_cache
+from queue import Empty, Queue
+from typing import Optional
+
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Importing Scenic in a fresh interpreter takes seconds; jobs wait this long for a worker to come up
+WORKER_STARTUP_TIMEOUT = 120.0
+# Callers waiting for a busy pool re-check for a startup error or a free slot this often
+ACQUIRE_POLL_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class ValidationResult:
+    valid: bool
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+    line: Optional[int] = None
+    column: Optional[int] = None
+    mode: str = "parse"
+    duration: float = 0.0
+    cached: bool = False
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _error_location(error: Exception) -> tuple:
+    line = getattr(error, "lineno", None)
+    column = getattr(error, "offset", None)
+    if line is None:
+        # Runtime errors during compilation: innermost frame inside the Scenic program
+        for frame in reversed(traceback.extract_tb(error.__traceback__)):
+            if frame.filename.startswith("<"):
+                line = frame.lineno
+                break
+    return line, column
+
+
+def _worker_main(conn):
+    try:
+        import scenic
+        from utilities.parser import parse_scenic
+    except Exception as e:
+        conn.send(f"{type(e).__name__}: {e}")
+        return
+    conn.send(None)
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        mode, code = job
+        start = time.perf_counter()
+        try:
+            if mode == "compile":
+                scenic.scenarioFromString(code, mode2D=True)
+            else:
+                parse_scenic(code)
+            result = {"valid": True}
+        except Exception as e:
+            line, column = _error_location(e)
+            result = {"valid": False, "error": str(e), "error_type": type(e).__name__, "line": line, "column": column}
+        result["mode"] = mode
+        result["duration"] = time.perf_counter() - start
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.startup_error: Optional[str] = None
+        self.ready = False
+
+    def wait_ready(self) -> Optional[str]:
+        if not self.ready:
+            # A slow start (e.g. a loaded machine) is not recorded; the worker may still come up
+            if not self.conn.poll(WORKER_STARTUP_TIMEOUT):
+                return f"validation worker did not start within {WORKER_STARTUP_TIMEOUT:.0f}s"
+            self.startup_error = self.conn.recv()
+            self.ready = True
+        return self.startup_error
+
+    def alive(self) -> bool:
+        return self.process.is_alive() and self.startup_error is None
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=2)
+        self.kill()
+
+
+class ValidationPool:
+    """Long-lived worker processes that import Scenic once and validate code on request.
+
+    Each job runs in a worker under a timeout; a worker that overruns is
+    killed and replaced, so a pathological program cannot hang the caller.
+    Results are cached by a hash of the code and validation mode.
+    """
+
+    def __init__(
+        self,
+        size: int = settings.VALIDATION_WORKERS,
+        timeout: float = settings.VALIDATION_TIMEOUT,
+        cache_size: int = settings.VALIDATION_CACHE_SIZE
+    ):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = Queue()
+        self._workers = 0
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._closed = False
+        # Set when a worker cannot import Scenic; no point in spawning more
+        self._startup_error: Optional[str] = None
+
+    def warm_up(self):
+        """Start every worker now instead of on first use.
+
+        After a worker failed to import Scenic, one worker is started and
+        waited for first; if it comes up, the pool is usable again.
+        """
+        if self._startup_error:
+            worker = _Worker(self._context)
+            if worker.wait_ready() or not worker.alive():
+                worker.kill()
+                return
+            logger.info("Validation worker started again, clearing the earlier startup error")
+            with self._lock:
+                self._startup_error = None
+                self._workers += 1
+            self._idle.put(worker)
+        with self._lock:
+            missing = self.size - self._workers
+            self._workers = self.size
+        for _ in range(missing):
+            self._idle.put(_Worker(self._context))
+
+    def _acquire(self) -> Optional[_Worker]:
+        """An idle worker, or a new one while the pool is below its size; None once Scenic is known not to import."""
+        while True:
+            if self._startup_error:
+                return None
+            try:
+                worker = self._idle.get_nowait()
+            except Empty:
+                with self._lock:
+                    spawn = self._workers < self.size
+                    if spawn:
+                        self._workers += 1
+                if spawn:
+                    return _Worker(self._context)
+                try:
+                    worker = self._idle.get(timeout=ACQUIRE_POLL_INTERVAL)
+                except Empty:
+                    continue
+            # None marks a dropped worker: look again for the startup error or the free slot
+            if worker is not None:
+                return worker
+
+    def _release(self, worker: _Worker):
+        if self._closed or self._startup_error:
+            worker.close()
+            with self._lock:
+                self._workers -= 1
+            # Wake a caller waiting for a worker so it does not wait for this one
+            self._idle.put(None)
+            return
+        if not worker.alive():
+            worker.kill()
+            worker = _Worker(self._context)
+        self._idle.put(worker)
+
+    def _cache_get(self, key: str) -> Optional[ValidationResult]:
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+            return result
+
+    def _cache_put(self, key: str, result: ValidationResult):
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def validate(self, code: str, mode: str = "parse", timeout: Optional[float] = None) -> ValidationResult:
+        """Parse (or with ``mode="compile"``, compile) a Scenic program in a worker."""
+        key = hashlib.sha256(f"{mode}\0{code}".encode("utf-8")).hexdigest()
+        cached = self._cache_get(key)
+        if cached is not None:
+            return replace(cached, cached=True)
+
+        if self._startup_error:
+            return ValidationResult(False, error=self._startup_error, error_type="WorkerStartupError", mode=mode)
+
+        timeout = timeout or self.timeout
+        worker = self._acquire()
+        if worker is None:
+            return ValidationResult(False, error=self._startup_error, error_type="WorkerStartupError", mode=mode)
+        try:
+            startup_error = worker.wait_ready()
+            if startup_error:
+                if worker.startup_error:
+                    # Scenic failed to import; later calls fail fast until warm_up() succeeds
+                    self._startup_error = startup_error
+                return ValidationResult(False, error=startup_error, error_type="WorkerStartupError", mode=mode)
+
+            start = time.perf_counter()
+            worker.conn.send((mode, code))
+            if not worker.conn.poll(timeout):
+                worker.kill()
+                result = ValidationResult(
+                    False,
+                    error=f"validation did not finish within {timeout:.1f}s",
+                    error_type="TimeoutError",
+                    mode=mode,
+                    duration=time.perf_counter() - start
+                )
+            else:
+                result = ValidationResult(**worker.conn.recv())
+        except (EOFError, OSError) as e:
+            worker.kill()
+            return ValidationResult(False, error=f"validation worker crashed: {e}", error_type="WorkerCrash", mode=mode)
+        finally:
+            self._release(worker)
+
+        # A timeout may come from a busy machine rather than the code, so it is tried again next time
+        if result.error_type != "TimeoutError":
+            self._cache_put(key, result)
+        return result
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except Empty:
+                break
+            if worker is not None:
+                worker.close()
+
+
+@lru_cache()
+def get_validation_pool() -> ValidationPool:
+    pool = ValidationPool()
+    atexit.register(pool.close)
+    return pool
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Validate Scenic files through the warm validation worker pool"
+    )
+    parser.add_argument("paths", nargs="+", help="Scenic files")
+    parser.add_argument("--compile", action="store_true", help="Compile the scenario instead of only parsing it")
+    parser.add_argument("-t", "--timeout", type=float, default=settings.VALIDATION_TIMEOUT, help="Seconds per file")
+    parser.add_argument("-r", "--repeat", type=int, default=1, help="Validate each file this many times (shows cache hits)")
+    parser.add_argument("-c", "--concurrency", type=int, default=1, help="Validate from this many threads at once")
+    parser.add_argument("--cold", action="store_true", help="Start workers on first use instead of warming the pool up")
+    args = parser.parse_args()
+
+    pool = get_validation_pool()
+    start = time.perf_counter()
+    if not args.cold:
+        pool.warm_up()
+
+    def check(path, code):
+        started = time.perf_counter()
+        result = pool.validate(code, mode="compile" if args.compile else "parse", timeout=args.timeout)
+        status = "ok" if result.valid else f"{result.error_type} at line {result.line}: {result.error}"
+        return f"{path}: {status} ({(time.perf_counter() - started) * 1e3:.1f} ms{', cached' if result.cached else ''})"
+
+    jobs = []
+    for path in args.paths:
+        with open(path, encoding="utf-8") as f:
+            code = f.read()
+        jobs.extend([(path, code)] * args.repeat)
+    # Concurrent callers exercise the pool's waiting path, e.g. while Scenic fails to import
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        for line in executor.map(lambda job: check(*job), jobs):
+            print(line)
+    print(f"Total: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,108 @@ from langgraph.graph.message import add_messages
 from langchain_core.messages import HumanMessage, AIMessage
 from typing import Literal, TypedDict, Annotated
 import logging
+import re
 import time
 
-from .agents.Interpretor import Interpretor
+from .agents.Interpretor import FusedInterpretor, Interpretor
 from .agents.component_assembler_agent import ComponentAssemblerAgent
 from .agents.component_generator_agent import ComponentGeneratorAgent
 from .agents.HeaderGenerator import HeaderGeneratorAgent
 from .agents.settings_detector_agent import SettingsDetectorAgent
+from .cascade import get_cascade_metrics
+from .llm_governor import get_llm_governor, request_context
+from .ollama_pool import get_ollama_pool, ollama_urls
+from .prompt_cache import get_prompt_cache
+from .request_policy import get_request_policy
+from .settings_classifier import SettingsClassifier
+from .single_flight import get_single_flight
 from .config import get_settings
+from .http_clients import get_http_clients
+from .map_geometry import spatial_precheck
+from .map_registry import get_map_registry
+from .sampling_cost import estimate_sampling_cost
+from .validation_service import get_validation_pool
 from .scenario_milvus_client import ScenarioMilvusClient
-from utilities.parser import parse_json_from_text
+from utilities.parser import check_scenic_structure, parse_json_from_text
 from utilities.AgentLogger import get_agent_logger
 
 settings = get_settings()
 
+_SOURCE_POSITION_RE = re.compile(r"\s*\(<[^>]*>, line \d+\)$")
+
+
+def _log_metrics(title: str, event: str, snapshot: dict, format_lines):
+    """One table of the run summary: a header and ``format_lines(snapshot)``, also sent to the agent logger."""
+    if not snapshot:
+        return
+    logging.info("")
+    logging.info(f"{title}:")
+    logging.info("-" * 30)
+    for line in format_lines(snapshot):
+        logging.info(f"  {line}")
+    agent_logger = get_agent_logger()
+    if agent_logger:
+        agent_logger.log_workflow_event(event, snapshot)
+
+
+def _cascade_lines(snapshot: dict):
+    for key, tiers in snapshot.items():
+        for tier_name, stats in tiers.items():
+            yield (
+                f"{key:30s} {tier_name}: {stats['attempts']} calls, "
+                f"{stats['escalation_rate']:.0%} escalated, {stats['mean_latency']:.2f}s avg"
+            )
+
+
+def _prefix_cache_lines(snapshot: dict):
+    for agent_name, stats in snapshot.items():
+        hit_rate = f"{stats['hit_rate']:.0%} hits" if stats["hit_rate"] is not None else "hits not reported"
+        yield (
+            f"{agent_name:30s} {stats['calls']} calls, {hit_rate}, "
+            f"{stats['cached_tokens']} cached tokens, {stats['registrations']} prefixes registered"
+        )
+
+
+def _governor_lines(snapshot: dict):
+    for key, stats in snapshot.items():
+        yield (
+            f"{key:30s} {stats['requests']} calls, ~{stats['tokens']} tokens, "
+            f"{stats['mean_wait']:.2f}s avg wait ({stats['max_wait']:.2f}s max), "
+            f"queue {stats['queue_depth']} (max {stats['max_queue_depth']}), {stats['quota_errors']} quota errors, "
+            f"{stats['abandoned']} dropped unsent"
+        )
+
+
+def _request_policy_lines(snapshot: dict):
+    for agent_name, stats in snapshot.items():
+        yield (
+            f"{agent_name:30s} {stats['calls']} calls, {stats['retries']} retries, "
+            f"{stats['hedges']} hedged ({stats['hedge_wins']} won), {stats['deadline_exceeded']} past deadline"
+        )
+        for model, latency in stats["latency"].items():
+            yield f"{'':30s} {model}: p50 {latency['p50']:.2f}s, p90 {latency['p90']:.2f}s, p99 {latency['p99']:.2f}s"
+
+
+def _single_flight_lines(snapshot: dict):
+    for name, stats in snapshot.items():
+        yield f"{name:30s} {stats['shared']} of {stats['calls']} calls shared another's request"
+
+
+def _ollama_lines(snapshot: dict):
+    for url, stats in snapshot.items():
+        yield (
+            f"{url:30s} {'up' if stats['healthy'] else 'ejected'}, {stats['requests']} requests, "
+            f"{stats['errors']} errors, {stats['mean_latency']:.2f}s avg, {stats['outstanding']} in flight"
+        )
+
+
+def _connection_lines(snapshot: dict):
+    for origin, stats in snapshot.items():
+        yield (
+            f"{origin:30s} {stats['requests']} requests, {stats['new_connections']} new connections, "
+            f"{stats['reuse_rate']:.0%} reused, {stats['http2']} over HTTP/2"
+        )
+
 
 class SearchWorkflowState(TypedDict):
     messages: Annotated[list, add_messages]
@@ -35,23 +123,34 @@ class SearchWorkflowState(TypedDict):
     component_sources: dict
     generation_time: str
     generation_duration: float
+    sampling_report: dict
 
 
 class SearchWorkflow:
-    def __init__(self, thread_id: str = "search_thread"):
+    # Failures of the validator itself rather than of the generated code
+    UNREPAIRABLE_ERRORS = {"WorkerStartupError", "WorkerCrash", "TimeoutError"}
+    
+    def __init__(self, thread_id: str = "search_thread", priority: str = "interactive"):
         self.thread_id = thread_id
-        self.interpretor = Interpretor()
-        self.assembler_agent = ComponentAssemblerAgent()
-        self.generator_agent = ComponentGeneratorAgent() 
-        self.header_generator = HeaderGeneratorAgent()
-        self.settings_detector = SettingsDetectorAgent()
-        self.generation_threshold = 50
+        # LLM calls of this workflow queue behind interactive ones when "batch"
+        self.priority = priority
         
         try:
             self.milvus_client = ScenarioMilvusClient(collection_name="scenario_components_with_subject")
         except Exception as e:
             self.milvus_client = None
         
+        self.interpretor = FusedInterpretor() if settings.FUSED_INTERPRETATION else Interpretor()
+        self.assembler_agent = ComponentAssemblerAgent()
+        self.generator_agent = ComponentGeneratorAgent(scenario_client=self.milvus_client)
+        self.header_generator = HeaderGeneratorAgent()
+        self.settings_detector = SettingsDetectorAgent()
+        self.generation_threshold = 50
+        
+        # Workers import Scenic in the background while the interpretation is confirmed
+        if settings.COMPONENT_REPAIR_RETRIES >= 0:
+            get_validation_pool().warm_up()
+        
         self.workflow = StateGraph(state_schema=SearchWorkflowState)
         
         self.workflow.add_node("interpret_query", self._interpret_query_node)
@@ -127,7 +226,12 @@ class SearchWorkflow:
                 "user_query": state.get("user_query", "")
             })
         
-        logical_interpretation = self.interpretor.process(state["user_query"])
+        logical_interpretation, detected_settings = self.interpretor.interpret(state["user_query"])
+        if detected_settings is not None:
+            # Used by the settings node after confirmation instead of a separate detection call
+            state.setdefault("scenario_settings", {})["detected_settings"] = self.settings_detector.finalize(
+                detected_settings, state["user_query"]
+            )
         
         formatted_response = (
             f"**Logical Scenario Structure:**\n{logical_interpretation}\n\n"
@@ -270,6 +374,13 @@ class SearchWorkflow:
                     component_sources[component_type] = "GENERATED"
                     component_scores[component_type] = generated.get("score_result", {})
 
+                    if component_type == "Spatial Relation":
+                        selected_map = (state.get("scenario_settings") or {}).get("selected_map") or settings.MAP
+                        map_issues = spatial_precheck(generated["component"].get("code", ""), selected_map)
+                        component_scores[component_type]["map_issues"] = map_issues
+                        for issue in map_issues:
+                            logging.warning(f"🗺️ Spatial pre-check: {issue}")
+
         state["retrieved_components"] = retrieved_components
         state["component_sources"] = component_sources
         state["component_scores"] = component_scores
@@ -331,16 +442,71 @@ class SearchWorkflow:
         
         ready_components = self._build_ready_components(retrieved_components, component_scores, component_type)
         
-        generated_component = self.generator_agent.generate_component(
-            component_type=component_type,
-            user_criteria=user_criteria,
-            ready_components=ready_components
-        )
-        
-        # Ensure we always have a code string even if generation failed
-        code = generated_component.get("code", "")
-        
-        logging.info(f"✅ Generated new component: {component_type} (length: {len(code)})")
+        validate = settings.COMPONENT_REPAIR_RETRIES >= 0
+        cascade_metrics = get_cascade_metrics()
+        
+        # Cheap tiers first; escalate when the output is empty or does not parse
+        for tier in self.generator_agent.cascade(component_type):
+            start = time.time()
+            generated_component = self.generator_agent.generate_component(
+                component_type=component_type,
+                user_criteria=user_criteria,
+                ready_components=ready_components,
+                tier=tier
+            )
+            
+            # Ensure we always have a code string even if generation failed
+            code = generated_component.get("code", "")
+            validation = self._validate_component(code, ready_components) if code and validate else None
+            # Without validation, a tokenizer check still catches truncated or malformed output from a cheap tier
+            structure_error = check_scenic_structure(code) if code and not validate and tier is not None else None
+            
+            escalate = tier is not None and (
+                not code
+                or structure_error is not None
+                or (validation is not None and not validation["valid"] and validation["error_type"] not in self.UNREPAIRABLE_ERRORS)
+            )
+            cascade_metrics.record(component_type, tier, escalate, time.time() - start)
+            if not escalate:
+                break
+            reason = validation["error"] if validation else structure_error or "empty output"
+            logging.info(f"⏫ Escalating {component_type} from {tier.name}: {reason}")
+        
+        logging.info(f"✅ Generated new component: {component_type} (length: {len(code)}, model: {tier.name if tier else 'default'})")
+        
+        repairs = 0
+        if validation is not None:
+            while (
+                not validation["valid"]
+                and validation["error_type"] not in self.UNREPAIRABLE_ERRORS
+                and repairs < settings.COMPONENT_REPAIR_RETRIES
+            ):
+                repairs += 1
+                logging.info(f"🔧 Repairing {component_type} ({repairs}/{settings.COMPONENT_REPAIR_RETRIES}): {validation['error']}")
+                agent_logger = get_agent_logger()
+                if agent_logger:
+                    agent_logger.log_workflow_event("component_repair", {
+                        "component_type": component_type,
+                        "attempt": repairs,
+                        "error": validation["error"]
+                    })
+                
+                repaired = self.generator_agent.generate_component(
+                    component_type=component_type,
+                    user_criteria=user_criteria,
+                    ready_components=ready_components,
+                    repair={"code": code, "error": validation["error"]}
+                )
+                if not repaired.get("code"):
+                    break
+                generated_component = repaired
+                code = repaired["code"]
+                validation = self._validate_component(code, ready_components)
+            
+            if validation["valid"]:
+                logging.info(f"✅ {component_type} parses{f' after {repairs} repair(s)' if repairs else ''}")
+            else:
+                logging.warning(f"⚠️ {component_type} still fails validation: {validation['error']}")
         
         generated_score = {
             "score": 100 if code else 0,
@@ -349,6 +515,9 @@ class SearchWorkflow:
             "user_criteria": user_criteria,
             "retrieved_description": generated_component.get("description", "No description")
         }
+        if validation is not None:
+            generated_score["validation"] = dict(validation, repairs=repairs)
+        generated_score["model"] = tier.name if tier else "default"
         
         return {
             "component": generated_component,
@@ -356,6 +525,42 @@ class SearchWorkflow:
             "score_result": generated_score
         }
     
+    def _validate_component(self, code: str, ready_components: dict) -> dict:
+        """Parse a new component appended to the components it builds on.
+        
+        Error lines are reported relative to the component. When the
+        components so far do not parse on their own, the new component is
+        parsed alone so it is not blamed for an earlier failure.
+        """
+        prefix_parts = []
+        for comp_type in ["Header", "Spatial Relation", "Ego", "Adversarials", "Requirement and restrictions"]:
+            comp_code = ready_components.get(comp_type)
+            if isinstance(comp_code, list):
+                prefix_parts.extend(c for c in comp_code if c)
+            elif comp_code:
+                prefix_parts.append(comp_code)
+        prefix = "\n\n".join(prefix_parts)
+        
+        pool = get_validation_pool()
+        line_offset = 0
+        if prefix and pool.validate(prefix).valid:
+            result = pool.validate(f"{prefix}\n\n{code}")
+            line_offset = prefix.count("\n") + 2
+        else:
+            result = pool.validate(code)
+        
+        line = result.line - line_offset if result.line and result.line > line_offset else None
+        error = result.error
+        if error and line:
+            # Scenic reports the position in the partial program; restate it for the component
+            error = f"Line {line} of the component: {_SOURCE_POSITION_RE.sub('', error)}"
+        return {
+            "valid": result.valid,
+            "error": error,
+            "error_type": result.error_type,
+            "line": line
+        }
+    
     def _assemble_code_node(self, state: SearchWorkflowState):
         retrieved_components = state.get("retrieved_components", {})
         
@@ -396,6 +601,9 @@ class SearchWorkflow:
         state["selected_code"] = final_code
         state["adapted_code"] = final_code
         
+        sampling_report = self._check_sampling(final_code, state.get("scenario_settings") or {})
+        state["sampling_report"] = sampling_report.to_dict() if sampling_report else {}
+        
         start_time = state.get("generation_start_time", time.time())
         end_time = time.time()
         duration = end_time - start_time
@@ -421,6 +629,18 @@ class SearchWorkflow:
                 for adv_name, adv_source in sorted(adv_components.items()):
                     display_name = adv_name.replace("_", " ").title()
                     logging.info(f"  {display_name:30s} -> {adv_source}")
+        
+        # The metrics objects are process-wide singletons, so these tables cover every session since start-up
+        _log_metrics("Model Cascade (process)", "cascade_metrics", get_cascade_metrics().snapshot(), _cascade_lines)
+        _log_metrics("Prompt Prefix Cache (process)", "prompt_prefix_cache", get_prompt_cache().metrics.snapshot(), _prefix_cache_lines)
+        _log_metrics("LLM Requests (process)", "llm_governor", get_llm_governor().metrics.snapshot(), _governor_lines)
+        _log_metrics("LLM Request Policy (process)", "llm_request_policy", get_request_policy().metrics.snapshot(), _request_policy_lines)
+        single_flight_snapshot = {name: get_single_flight(name).snapshot() for name in ("llm", "retrieval")}
+        if any(stats["shared"] for stats in single_flight_snapshot.values()):
+            _log_metrics("Deduplicated In-Flight Calls (process)", "single_flight", single_flight_snapshot, _single_flight_lines)
+        if settings.LLM_PROVIDER == "ollama" or len(ollama_urls()) > 1:
+            _log_metrics("Ollama Endpoints (process)", "ollama_endpoints", get_ollama_pool().snapshot(), _ollama_lines)
+        _log_metrics("HTTP Connections (process)", "http_connections", get_http_clients().metrics.snapshot(), _connection_lines)
         logging.info("=" * 30)
 
         formatted_output = (
@@ -428,12 +648,32 @@ class SearchWorkflow:
             f"✅ **Workflow completed!** Scenario generated successfully.\n\n"
             f"⏱️ Generation time: {time_str}"
         )
+        if sampling_report:
+            gate = "" if sampling_report.passed() is not False else "⚠️ "
+            formatted_output += f"\n\n{gate}🎲 {sampling_report.summary()}"
         state["messages"].append(AIMessage(content=formatted_output))
         state["workflow_status"] = "completed"
         
         return state
     
     
+    def _check_sampling(self, code: str, scenario_settings: dict):
+        if settings.SAMPLING_SCENES <= 0 or not code:
+            return None
+        
+        # Compiling without the map fails after paying the whole cold start
+        selected_map = scenario_settings.get("selected_map") or settings.MAP
+        map_path = get_map_registry().xodr_path(selected_map)
+        if not map_path.exists():
+            logging.info(f"🎲 Skipping the sampling check: no .xodr file for {selected_map}")
+            return None
+        params = {"map": str(map_path)}
+        
+        logging.info(f"🎲 Sampling {settings.SAMPLING_SCENES} scenes (budget {settings.SAMPLING_TIME_BUDGET:.0f}s)")
+        report = estimate_sampling_cost(code, params=params, scenes=settings.SAMPLING_SCENES)
+        logging.info(f"🎲 {report.summary()}")
+        return report
+    
     def _detect_settings_node(self, state: SearchWorkflowState):
         if state.get("generation_start_time") is None:
             state["generation_start_time"] = time.time()
@@ -459,7 +699,9 @@ class SearchWorkflow:
         
         if not selected_map or not selected_weather or not selected_blueprint:
             logging.info(f"🔍 Auto-detecting settings from user query...")
-            detected_settings = self.settings_detector.detect_settings(user_query)
+            detected_settings = state["scenario_settings"].get("detected_settings")
+            if detected_settings is None:
+                detected_settings = self.settings_detector.detect_settings(user_query)
             
             if detected_settings["confidence"] >= 0.6:
                 if not selected_weather and detected_settings["weather"]:
@@ -480,7 +722,7 @@ class SearchWorkflow:
                 logging.info(f"⚠️ Low confidence ({detected_settings['confidence']:.2f}) in auto-detection, using defaults")
         
         if not selected_map:
-            selected_map = "Town05"
+            selected_map = settings.MAP
             logging.info(f"🗺️ Using default map: {selected_map}")
         if not selected_weather:
             selected_weather = "ClearNoon"
@@ -489,10 +731,15 @@ class SearchWorkflow:
             selected_blueprint = "vehicle.lincoln.mkz_2017"
             logging.info(f"🚗 Using default blueprint: {selected_blueprint}")
 
+        header_params = SettingsClassifier.header_params(user_query)
+        if header_params:
+            logging.info(f"⚙️ Header params from the query: {header_params}")
+
         state["scenario_settings"].update({
             "selected_map": selected_map,
             "selected_weather": selected_weather,
             "selected_blueprint": selected_blueprint,
+            "header_params": header_params,
             # Full detector payload (confidence, reasoning, suggestions, etc.)
             # "detected_settings": detected_settings,
         })
@@ -509,16 +756,21 @@ class SearchWorkflow:
         
         user_query = state.get("user_query", "")
         scenario_settings = state.get("scenario_settings", {}) or {}
-        selected_map = scenario_settings.get("selected_map") or "Town05"
+        selected_map = scenario_settings.get("selected_map") or settings.MAP
         selected_blueprint = scenario_settings.get("selected_blueprint") or "vehicle.lincoln.mkz_2017"
         selected_weather = scenario_settings.get("selected_weather") or "ClearNoon"
         
+        # The interpretation's one-line scenario summary makes a better description than the raw query
+        scenario_summary = (parse_json_from_text(state.get("logical_interpretation") or "") or {}).get("Scenario")
+        
         logging.info(f"🎨 Generating Header component")
         header_component = self.header_generator.generate_header(
             user_query=user_query,
             carla_map=selected_map,
             blueprint=selected_blueprint,
-            weather=selected_weather
+            weather=selected_weather,
+            description=scenario_summary if isinstance(scenario_summary, str) else None,
+            params=scenario_settings.get("header_params")
         )
         
         state["retrieved_components"]["Header"] = header_component
@@ -604,7 +856,8 @@ class SearchWorkflow:
                 "component_sources": {},
                 "generation_start_time": None,
                 "generation_time": "",
-                "generation_duration": 0.0
+                "generation_duration": 0.0,
+                "sampling_report": {}
             }
 
         # Store explicit selections (if provided) into canonical scenario_settings.
@@ -646,6 +899,7 @@ class SearchWorkflow:
             state["retrieved_components"] = {}
             state["component_sources"] = {}
             state["generation_start_time"] = None
+            state["sampling_report"] = {}
             state["scenario_settings"] = {}
             
             state["messages"].append(HumanMessage(content=user_input))
@@ -654,7 +908,8 @@ class SearchWorkflow:
 
     def run(self, user_input: str = "", user_feedback: str = "", validate_only: bool = False, code_to_validate: str = "", selected_blueprint: str = None, selected_map: str = None, selected_weather: str = None, auto_correction: bool = True):
         state, config = self._prepare_state(user_input, user_feedback, validate_only, code_to_validate, selected_blueprint, selected_map, selected_weather, auto_correction)
-        result = self.app.invoke(state, config)
+        with request_context(self.thread_id, self.priority):
+            result = self.app.invoke(state, config)
         return result
     
     def get_conversation_history(self):
@@ -99,6 +99,9 @@ class AgentLogger:
             except (json.JSONDecodeError, AttributeError):
                 pass
         
+        if metadata and metadata.get("prompt_tokens"):
+            log_entry["prompt_tokens"] = metadata["prompt_tokens"]
+        
         if formatted_agent_name == "CodeAdapterAgent" and metadata and metadata.get("retrieved_code"):
             log_entry["code_before_adaptation"] = metadata["retrieved_code"]
         
@@ -133,6 +136,13 @@ class AgentLogger:
                 f.write("(No response)")
             f.write("\n\n")
             
+            if log_entry.get('prompt_tokens'):
+                f.write("-" * 80 + "\n")
+                f.write("PROMPT SIZE (approx. tokens)\n")
+                f.write("-" * 80 + "\n")
+                f.write(json.dumps(log_entry['prompt_tokens'], indent=2))
+                f.write("\n\n")
+            
             f.write("-" * 80 + "\n")
             f.write("PROMPT\n")
             f.write("-" * 80 + "\n")
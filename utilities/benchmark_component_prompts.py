@@ -0,0 +1,110 @@
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from core.config import get_settings
+from core.example_store import get_example_store
+from core.llm_governor import request_context
+from core.prompts import load_prompt
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PROMPTS = {
+    "Ego": "component_generator_ego",
+    "Adversarial": "component_generator_adv",
+    "Spatial Relation": "component_generator_spatial",
+    "Requirement and restrictions": "component_generator_requirement",
+}
+PROMPT_KEYS = {"Ego": "ego", "Adversarial": "adv", "Spatial Relation": "spatial", "Requirement and restrictions": "requirement"}
+
+
+def load_queries(paths: list, limit: int) -> list:
+    queries = [line.strip() for path in paths for line in Path(path).read_text(encoding="utf-8").splitlines() if line.strip()]
+    return queries[:limit] if limit else queries
+
+
+def static_prompt_size(component_type: str, criteria: str, k: int) -> int:
+    """Characters of the prompt outside the per-call inputs (criteria, ready components, references, documentation)."""
+    template = load_prompt(PROMPTS[component_type])
+    return len(template.format(
+        user_criteria="",
+        ready_components="",
+        reference_components="",
+        documentation="",
+        examples=get_example_store().render(PROMPT_KEYS[component_type], criteria, k)
+    ))
+
+
+def measure_prompts(queries: list, k: int) -> None:
+    print(f"{'component':<30}{'all examples':>14}{f'k={k}':>10}{'saved':>8}")
+    for component_type in PROMPTS:
+        before = statistics.mean(static_prompt_size(component_type, q, 0) for q in queries)
+        after = statistics.mean(static_prompt_size(component_type, q, k) for q in queries)
+        print(f"{component_type:<30}{before:>11.0f} ch{after:>7.0f} ch{1 - after / before:>8.1%}")
+    print("(~4 characters per token)")
+
+
+def measure_generation(queries: list, k: int) -> None:
+    """Generate every component of each query with all examples and with k, timing calls and parsing the output."""
+    from core.agents.Interpretor import Interpretor
+    from core.agents.component_generator_agent import ComponentGeneratorAgent
+    from core.validation_service import get_validation_pool
+    from utilities.parser import parse_json_from_text
+
+    settings = get_settings()
+    interpretor = Interpretor()
+    generator = ComponentGeneratorAgent()
+    pool = get_validation_pool()
+    pool.warm_up()
+
+    stats = {mode: {"latency": [], "valid": 0, "calls": 0} for mode in (0, k)}
+    for query in queries:
+        interpretation = parse_json_from_text(interpretor.process(query))
+        criteria = [(t, interpretation.get(t)) for t in ("Ego", "Spatial Relation", "Requirement and restrictions")]
+        criteria += [("Adversarial", adv) for adv in interpretation.get("Adversarials", [])[:1]]
+        for component_type, component_criteria in criteria:
+            if not component_criteria:
+                continue
+            for mode in (0, k):
+                settings.COMPONENT_EXAMPLES_K = mode
+                start = time.perf_counter()
+                component = generator.generate_component(component_type, component_criteria)
+                stats[mode]["latency"].append(time.perf_counter() - start)
+                stats[mode]["calls"] += 1
+                stats[mode]["valid"] += pool.validate(component["code"]).valid
+    generator.close()
+
+    for mode, s in stats.items():
+        name = "all examples" if mode == 0 else f"k={mode}"
+        if s["calls"]:
+            print(
+                f"{name:<14} {s['calls']} calls, mean {statistics.mean(s['latency']):.2f}s, "
+                f"parse-valid {s['valid']}/{s['calls']} ({s['valid'] / s['calls']:.0%})"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare component prompts with every few-shot example against the k most similar ones"
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=sorted(str(p) for p in (REPO_ROOT / "Benchmark").glob("*.txt")),
+        help="Query files, one scenario per line (default: Benchmark/*.txt)"
+    )
+    parser.add_argument("-k", type=int, default=get_settings().COMPONENT_EXAMPLES_K, help="Examples per prompt")
+    parser.add_argument("-n", "--limit", type=int, default=0, help="Only the first N queries")
+    parser.add_argument("--generate", action="store_true", help="Also call the LLM and compare latency and parse-valid output")
+    args = parser.parse_args()
+
+    queries = load_queries(args.paths, args.limit)
+    measure_prompts(queries, args.k)
+    if args.generate:
+        # Benchmark calls yield to interactive sessions sharing the rate limits
+        with request_context("benchmark_component_prompts", "batch"):
+            measure_generation(queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+from core.agents.Interpretor import FusedInterpretor, Interpretor
+from core.agents.settings_detector_agent import SettingsDetectorAgent
+from core.config import get_settings
+from core.llm_governor import request_context
+from utilities.parser import parse_json_from_text
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+INTERPRETATION_KEYS = ["Scenario", "Ego", "Adversarials", "Spatial Relation", "Requirement and restrictions"]
+SETTING_FIELDS = ["weather", "suggested_map", "blueprint"]
+
+
+def load_queries(paths: list, limit: int) -> list:
+    queries = []
+    for path in paths:
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                queries.append((Path(path).stem, line.strip()))
+    return queries[:limit] if limit else queries
+
+
+def is_complete(interpretation: str) -> bool:
+    data = parse_json_from_text(interpretation)
+    return all(key in data for key in INTERPRETATION_KEYS)
+
+
+def run(queries: list) -> list:
+    interpretor = Interpretor()
+    fused = FusedInterpretor()
+    detector = SettingsDetectorAgent()
+
+    rows = []
+    for source, query in queries:
+        start = time.perf_counter()
+        two_call_interpretation = interpretor.process(query)
+        two_call_settings = detector.detect_settings(query)
+        two_call_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fused_interpretation, fused_settings = fused.interpret(query)
+        if fused_settings is not None:
+            fused_settings = detector.finalize(fused_settings, query)
+        fused_time = time.perf_counter() - start
+
+        rows.append({
+            "source": source,
+            "query": query,
+            "two_call": {
+                "time": two_call_time,
+                "complete": is_complete(two_call_interpretation),
+                "settings": two_call_settings
+            },
+            "fused": {
+                "time": fused_time,
+                "complete": is_complete(fused_interpretation),
+                "settings": fused_settings
+            }
+        })
+        agreement = sum(
+            fused_settings is not None and fused_settings.get(f) == two_call_settings.get(f) for f in SETTING_FIELDS
+        )
+        print(f"[{source}] two-call {two_call_time:.1f}s, fused {fused_time:.1f}s, settings agree {agreement}/{len(SETTING_FIELDS)}")
+    return rows
+
+
+def summarize(rows: list) -> str:
+    n = len(rows)
+    if not n:
+        return "No queries"
+    lines = [f"Queries: {n}"]
+    for mode in ("two_call", "fused"):
+        total = sum(row[mode]["time"] for row in rows)
+        complete = sum(row[mode]["complete"] for row in rows)
+        lines.append(f"{mode:>9}: {total / n:.2f}s/query, complete interpretations {complete}/{n}")
+    missing = sum(row["fused"]["settings"] is None for row in rows)
+    lines.append(f"Fused responses without a settings object: {missing}/{n}")
+    for field in SETTING_FIELDS:
+        agree = sum(
+            row["fused"]["settings"] is not None
+            and row["fused"]["settings"].get(field) == row["two_call"]["settings"].get(field)
+            for row in rows
+        )
+        lines.append(f"Agreement on {field}: {agree}/{n} ({agree / n:.0%})")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare fused interpretation + settings detection against the two-call mode on the Benchmark queries"
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=sorted(str(p) for p in (REPO_ROOT / "Benchmark").glob("*.txt")),
+        help="Query files, one scenario per line (default: Benchmark/*.txt)"
+    )
+    parser.add_argument("-n", "--limit", type=int, default=0, help="Only the first N queries")
+    parser.add_argument("--llm-settings", action="store_true", help="Skip the rule-based settings fast path in the two-call mode")
+    parser.add_argument("-o", "--output", help="Write per-query results as JSON")
+    args = parser.parse_args()
+
+    if args.llm_settings:
+        get_settings().SETTINGS_FAST_PATH_MIN_CONFIDENCE = 2.0
+
+    # Benchmark calls yield to interactive sessions sharing the rate limits
+    with request_context("benchmark_fused_interpretation", "batch"):
+        rows = run(load_queries(args.paths, args.limit))
+    print(summarize(rows))
+    if args.output:
+        Path(args.output).write_text(json.dumps(rows, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
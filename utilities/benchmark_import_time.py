@@ -0,0 +1,77 @@
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ENTRY_MODULES = [
+    "app",
+    "core.workflow",
+    "utilities.insert_scenarios_to_milvus",
+    "utilities.process_scenic_to_json",
+]
+
+# Packages that should only be loaded when first used
+DEFERRED_PACKAGES = [
+    "torch", "carla", "gradio", "scenic", "sentence_transformers",
+    "langchain_huggingface", "langchain_openai", "langchain_google_genai", "langchain_milvus",
+]
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_time(module: str) -> tuple:
+    """Return wall time and the parsed `-X importtime` table for a fresh interpreter."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True
+    )
+    elapsed = time.perf_counter() - start
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    error = result.stderr.strip().splitlines()[-1] if result.returncode else None
+    return elapsed, rows, error
+
+
+def format_report(module: str, elapsed: float, rows: list, error: str, top: int) -> str:
+    loaded = {name.strip().split(".")[0] for _, _, name in rows}
+    lines = [f"## import {module}: {elapsed:.2f}s wall"]
+    if error:
+        lines.append(f"   failed: {error}")
+    deferred = sorted(package for package in DEFERRED_PACKAGES if package in loaded)
+    lines.append(f"   heavy packages loaded: {', '.join(deferred) if deferred else 'none'}")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        lines.append(f"   {cumulative_us / 1e6:8.3f}s cumulative {self_us / 1e6:8.3f}s self  {name.strip()}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Audit import time of the app and ingestion entry points with python -X importtime"
+    )
+    parser.add_argument("modules", nargs="*", default=ENTRY_MODULES, help="Modules to import")
+    parser.add_argument("-t", "--top", type=int, default=15, help="Slowest imports to list per module")
+    parser.add_argument("-o", "--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = "\n\n".join(
+        format_report(module, *import_time(module), top=args.top) for module in args.modules
+    )
+    print(report)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(report + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import io
+import random
+import time
+import tokenize
+from pathlib import Path
+
+from utilities.benchmark_scenic_sections import build_corpus, load_corpus
+from utilities.process_scenic_to_json import remove_comments_from_scenic
+
+# Fragments chosen to stress string/comment boundaries
+FRAGMENTS = [
+    "ego = new Car at spawnPt  # spawn the ego",
+    "description = \"ego # not a comment\"",
+    "label = 'it\\'s # still a string'",
+    "path = \"C:\\\\maps\\\\\"  # trailing backslash inside string",
+    "doc = \"\"\"first line # kept\n\n    # indented, kept\nlast\"\"\"",
+    "raw = r'''a # b\n'''  # comment after raw triple",
+    "#################################",
+    "# Ego                           #",
+    "#",
+    "    # indented comment",
+    "",
+    "   ",
+    "behavior Follow(speed):",
+    "    do FollowLaneBehavior(speed)  # with trailing",
+    "    take SetBrakeAction(1.0)",
+    "require (distance to ego) > 5 ## doubled marker",
+    "x = {'#': 1, \"k\": '#'}",
+    "terminate when ego.speed < 0.1",
+]
+
+
+def _tokens(code: str, kinds: set) -> list:
+    tokens = tokenize.generate_tokens(io.StringIO(code).readline)
+    return [token.string for token in tokens if token.type in kinds]
+
+
+def check_properties(samples: int, seed: int = 0) -> int:
+    """Assert comment stripping invariants on randomly composed programs."""
+    rng = random.Random(seed)
+    for _ in range(samples):
+        code = "\n".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 30)))
+        cleaned = remove_comments_from_scenic(code)
+
+        assert remove_comments_from_scenic(cleaned) == cleaned, code
+        assert not _tokens(cleaned, {tokenize.COMMENT}), code
+        assert _tokens(cleaned, {tokenize.STRING}) == _tokens(code, {tokenize.STRING}), code
+        assert _tokens(cleaned, {tokenize.NAME, tokenize.OP, tokenize.NUMBER}) == \
+            _tokens(code, {tokenize.NAME, tokenize.OP, tokenize.NUMBER}), code
+    return samples
+
+
+def measure(corpus: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for scenic_code in corpus:
+            remove_comments_from_scenic(scenic_code)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check invariants and measure throughput of remove_comments_from_scenic"
+    )
+    parser.add_argument(
+        "path",
+        nargs="?",
+        help="Directory of .scenic files (default: synthetic corpus)"
+    )
+    parser.add_argument("-n", "--size", type=int, default=2000, help="Synthetic corpus size")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Number of timed runs; the best is reported")
+    parser.add_argument("-s", "--samples", type=int, default=2000, help="Randomized programs for the invariant check")
+    args = parser.parse_args()
+
+    print(f"Invariants hold on {check_properties(args.samples)} randomized programs")
+
+    corpus = load_corpus(Path(args.path)) if args.path else build_corpus(args.size)
+    size_mb = sum(len(code.encode('utf-8')) for code in corpus) / 1e6
+
+    elapsed = measure(corpus, args.repeat)
+    print(f"Files: {len(corpus)}, size: {size_mb:.1f} MB")
+    print(f"Best of {args.repeat}: {elapsed:.3f}s ({size_mb / elapsed:.1f} MB/s, {len(corpus) / elapsed:.0f} files/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import random
+import time
+from pathlib import Path
+
+from utilities.process_scenic_to_json import parse_logical_structure
+
+SECTION_TEMPLATE = """#################################
+# Description                   #
+#################################
+description = "Scenario {n}: ego follows a lead vehicle that brakes suddenly."
+
+#################################
+# Header                        #
+#################################
+param map = localPath('../../maps/Town05.xodr')
+param carla_map = 'Town05'
+model scenic.simulators.carla.model
+MODEL = 'vehicle.lincoln.mkz_2017'
+
+#################################
+# Ego                           #
+#################################
+param EGO_SPEED = Range(7, 10)
+EGO_BRAKE = 0.8
+
+behavior EgoBehavior(speed):
+    try:
+        do FollowLaneBehavior(target_speed=speed)
+    interrupt when withinDistanceToAnyObjs(self, 10):
+        take SetBrakeAction(EGO_BRAKE)
+
+ego = new Car at egoSpawnPt,
+    with blueprint MODEL,
+    with behavior EgoBehavior(globalParameters.EGO_SPEED)
+{adversaries}
+#################################
+# Spatial Relation              #
+#################################
+lane = Uniform(*network.lanes)
+egoSpawnPt = new OrientedPoint in lane.centerline
+advSpawnPt = new OrientedPoint following roadDirection from egoSpawnPt for {n}
+
+#################################
+# Requirements and Restrictions #
+#################################
+require (distance to intersection) > 50
+terminate when (distance to egoSpawnPt) > 100
+"""
+
+ADVERSARY_TEMPLATE = """
+#################################
+# Adversarial {i}                 #
+#################################
+param ADV_SPEED_{i} = Range(5, 8)
+ADV_BRAKE_{i} = 1.0
+
+behavior AdvBehavior{i}(speed):
+    do FollowLaneBehavior(target_speed=speed) for 3 seconds
+    take SetBrakeAction(ADV_BRAKE_{i})
+
+adv_{i} = new Car at advSpawnPt,
+    with behavior AdvBehavior{i}(globalParameters.ADV_SPEED_{i})
+"""
+
+
+def build_corpus(size: int, max_adversaries: int = 6, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    corpus = []
+    for n in range(size):
+        adversaries = "".join(ADVERSARY_TEMPLATE.format(i=i) for i in range(1, rng.randint(1, max_adversaries) + 1))
+        corpus.append(SECTION_TEMPLATE.format(n=n, adversaries=adversaries))
+    return corpus
+
+
+def load_corpus(path: Path) -> list:
+    return [f.read_text(encoding='utf-8') for f in sorted(path.rglob("*.scenic"))]
+
+
+def run(corpus: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for scenic_code in corpus:
+            parse_logical_structure("{}", scenic_code)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time section extraction of parse_logical_structure over a Scenic corpus"
+    )
+    parser.add_argument(
+        "path",
+        nargs="?",
+        help="Directory of .scenic files (default: synthetic corpus)"
+    )
+    parser.add_argument("-n", "--size", type=int, default=2000, help="Synthetic corpus size")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Number of timed runs; the best is reported")
+    args = parser.parse_args()
+
+    corpus = load_corpus(Path(args.path)) if args.path else build_corpus(args.size)
+    total_lines = sum(code.count('\n') + 1 for code in corpus)
+
+    elapsed = run(corpus, args.repeat)
+    print(f"Files: {len(corpus)}, lines: {total_lines}")
+    print(f"Best of {args.repeat}: {elapsed:.3f}s ({len(corpus) / elapsed:.0f} files/s, {elapsed / len(corpus) * 1e3:.3f} ms/file)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from core.config import get_settings
+from utilities.carla_utils import DEFAULT_BLUEPRINTS
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION = 1
+REPO_MAPS_DIR = Path(__file__).resolve().parent.parent / "maps"
+
+
+def repo_maps(maps_dir: Path = REPO_MAPS_DIR) -> list:
+    return sorted(path.name[:-len(".xodr")] for path in maps_dir.glob("*.xodr"))
+
+
+def query_simulator(host: str, port: int, timeout: float) -> tuple:
+    """Vehicle blueprints and map names from a running CARLA server."""
+    import carla
+
+    client = carla.Client(host, port)
+    client.set_timeout(timeout)
+    world = client.get_world()
+    blueprints = sorted(bp.id for bp in world.get_blueprint_library().filter('vehicle.*'))
+    maps = sorted({path.rsplit('/', 1)[-1] for path in client.get_available_maps()})
+    return blueprints, maps
+
+
+class CarlaCatalog:
+    """Vehicle blueprints and map names, persisted so startup never has to reach a simulator."""
+
+    def __init__(self, path: str = settings.CARLA_CATALOG_PATH):
+        self.path = Path(path)
+        self.source: Optional[str] = None
+        self.built_at: Optional[str] = None
+        self.blueprints: list[str] = []
+        self.maps: list[str] = []
+
+    @classmethod
+    def load(cls, path: str = settings.CARLA_CATALOG_PATH) -> "CarlaCatalog":
+        """Read the cached catalog; a missing or outdated one is rebuilt offline."""
+        catalog = cls(path)
+        if not catalog._read():
+            catalog.refresh(offline=True)
+        return catalog
+
+    def _read(self) -> bool:
+        if not self.path.exists():
+            return False
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable CARLA catalog {self.path}: {e}")
+            return False
+        if data.get("version") != CATALOG_VERSION:
+            logger.info(f"CARLA catalog {self.path} has version {data.get('version')}, expected {CATALOG_VERSION}")
+            return False
+
+        self.source = data.get("source")
+        self.built_at = data.get("built_at")
+        self.blueprints = data.get("blueprints", [])
+        self.maps = data.get("maps", [])
+        return True
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": CATALOG_VERSION,
+            "source": self.source,
+            "built_at": self.built_at,
+            "blueprints": self.blueprints,
+            "maps": self.maps
+        }
+        self.path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+    def refresh(self, host: str = '127.0.0.1', port: int = 2000, timeout: float = 2.0, offline: bool = False):
+        """Rebuild from the simulator when reachable, otherwise from the defaults and the repo maps."""
+        self.source = None
+        if not offline:
+            try:
+                self.blueprints, simulator_maps = query_simulator(host, port, timeout)
+                self.maps = sorted(set(simulator_maps) | set(repo_maps()))
+                self.source = f"carla://{host}:{port}"
+            except Exception as e:
+                logger.warning(f"Could not fetch the catalog from CARLA at {host}:{port} ({e}). Using defaults.")
+
+        if self.source is None:
+            self.blueprints = sorted(DEFAULT_BLUEPRINTS)
+            self.maps = repo_maps()
+            self.source = "defaults"
+
+        self.built_at = datetime.now().isoformat()
+        self.save()
+        logger.info(f"Wrote CARLA catalog ({len(self.blueprints)} blueprints, {len(self.maps)} maps, source {self.source}) to {self.path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Refresh the cached CARLA blueprint and map catalog"
+    )
+    parser.add_argument("--host", default='127.0.0.1', help="CARLA server host")
+    parser.add_argument("--port", type=int, default=2000, help="CARLA server port")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Seconds to wait for the server")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Do not contact a simulator; use the default blueprints and the repo maps"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    CarlaCatalog().refresh(host=args.host, port=args.port, timeout=args.timeout, offline=args.offline)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import carla
 import logging
 import os
 import glob
@@ -50,6 +49,8 @@ DEFAULT_BLUEPRINTS = [
 
 def get_carla_blueprints(host='127.0.0.1', port=2000, timeout=2.0):
     try:
+        import carla
+        
         client = carla.Client(host, port)
         client.set_timeout(timeout)
         world = client.get_world()
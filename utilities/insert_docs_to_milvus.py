@@ -0,0 +1,75 @@
+import argparse
+import logging
+from pathlib import Path
+
+from core.config import get_settings
+from core.documentation_cache import DocumentationCache, corpus_digest, record_corpus_version
+from core.milvus_client import MilvusClient
+
+settings = get_settings()
+
+DEFAULT_DOCS_DIR = Path(__file__).parent.parent / "data" / "documentation" / "markdown"
+
+
+def collect_files(paths: list) -> list:
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.suffix in (".md", ".txt")))
+        elif path.exists():
+            files.append(path)
+        else:
+            print(f"Skipping missing path: {path}")
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Insert Scenic documentation into Milvus, skipping stored chunks, and rebuild the documentation cache"
+    )
+    parser.add_argument("paths", nargs="*", default=[str(DEFAULT_DOCS_DIR)], help="Markdown/text files or directories")
+    parser.add_argument("-b", "--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--debug-file", help="Append the inserted chunks to this file")
+    parser.add_argument("--no-cache", action="store_true", help="Do not rebuild the documentation cache afterwards")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    files = collect_files(args.paths)
+    if not files:
+        print("No documentation files found")
+        return
+
+    client = MilvusClient(
+        collection_name=settings.DOCUMENTATION_COLLECTION,
+        embedding_provider=settings.DOCUMENTATION_EMBEDDING_PROVIDER,
+        embedding_model_name=settings.DOCUMENTATION_EMBEDDING_MODEL
+    )
+    try:
+        inserted = 0
+        contents = []
+        for path in files:
+            content = path.read_text(encoding="utf-8")
+            count = client.insert(content, batch_size=args.batch_size, debug_file=args.debug_file)
+            print(f"{path}: {count} new chunks")
+            inserted += count
+            contents.append(content)
+        print(f"Inserted {inserted} chunks from {len(files)} files into '{settings.DOCUMENTATION_COLLECTION}'")
+
+        # Agents compare their cache against this record instead of opening the collection
+        corpus_version = corpus_digest(settings.DOCUMENTATION_COLLECTION, settings.DOCUMENTATION_EMBEDDING_MODEL, contents)
+        record_corpus_version(
+            corpus_version,
+            collection=settings.DOCUMENTATION_COLLECTION,
+            embedding_model=settings.DOCUMENTATION_EMBEDDING_MODEL,
+            files=[str(path) for path in files]
+        )
+        print(f"Recorded documentation corpus version {corpus_version}")
+
+        if not args.no_cache:
+            DocumentationCache().build(client, corpus_version=corpus_version)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -275,10 +275,9 @@ def insert_scenarios(collection: Collection, scenarios: List[Dict], embedding_mo
 def main():
     connections.connect(uri=settings.MILVUS_URI, token=settings.MILVUS_TOKEN)
     
-    device = "cuda" if settings.DEVICE == "cuda" else "cpu"
-    embedding_model = EmbeddingModel(provider="huggingface", model_name="sentence-transformers/all-MiniLM-L6-v2", device=device)
+    embedding_model = EmbeddingModel(provider="huggingface", model_name="sentence-transformers/all-MiniLM-L6-v2")
     
-    print(f"Using device: {device}")
+    print(f"Using device: {embedding_model.device}")
     
     collection = create_collection()
     
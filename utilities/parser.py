@@ -1,11 +1,50 @@
+import io
 import json
-from scenic.syntax.parser import parse_string
+import tokenize
+from typing import Optional
 
 
 def parse_scenic(scenic_code: str):
+    from scenic.syntax.parser import parse_string
+    
     return parse_string(scenic_code, 'exec')
 
 
+def check_scenic_structure(scenic_code: str) -> Optional[str]:
+    """Cheap structural check of Scenic code without importing Scenic; returns the first problem found.
+
+    Scenic shares Python's tokens, so the tokenizer catches unbalanced
+    brackets, unterminated strings and inconsistent dedents. A block header
+    (a line ending with ``:``) must be followed by an indented line, and
+    leftover markdown fences are reported too.
+    """
+    if "```" in scenic_code:
+        return "markdown code fence in the code"
+    previous = None
+    expect_indent = None
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(scenic_code).readline):
+            if token.type in (tokenize.COMMENT, tokenize.NL):
+                continue
+            if token.type == tokenize.ERRORTOKEN and not token.string.isspace():
+                return f"line {token.start[0]}: unexpected {token.string!r}"
+            if expect_indent is not None:
+                if token.type != tokenize.INDENT:
+                    return f"line {expect_indent}: block header is not followed by an indented block"
+                expect_indent = None
+            if token.type == tokenize.NEWLINE and previous is not None and previous.string == ":":
+                expect_indent = previous.start[0]
+            previous = token
+    except tokenize.TokenError as e:
+        message, (line, _) = e.args
+        return f"line {line}: {message}"
+    except SyntaxError as e:
+        return f"line {e.lineno}: {e.msg}"
+    if expect_indent is not None:
+        return f"line {expect_indent}: block header at the end of the code"
+    return None
+
+
 def parse_json_from_text(text: str) -> dict:
     text = text.strip()
     
@@ -8,57 +8,47 @@ from typing import Dict, Any
 from datetime import datetime
 from core.agents.base import BaseAgent
 from core.config import get_settings
+from utilities.scenic_sections import ScenicSectionIndex, get_section_index
 
 # Load settings
 settings = get_settings()
 
+# Strings are matched first so that '#' inside a literal never starts a comment
+_SCENIC_LEXER_RE = re.compile(
+    r'''(?P<string>"""(?:\\.|[^\\])*?"""|\'\'\'(?:\\.|[^\\])*?\'\'\'|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')'''
+    r'''|(?P<comment>\#[^\n]*)''',
+    re.DOTALL
+)
+
+ADVERSARY_PATTERN = r'(adv[_\d]*|adversary[_\d]*|lead[_\d]*|ped[_\d]*|debris[_\d]*|trash[_\d]*|pedestrian[_\d]*|bicycle[_\d]*|truck[_\d]*)\s*=\s*new\s+'
+
 
 def remove_comments_from_scenic(scenic_code: str) -> str:
-    lines = scenic_code.split('\n')
-    cleaned_lines = []
-    
-    for line in lines:
-        if re.match(r'^\s*#+\s*$', line):
-            continue
-        
-        if re.match(r'^\s*#.*#\s*$', line) and line.count('#') >= 2:
-            stripped = line.strip()
-            if stripped.startswith('#') and stripped.endswith('#'):
-                continue
-        
-        if '#' in line:
-            if line.strip().startswith('#'):
-                continue
-            
-            in_string = False
-            quote_char = None
-            cleaned_line = []
-            
-            for i, char in enumerate(line):
-                if char in ('"', "'") and (i == 0 or line[i-1] != '\\'):
-                    if not in_string:
-                        in_string = True
-                        quote_char = char
-                    elif char == quote_char:
-                        in_string = False
-                        quote_char = None
-                
-                if char == '#' and not in_string:
-                    # This is a comment, stop here
-                    break
-                
-                cleaned_line.append(char)
-            
-            line = ''.join(cleaned_line).rstrip()
-        
-        if line.strip():
-            cleaned_lines.append(line)
-    
-    result = '\n'.join(cleaned_lines)
-    
-    result = re.sub(r'\n\s*\n\s*\n+', '\n\n', result)
-    
-    return result.strip()
+    pieces = []
+    # Lines that start inside a multi-line string are kept verbatim, even when blank
+    string_lines = set()
+    pos = 0
+    line_no = 0
+    counted = 0
+    
+    for match in _SCENIC_LEXER_RE.finditer(scenic_code):
+        if match.lastgroup == "comment":
+            pieces.append(scenic_code[pos:match.start()].rstrip(' \t'))
+            pos = match.end()
+        elif '\n' in match.group():
+            line_no += scenic_code.count('\n', counted, match.start())
+            counted = match.start()
+            string_lines.update(range(line_no + 1, line_no + match.group().count('\n') + 1))
+    
+    pieces.append(scenic_code[pos:])
+    
+    # Comments never span lines, so line numbers are unchanged by their removal
+    cleaned_lines = [
+        line for i, line in enumerate(''.join(pieces).split('\n'))
+        if line.strip() or i in string_lines
+    ]
+    
+    return '\n'.join(cleaned_lines).strip()
 
 
 class ScenicToLogicalAgent(BaseAgent):
@@ -126,24 +116,24 @@ def parse_logical_structure(llm_response: str, scenic_code: str) -> Dict[str, An
     except json.JSONDecodeError:
         pass
     
-    code_lines = scenic_code.split('\n')
+    index = ScenicSectionIndex(scenic_code.split('\n'))
     
-    ego_section = extract_section_code(code_lines, "Ego")
+    ego_section = index.section("Ego")
     
     if ego_section:
-        ego_objects_raw = extract_individual_objects_from_section(ego_section)
+        ego_objects_raw = index.definitions(ego_section)
         
         ego_objects = []
         for obj in ego_objects_raw:
             if re.match(r'ego\s*=\s*new\s+', obj.strip(), re.IGNORECASE):
-                ego_objects.append(ego_section)
+                ego_objects.append(ego_section.text)
                 break
         
         if not ego_objects:
-            ego_objects = [ego_section]
+            ego_objects = [ego_section.text]
     else:
-        ego_behavior_code = extract_section_code(code_lines, "Ego Behavior")
-        ego_object_code = extract_section_code(code_lines, "Ego object")
+        ego_behavior_code = _section_text(index, "Ego Behavior")
+        ego_object_code = _section_text(index, "Ego object")
         
         if ego_behavior_code or ego_object_code:
             combined_ego = (ego_behavior_code + "\n\n" + ego_object_code).strip()
@@ -166,31 +156,22 @@ def parse_logical_structure(llm_response: str, scenic_code: str) -> Dict[str, An
                     "code": ego_code
                 })
     
-    adv_sections = extract_all_sections(code_lines, "Adversarial")
+    adv_sections = index.sections("Adversarial")
     
     adversary_objects = []
     
     if adv_sections:
         for section in adv_sections:
-            objects = extract_individual_objects_from_section(
-                section,
-                r'\w+\s*=\s*new\s+' 
-            )
+            objects = index.definitions(section)
             
             if objects:
-                behavior_match = re.search(r'(behavior\s+\w+\s*\([^)]*\):.*?)(?=\n\w+\s*=\s*new\s+|\Z)', section, re.DOTALL)
-                params_and_consts = []
-                
-                for line in section.split('\n'):
-                    stripped = line.strip()
-                    if stripped.startswith('param '):
-                        params_and_consts.append(line)
-                    elif stripped and not stripped.startswith('#') and not stripped.startswith('behavior') and '=' in stripped and 'new ' not in stripped:
-                        if re.match(r'^[A-Z_][A-Z0-9_]*\s*=', stripped):
-                            params_and_consts.append(line)
+                params_and_consts = [
+                    line for i, line in zip(section.line_numbers, section.lines)
+                    if index.is_param(i) or (index.is_constant(i) and 'new ' not in index.stripped[i])
+                ]
                 
                 params_code = '\n'.join(params_and_consts) if params_and_consts else ""
-                behavior_code = behavior_match.group(1).strip() if behavior_match else ""
+                behavior_code = section.behavior_block()
                 
                 for obj in objects:
                     combined_parts = []
@@ -201,19 +182,21 @@ def parse_logical_structure(llm_response: str, scenic_code: str) -> Dict[str, An
                     combined_parts.append(obj)
                     adversary_objects.append('\n\n'.join(combined_parts))
             else:
-                if re.search(r'behavior\s+\w+\s*\(', section):
-                    adversary_objects.append(section)
+                if re.search(r'behavior\s+\w+\s*\(', section.text):
+                    adversary_objects.append(section.text)
     
     if not adversary_objects:
-        adv_behavior_code = extract_section_code(code_lines, "Adversarial Behavior")
-        adv_object_code = extract_section_code(code_lines, "Adversarial object")
+        adv_behavior_section = index.section("Adversarial Behavior")
+        adv_object_section = index.section("Adversarial object")
+        adv_behavior_code = adv_behavior_section.text if adv_behavior_section else ""
+        adv_object_code = adv_object_section.text if adv_object_section else ""
         
         if adv_behavior_code and adv_object_code:
-            objects = extract_individual_objects_from_section(adv_object_code)
+            objects = index.definitions(adv_object_section)
             for obj in objects:
                 adversary_objects.append(adv_behavior_code + "\n\n" + obj)
         elif adv_behavior_code or adv_object_code:
-            adversary_objects = extract_adversary_objects(scenic_code)
+            adversary_objects = _extract_adversary_objects(index)
     
     if len(result["Adversarials"]) > 0:
         for i, adv in enumerate(result["Adversarials"]):
@@ -230,117 +213,54 @@ def parse_logical_structure(llm_response: str, scenic_code: str) -> Dict[str, An
                     "code": adv_code
                 })
     
-    spatial_code = extract_section_code(code_lines, "Spatial Relation")
-    result["Spatial Relation"]["code"] = spatial_code
+    result["Spatial Relation"]["code"] = _section_text(index, "Spatial Relation")
     
-    req_code = extract_section_code(code_lines, "Requirements and Restrictions")
-    result["Requirement and restrictions"]["code"] = req_code
+    result["Requirement and restrictions"]["code"] = _section_text(index, "Requirements and Restrictions")
     
     return result
 
 
+def _section_text(index: ScenicSectionIndex, section_header: str) -> str:
+    section = index.section(section_header)
+    return section.text if section else ""
+
+
 def extract_individual_objects_from_section(section_code: str, object_pattern: str = None) -> list:
-    if object_pattern is None:
-        object_pattern = r'\w+\s*=\s*new\s+'
-    
-    pattern = re.compile(object_pattern, re.IGNORECASE)
-    
-    object_definitions = []
-    current_def = []
-    in_definition = False
-    
-    for line in section_code.split('\n'):
-        if pattern.search(line):
-            if current_def:
-                object_definitions.append('\n'.join(current_def).strip())
-            current_def = [line]
-            in_definition = True
-        elif in_definition:
-            stripped = line.strip()
-            if stripped and not stripped.startswith('#'):
-                current_def.append(line)
-                if not line.rstrip().endswith(',') and not line.rstrip().endswith('\\'):
-                    object_definitions.append('\n'.join(current_def).strip())
-                    current_def = []
-                    in_definition = False
-            elif stripped.startswith('#'):
-                if current_def:
-                    object_definitions.append('\n'.join(current_def).strip())
-                    current_def = []
-                    in_definition = False
-    
-    if current_def:
-        object_definitions.append('\n'.join(current_def).strip())
-    
-    return object_definitions
+    index = get_section_index(section_code.split('\n'))
+    return index.definitions(pattern=object_pattern)
 
 
 def extract_adversary_objects(scenic_code: str) -> list:
-    code_lines = scenic_code.split('\n')
-    
-    adv_section = extract_section_code(code_lines, "Adversarial")
+    return _extract_adversary_objects(get_section_index(scenic_code.split('\n')))
+
+
+def _extract_adversary_objects(index: ScenicSectionIndex) -> list:
+    adv_section = index.section("Adversarial")
     if not adv_section:
-        adv_behavior_code = extract_section_code(code_lines, "Adversarial Behavior")
-        adv_object_section = extract_section_code(code_lines, "Adversarial object")
+        adv_behavior_section = index.section("Adversarial Behavior")
+        adv_object_section = index.section("Adversarial object")
         if not adv_object_section:
             return []
     else:
-        adv_behavior_code = adv_section
+        adv_behavior_section = adv_section
         adv_object_section = adv_section
     
-    adversary_pattern = re.compile(
-        r'(adv[_\d]*|adversary[_\d]*|lead[_\d]*|ped[_\d]*|debris[_\d]*|trash[_\d]*|pedestrian[_\d]*|bicycle[_\d]*|truck[_\d]*)\s*=\s*new\s+',
-        re.IGNORECASE
-    )
-    
-    adversary_definitions = []
-    current_def = []
-    in_definition = False
-    
-    for line in adv_object_section.split('\n'):
-        if adversary_pattern.search(line):
-            if current_def:
-                adversary_definitions.append('\n'.join(current_def).strip())
-            current_def = [line]
-            in_definition = True
-        elif in_definition:
-            stripped = line.strip()
-            if stripped and not stripped.startswith('#'):
-                current_def.append(line)
-                if not line.rstrip().endswith(',') and not line.rstrip().endswith('\\'):
-                    adversary_definitions.append('\n'.join(current_def).strip())
-                    current_def = []
-                    in_definition = False
-    
-    if current_def:
-        adversary_definitions.append('\n'.join(current_def).strip())
-    
-    param_pattern = re.compile(r'param\s+\w+', re.IGNORECASE)
-    const_pattern = re.compile(r'^[A-Z_][A-Z0-9_]*\s*=', re.MULTILINE)
+    adversary_definitions = index.definitions(adv_object_section, ADVERSARY_PATTERN, comments_end_definition=False)
     
     params_for_adv = []
     constants_for_adv = []
     
-    behavior_section_lines = adv_behavior_code.split('\n') if adv_behavior_code else []
-    for line in behavior_section_lines:
-        stripped = line.strip()
-        if stripped.startswith('param '):
-            params_for_adv.append(line.strip())
-        elif stripped and not stripped.startswith('#') and not stripped.startswith('behavior'):
-            if re.match(r'^[A-Z_][A-Z0-9_]*\s*=', stripped):
-                constants_for_adv.append(line.strip())
-    
-    for line in adv_object_section.split('\n'):
-        stripped = line.strip()
-        if stripped.startswith('param '):
-            params_for_adv.append(line.strip())
-        elif stripped and not stripped.startswith('#') and '=' in stripped and 'new ' not in stripped:
-            if re.match(r'^[A-Z_][A-Z0-9_]*\s*=', stripped):
-                constants_for_adv.append(line.strip())
-    
-    all_params = list(set(params_for_adv + constants_for_adv))
+    if adv_behavior_section:
+        params_for_adv.extend(line.strip() for line in index.params(adv_behavior_section))
+        constants_for_adv.extend(line.strip() for line in index.constants(adv_behavior_section))
+    
+    params_for_adv.extend(line.strip() for line in index.params(adv_object_section))
+    constants_for_adv.extend(line.strip() for line in index.constants(adv_object_section, exclude_new=True))
+    
+    all_params = list(dict.fromkeys(params_for_adv + constants_for_adv))
     params_code = '\n'.join(all_params)
     
+    adv_behavior_code = adv_behavior_section.text if adv_behavior_section else ""
     complete_adversaries = []
     for adv_def in adversary_definitions:
         complete_code = params_code + "\n\n" + adv_behavior_code + "\n\n" + adv_def if adv_behavior_code else params_code + "\n\n" + adv_def
@@ -350,125 +270,12 @@ def extract_adversary_objects(scenic_code: str) -> list:
 
 
 def extract_section_code(code_lines: list, section_header: str) -> str:
-    in_section = False
-    section_code = []
-    found_section = False
-    skip_header_box = False
-    
-    for i, line in enumerate(code_lines):
-        # Only match section headers in comment lines
-        stripped = line.strip()
-        if section_header in line and not in_section and stripped.startswith("#"):
-            in_section = True
-            found_section = True
-            skip_header_box = True
-            continue
-        
-        if in_section:
-            if skip_header_box and line.strip().startswith("#####") and line.strip().endswith("#####"):
-                skip_header_box = False
-                continue
-                
-            stripped = line.strip()
-            if stripped.startswith("#") and not stripped == "#" and len(stripped) > 10:
-                inner_text = stripped.replace("#", "").strip()
-                if inner_text:
-                    break
-            
-            if not section_code and not line.strip():
-                continue
-                
-            section_code.append(line)
-    
-    if not found_section:
-        return ""
-    
-    while section_code:
-        last_line = section_code[-1].strip()
-        if not last_line or (last_line.startswith("#####") and last_line.endswith("#####")):
-            section_code.pop()
-        else:
-            break
-    
-    code = '\n'.join(section_code).strip()
-    return code
+    section = get_section_index(code_lines).section(section_header)
+    return section.text if section else ""
 
 
 def extract_all_sections(code_lines: list, section_header: str) -> list:
-    sections = []
-    current_section = []
-    in_section = False
-    skip_header_box = False
-    
-    for i, line in enumerate(code_lines):
-        stripped = line.strip()
-        
-        is_section_header = False
-        if stripped.startswith("#") and section_header in line:
-            comment_text = stripped.replace("#", "").strip()
-            if comment_text.startswith(section_header):
-                is_section_header = True
-        
-        if is_section_header:
-            if in_section and current_section:
-                while current_section:
-                    last_line = current_section[-1].strip()
-                    if not last_line or (last_line.startswith("#####") and last_line.endswith("#####")):
-                        current_section.pop()
-                    else:
-                        break
-                if current_section:
-                    sections.append('\n'.join(current_section).strip())
-                current_section = []
-            in_section = True
-            skip_header_box = True
-            continue
-        
-        if in_section:
-            if skip_header_box and stripped.startswith("#####") and stripped.endswith("#####"):
-                skip_header_box = False
-                continue
-            
-            if stripped.startswith("#") and not stripped == "#" and len(stripped) > 10:
-                comment_text = stripped.replace("#", "").strip()
-                major_sections = ["Description", "Header", "Ego", "Adversarial", "Spatial Relation", 
-                                "Requirements and Restrictions", "Requirement and restrictions"]
-                is_different_section = False
-                for major_section in major_sections:
-                    if comment_text.startswith(major_section) and not comment_text.startswith(section_header):
-                        is_different_section = True
-                        break
-                
-                if is_different_section:
-                    if current_section:
-                        while current_section:
-                            last_line = current_section[-1].strip()
-                            if not last_line or (last_line.startswith("#####") and last_line.endswith("#####")):
-                                current_section.pop()
-                            else:
-                                break
-                        if current_section:
-                            sections.append('\n'.join(current_section).strip())
-                    in_section = False
-                    current_section = []
-                    continue
-            
-            if not current_section and not stripped:
-                continue
-                
-            current_section.append(line)
-    
-    if in_section and current_section:
-        while current_section:
-            last_line = current_section[-1].strip()
-            if not last_line or (last_line.startswith("#####") and last_line.endswith("#####")):
-                current_section.pop()
-            else:
-                break
-        if current_section:
-            sections.append('\n'.join(current_section).strip())
-    
-    return sections
+    return [section.text for section in get_section_index(code_lines).sections(section_header)]
 
 
 def process_scenic_file(agent: ScenicToLogicalAgent, input_path: str, output_dir: str = "results/logical_structures"):
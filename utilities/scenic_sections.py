@@ -0,0 +1,217 @@
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Sequence
+
+OBJECT_PATTERN = r'\w+\s*=\s*new\s+'
+
+MAJOR_SECTIONS = [
+    "Description", "Header", "Ego", "Adversarial", "Spatial Relation",
+    "Requirements and Restrictions", "Requirement and restrictions"
+]
+
+# Matches exactly the lines OBJECT_PATTERN matches, without backtracking over \w+
+_OBJECT_START_RE = re.compile(r'\w\s*=\s*new\s', re.IGNORECASE)
+_CONSTANT_RE = re.compile(r'^[A-Z_][A-Z0-9_]*\s*=')
+_BEHAVIOR_BLOCK_RE = re.compile(r'(behavior\s+\w+\s*\([^)]*\):.*?)(?=\n\w+\s*=\s*new\s+|\Z)', re.DOTALL)
+
+
+@dataclass(frozen=True)
+class Section:
+    header: str
+    header_line: int
+    line_numbers: tuple
+    lines: tuple
+
+    def __bool__(self) -> bool:
+        return bool(self.lines)
+
+    @property
+    def text(self) -> str:
+        return '\n'.join(self.lines)
+
+    def behavior_block(self) -> str:
+        match = _BEHAVIOR_BLOCK_RE.search(self.text)
+        return match.group(1).strip() if match else ""
+
+
+class ScenicSectionIndex:
+    """Line index of a Scenic file, built in a single pass.
+
+    Every line is stripped once and comment lines are classified once
+    (section header, header box, section break), so section lookups are
+    bisections over those tables and object, param and constant lookups
+    only walk the lines of the section they are asked about.
+    """
+
+    def __init__(self, code_lines: Sequence[str]):
+        self.code_lines = tuple(code_lines)
+        self.stripped = [line.strip() for line in self.code_lines]
+        self.comment_lines = [i for i, stripped in enumerate(self.stripped) if stripped[:1] == "#"]
+        self.comment_text = {}
+
+        self.box_lines = []
+        # Long comment lines that carry text; these close a section
+        self.break_lines = []
+
+        for i in self.comment_lines:
+            stripped = self.stripped[i]
+            text = stripped.replace("#", "").strip()
+            self.comment_text[i] = text
+            if stripped.startswith("#####") and stripped.endswith("#####"):
+                self.box_lines.append(i)
+            if text and len(stripped) > 10:
+                self.break_lines.append(i)
+
+        self._box_set = frozenset(self.box_lines)
+        self._sections = {}
+        self._all_sections = {}
+        self._pattern_lines = {}
+
+    def is_param(self, i: int) -> bool:
+        return self.stripped[i].startswith('param ')
+
+    def is_constant(self, i: int) -> bool:
+        return _CONSTANT_RE.match(self.stripped[i]) is not None
+
+    @staticmethod
+    def _next(positions: list, start: int, default: int) -> int:
+        k = bisect_left(positions, start)
+        return positions[k] if k < len(positions) else default
+
+    def _build_section(self, header: str, header_line: int, start: int, end: int, skipped: Optional[int]) -> Section:
+        numbers = [i for i in range(start, end) if i != skipped]
+        first = 0
+        while first < len(numbers) and not self.stripped[numbers[first]]:
+            first += 1
+        numbers = numbers[first:]
+        while numbers and (not self.stripped[numbers[-1]] or numbers[-1] in self._box_set):
+            numbers.pop()
+
+        lines = [self.code_lines[i] for i in numbers]
+        if lines:
+            lines[0] = lines[0].lstrip()
+            lines[-1] = lines[-1].rstrip()
+        return Section(header, header_line, tuple(numbers), tuple(lines))
+
+    def section(self, header: str) -> Optional[Section]:
+        """First section whose comment header contains ``header``.
+
+        The section runs until the next long comment with text; the first
+        ``#####...#####`` box after the header is treated as its frame.
+        """
+        if header in self._sections:
+            return self._sections[header]
+
+        n = len(self.code_lines)
+        header_line = next((i for i in self.comment_lines if header in self.code_lines[i]), None)
+        section = None
+        if header_line is not None:
+            start = header_line + 1
+            end = self._next(self.break_lines, start, n)
+            box = self._next(self.box_lines, start, n)
+            if box == end < n:
+                end = self._next(self.break_lines, box + 1, n)
+            skipped = box if box < end else None
+            section = self._build_section(header, header_line, start, end, skipped)
+
+        self._sections[header] = section
+        return section
+
+    def sections(self, header: str) -> list:
+        """Every section whose comment header starts with ``header``.
+
+        A section ends at the next matching header or at the next long
+        comment that opens a different major section.
+        """
+        if header in self._all_sections:
+            return self._all_sections[header]
+
+        n = len(self.code_lines)
+        headers = [
+            i for i in self.comment_lines
+            if header in self.code_lines[i] and self.comment_text[i].startswith(header)
+        ]
+        terminators = [
+            i for i in self.break_lines
+            if not self.comment_text[i].startswith(header)
+            and any(self.comment_text[i].startswith(major) for major in MAJOR_SECTIONS)
+        ]
+
+        sections = []
+        for k, header_line in enumerate(headers):
+            next_header = headers[k + 1] if k + 1 < len(headers) else n
+            start = header_line + 1
+            end = min(next_header, self._next(terminators, start, n))
+            box = self._next(self.box_lines, start, n)
+            if box == end < next_header:
+                end = min(next_header, self._next(terminators, box + 1, n))
+            skipped = box if box < end else None
+            section = self._build_section(header, header_line, start, end, skipped)
+            if section.lines:
+                sections.append(section)
+
+        self._all_sections[header] = sections
+        return sections
+
+    def _matches(self, pattern: Optional[str]) -> tuple:
+        pattern = pattern or OBJECT_PATTERN
+        if pattern not in self._pattern_lines:
+            compiled = _OBJECT_START_RE if pattern == OBJECT_PATTERN else re.compile(pattern, re.IGNORECASE)
+            self._pattern_lines[pattern] = (compiled, {})
+        return self._pattern_lines[pattern]
+
+    def definitions(self, section: Optional[Section] = None, pattern: Optional[str] = None, comments_end_definition: bool = True) -> list:
+        """Object definitions (``x = new ...``) with their continuation lines."""
+        if section is None:
+            numbers = range(len(self.code_lines))
+            lines = self.code_lines
+        else:
+            numbers = section.line_numbers
+            lines = section.lines
+
+        compiled, matches = self._matches(pattern)
+        for i in numbers:
+            if i not in matches:
+                matches[i] = compiled.search(self.code_lines[i]) is not None
+
+        definitions = []
+        current = []
+        for k, i in enumerate(numbers):
+            if matches[i]:
+                if current:
+                    definitions.append('\n'.join(current).strip())
+                current = [lines[k]]
+            elif current:
+                if i in self.comment_text:
+                    if comments_end_definition:
+                        definitions.append('\n'.join(current).strip())
+                        current = []
+                elif self.stripped[i]:
+                    current.append(lines[k])
+                    if not lines[k].rstrip().endswith((',', '\\')):
+                        definitions.append('\n'.join(current).strip())
+                        current = []
+
+        if current:
+            definitions.append('\n'.join(current).strip())
+        return definitions
+
+    def params(self, section: Section) -> list:
+        return [line for i, line in zip(section.line_numbers, section.lines) if self.is_param(i)]
+
+    def constants(self, section: Section, exclude_new: bool = False) -> list:
+        return [
+            line for i, line in zip(section.line_numbers, section.lines)
+            if self.is_constant(i) and not (exclude_new and 'new ' in self.stripped[i])
+        ]
+
+
+@lru_cache(maxsize=32)
+def _cached_index(code_lines: tuple) -> ScenicSectionIndex:
+    return ScenicSectionIndex(code_lines)
+
+
+def get_section_index(code_lines: Sequence[str]) -> ScenicSectionIndex:
+    return _cached_index(tuple(code_lines))